@@ -25,7 +25,6 @@ setup(
         "PySide6==6.5.3",
         "opencv-python~=4.8.1.78",
         "webdav4~=0.9.8",
-        "pillow~=10.1.0",
         "jsonschema~=4.20.0",
     ],
     include_package_data=True,
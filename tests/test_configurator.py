@@ -0,0 +1,203 @@
+"""Tests the backend handling the configuration."""
+# Copyright (C) 2023, NG:ITL
+
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from unittest import mock
+from json import dump
+import unittest
+import time
+
+from pynng import Pub0, Rep0
+import numpy as np
+
+from vehicle_tracking_configurator.configurator import (
+    ConfiguratorHandler,
+    DRAWER_VIEW,
+    NEW_TRANSFORMATION_POINT,
+    REGION_OF_INTEREST,
+    SHOWER_VIEW,
+    TRANSFORMATION_POINTS,
+)
+from vehicle_tracking_configurator.frame_protocol import encode_frame
+
+
+FRAME_SIZE = (320, 240)
+CORNERS = {
+    "top_left": ((60, 40), (0.0, 0.0)),
+    "top_right": ((250, 50), (7.5, 0.0)),
+    "bottom_left": ((20, 220), (0.0, 5.0)),
+    "bottom_right": ((300, 210), (7.5, 5.0)),
+}
+
+
+class ConfiguratorHandlerTestCase(unittest.TestCase):
+    """Creates a handler from a config whose sockets lie in a temporary directory."""
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        frames_address = f"ipc://{self.directory.name}/camera_frame.ipc"
+        tracker_config_address = f"ipc://{self.directory.name}/tracker_config.ipc"
+        # The handler dials both addresses, which is only quiet if something listens on them.
+        self.publisher = Pub0(listen=frames_address)
+        self.addCleanup(self.publisher.close)
+        self.tracker = Rep0(listen=tracker_config_address)
+        self.addCleanup(self.tracker.close)
+        self.config = {
+            "pynng": {
+                "publishers": {},
+                "subscribers": {
+                    "camera_frame_receiver": {"address": frames_address, "topics": {}},
+                    "tracker_config": {"address": tracker_config_address, "topics": {}},
+                },
+            },
+            "frame_pipeline": {"frame_size": list(FRAME_SIZE)},
+            "resource_downloader": {"url": "", "client_name": "", "client_password": ""},
+        }
+
+    def create_handler(self) -> ConfiguratorHandler:
+        """Creates a handler from the config, with the corners configured.
+
+        Returns:
+            ConfiguratorHandler: The handler.
+        """
+        config_path = Path(self.directory.name) / "configurator_config.json"
+        with open(config_path, "w", encoding="utf-8") as config_file:
+            dump(self.config, config_file)
+        handler = ConfiguratorHandler(config_path)
+        self.addCleanup(handler.close)
+        for point_name, (image_point, world_point) in CORNERS.items():
+            handler.add_transformation_point(image_point, world_point, point_name)
+        return handler
+
+
+class TransformationPointsTest(ConfiguratorHandlerTestCase):
+    """Tests configuring the transformation points."""
+
+    def test_points_are_replaced_instead_of_changed(self) -> None:
+        """Changing the points replaces them, so a render thread iterating the previous points is not affected."""
+        handler = self.create_handler()
+        points = handler.configured_transformation_points
+        previous_points = {point_name: dict(point) for point_name, point in points.items()}
+
+        handler.current_selected_point[TRANSFORMATION_POINTS] = "top_left"
+        handler.transformation_config_text_changed(False, 0, 1.0)
+        handler.add_transformation_point((10, 10), (2.0, 2.0), "top_right")
+        handler.delete_button_pressed(TRANSFORMATION_POINTS)
+
+        self.assertEqual(points, previous_points)
+        self.assertEqual(handler.configured_transformation_points["top_left"]["real_world"], (0.0, 0.0))
+        self.assertEqual(handler.configured_transformation_points["top_right"]["image"], (10, 10))
+
+    def test_new_point_is_fitted_once_its_real_world_point_is_entered(self) -> None:
+        """A clicked new point is left out of the fit until its real world point is entered, and can be deleted."""
+        handler = self.create_handler()
+        handler.current_selected_point[TRANSFORMATION_POINTS] = NEW_TRANSFORMATION_POINT
+        real_x, real_y = handler.get_real_world_point((150, 120))
+
+        data = handler.points_drawer_clicked(TRANSFORMATION_POINTS, (150, 120), FRAME_SIZE, FRAME_SIZE)
+
+        self.assertEqual(handler.current_selected_point[TRANSFORMATION_POINTS], "point_4")
+        self.assertEqual((data.image_x, data.image_y), (150, 120))
+        self.assertAlmostEqual(data.real_x, real_x, places=2)
+        self.assertAlmostEqual(data.real_y, real_y, places=2)
+        self.assertNotIn("point_4", handler.create_set_config_request()["payload"]["transformation_points"])
+        self.assertNotIn("point_4", handler.transformation_reprojection_errors)
+
+        handler.transformation_config_text_changed(False, 0, 1.0)
+
+        transformation_points = handler.create_set_config_request()["payload"]["transformation_points"]
+        self.assertEqual(transformation_points["point_4"], {"image": (150, 120), "real_world": (1.0, data.real_y)})
+        self.assertIn("point_4", handler.transformation_reprojection_errors)
+
+        handler.delete_button_pressed(TRANSFORMATION_POINTS)
+
+        self.assertEqual(list(handler.configured_transformation_points), list(CORNERS))
+        self.assertNotIn("point_4", handler.transformation_reprojection_errors)
+        self.assertEqual(handler.current_selected_point[TRANSFORMATION_POINTS], "bottom_right")
+
+    def test_corners_are_reset_instead_of_deleted(self) -> None:
+        """Deleting a corner resets it, deleting the new point does nothing."""
+        handler = self.create_handler()
+
+        handler.delete_button_pressed(TRANSFORMATION_POINTS)
+        handler.current_selected_point[TRANSFORMATION_POINTS] = NEW_TRANSFORMATION_POINT
+        handler.delete_button_pressed(TRANSFORMATION_POINTS)
+
+        self.assertEqual(list(handler.configured_transformation_points), list(CORNERS))
+        self.assertEqual(
+            handler.configured_transformation_points["top_left"], {"image": (0, 0), "real_world": (0.0, 0.0)}
+        )
+
+    def test_arrow_buttons_select_the_new_point_after_the_last_point(self) -> None:
+        """The arrow buttons cycle through the configured points and the new point."""
+        handler = self.create_handler()
+        handler.current_selected_point[TRANSFORMATION_POINTS] = "bottom_right"
+
+        names = [handler.arrow_button_clicked(TRANSFORMATION_POINTS, "right")[0] for _ in range(2)]
+
+        self.assertEqual(names, [NEW_TRANSFORMATION_POINT, "top_left"])
+        self.assertEqual(handler.arrow_button_clicked(TRANSFORMATION_POINTS, "left")[0], NEW_TRANSFORMATION_POINT)
+
+
+class ReducedRenderSizeTest(ConfiguratorHandlerTestCase):
+    """Tests that views rendered below the frame size still configure points at the full frame resolution."""
+
+    def test_views_are_rendered_at_the_displayed_size(self) -> None:
+        """A view displayed smaller than the frame is rendered at the displayed size, keeping the aspect ratio."""
+        handler = self.create_handler()
+        handler.set_view_size(DRAWER_VIEW, 160, 200)
+        handler.set_view_size(SHOWER_VIEW, 640, 480)
+        time.sleep(0.1)
+        self.publisher.send(encode_frame(np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 50, dtype=np.uint8)))
+
+        drawer_frame, shower_frame, _ = handler.read_frames()
+
+        self.assertEqual(handler.get_render_size(DRAWER_VIEW), (160, 120))
+        self.assertEqual(drawer_frame.shape if drawer_frame is not None else None, (120, 160, 3))
+        self.assertEqual(shower_frame.shape if shower_frame is not None else None, (240, 320, 3))
+
+    def test_clicks_are_mapped_to_the_full_frame(self) -> None:
+        """A click on a view displayed at half the size with borders configures the point on the full frame."""
+        handler = self.create_handler()
+        handler.set_view_size(DRAWER_VIEW, 160, 120)
+
+        handler.points_drawer_clicked(REGION_OF_INTEREST, (95, 40), (160, 120), (200, 130))
+        handler.current_selected_point[TRANSFORMATION_POINTS] = "top_left"
+        data = handler.points_drawer_clicked(TRANSFORMATION_POINTS, (50, 25), (160, 120), (200, 130))
+        shower_data = handler.points_shower_clicked((30, 20), (160, 120), (160, 120))
+
+        self.assertEqual(handler.region_of_interest_points, [(150, 70)])
+        self.assertEqual((data.image_x, data.image_y), (60, 40))
+        self.assertEqual(handler.configured_transformation_points["top_left"]["image"], (60, 40))
+        self.assertEqual((shower_data.image_x, shower_data.image_y), (60, 40))
+        self.assertAlmostEqual(shower_data.real_x, 0.0, places=2)
+        self.assertAlmostEqual(shower_data.real_y, 0.0, places=2)
+
+
+class ImageToWorldMapBuildTest(ConfiguratorHandlerTestCase):
+    """Tests that a failed build of the image to world map is reported once and not retried with the disk cache."""
+
+    def test_failed_build_falls_back_to_memory(self) -> None:
+        """A cache directory that can not be created fails the build once, the map is then built in memory."""
+        cache_dir = Path(self.directory.name) / "topview_cache"
+        cache_dir.write_bytes(b"")
+        self.config["topview_transformation"] = {"cache_dir": str(cache_dir)}
+        handler = self.create_handler()
+        expected = handler.get_real_world_point((150, 120))
+
+        with mock.patch("vehicle_tracking_configurator.configurator.traceback.print_exception") as print_exception:
+            real_world_points = []
+            for _ in range(50):
+                real_world_points.append(handler.get_real_world_point((150, 120)))
+                time.sleep(0.01)
+
+        print_exception.assert_called_once()
+        self.assertIsInstance(print_exception.call_args.args[0], OSError)
+        self.assertTrue(cache_dir.is_file())
+        np.testing.assert_allclose(real_world_points, [expected] * 50, atol=2e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Tests the preallocated buffers received frames are copied into."""
+# Copyright (C) 2023, NG:ITL
+
+import unittest
+
+import numpy as np
+
+from vehicle_tracking_configurator.frame_buffer import FrameRingBuffer
+from vehicle_tracking_configurator.double_frame_buffer import DoubleFrameBuffer
+
+
+class FrameRingBufferTest(unittest.TestCase):
+    """Tests storing frames in the ring buffer."""
+
+    def setUp(self) -> None:
+        self.buffer = FrameRingBuffer(4, 2, slots=3)
+
+    @staticmethod
+    def create_frame(value: int) -> bytes:
+        """Creates the bytes of a frame filled with a value.
+
+        Args:
+            value (int): The value of every byte.
+
+        Returns:
+            bytes: The frame.
+        """
+        return bytes([value]) * (4 * 2 * 3)
+
+    def test_stored_frame_is_the_latest(self) -> None:
+        """A stored frame is copied into the ring and becomes the latest frame."""
+        frame = self.buffer.store(self.create_frame(7))
+
+        self.assertEqual(self.buffer.frame_shape, (2, 4, 3))
+        self.assertEqual(frame.shape, (2, 4, 3))
+        self.assertTrue(np.all(frame == 7))
+        self.assertIs(self.buffer.latest.base, frame.base)
+        np.testing.assert_array_equal(self.buffer.latest, frame)
+
+    def test_views_stay_valid_until_the_ring_wrapped_around(self) -> None:
+        """A view is overwritten by the frame stored `slots` frames later."""
+        first = self.buffer.store(self.create_frame(1))
+        self.buffer.store(self.create_frame(2))
+        self.buffer.store(self.create_frame(3))
+        self.assertTrue(np.all(first == 1))
+
+        self.buffer.store(self.create_frame(4))
+        self.assertTrue(np.all(first == 4))
+
+    def test_mis_sized_frame_is_rejected(self) -> None:
+        """A frame of the wrong size raises a ValueError and does not advance the ring."""
+        latest = self.buffer.store(self.create_frame(5))
+
+        with self.assertRaises(ValueError):
+            self.buffer.store(b"\x00" * 10)
+        np.testing.assert_array_equal(self.buffer.latest, latest)
+
+    def test_ring_needs_two_slots(self) -> None:
+        """A ring with less than two slots raises a ValueError."""
+        with self.assertRaises(ValueError):
+            FrameRingBuffer(4, 2, slots=1)
+
+
+class DoubleFrameBufferTest(unittest.TestCase):
+    """Tests that buffers handed to the UI are not rendered into before they are released."""
+
+    def setUp(self) -> None:
+        self.buffer = DoubleFrameBuffer()
+
+    def test_back_buffer_becomes_the_front_buffer(self) -> None:
+        """Swapping makes the rendered back buffer the front buffer."""
+        back = self.buffer.back((2, 4, 3))
+
+        self.assertIs(self.buffer.swap(), back)
+        self.assertIs(self.buffer.front(), back)
+        self.assertIsNot(self.buffer.back((2, 4, 3)), back)
+
+    def test_buffers_in_use_are_not_rendered_into(self) -> None:
+        """A third buffer is used while the UI still reads the two others, released buffers are used again."""
+        first = self.buffer.back((2, 4, 3))
+        self.buffer.swap()
+        second = self.buffer.back((2, 4, 3))
+        self.buffer.swap()
+
+        third = self.buffer.back((2, 4, 3))
+        self.assertIsNot(third, first)
+        self.assertIsNot(third, second)
+
+        self.buffer.release(first)
+        self.assertIs(self.buffer.back((2, 4, 3)), first)
+
+    def test_buffers_keep_their_shape(self) -> None:
+        """The buffers are only allocated again when the shape changes."""
+        back = self.buffer.back((2, 4, 3))
+        self.buffer.swap()
+        self.buffer.release(back)
+        self.buffer.back((2, 4, 3))
+        self.buffer.swap()
+
+        self.assertIs(self.buffer.back((2, 4, 3)), back)
+        self.assertEqual(self.buffer.back((6, 8, 3)).shape, (6, 8, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
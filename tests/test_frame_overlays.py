@@ -0,0 +1,193 @@
+"""Tests the overlays drawn on the point drawer frames."""
+# Copyright (C) 2023, NG:ITL
+
+import unittest
+
+import numpy as np
+import cv2
+
+from vehicle_tracking_configurator.frame_overlays import DrawerOverlay, RegionOfInterestShade
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # type: ignore[assignment]
+
+
+FRAME_SHAPE = (240, 320, 3)
+
+
+class DrawerOverlayTest(unittest.TestCase):
+    """Tests rendering the overlay once, re-rendering only its changed parts and blending it onto the frames."""
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(0)
+        self.frame = self.rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+        self.region_of_interest_points = [(20, 20), (300, 30), (280, 220), (40, 200)]
+        self.transformation_points: dict[str, dict[str, tuple[float, float] | tuple[int, int]]] = {
+            "top_left": {"image": (30, 30), "real_world": (0.0, 0.0)},
+            "top_right": {"image": (290, 30), "real_world": (7.5, 0.0)},
+            "bottom_left": {"image": (30, 210), "real_world": (0.0, 5.0)},
+            "bottom_right": {"image": (290, 210), "real_world": (7.5, 5.0)},
+        }
+
+    def blend(self, overlay: DrawerOverlay) -> np.ndarray:
+        """Blends an overlay onto a copy of the frame.
+
+        Args:
+            overlay (DrawerOverlay): The overlay.
+
+        Returns:
+            np.ndarray: The frame with the overlay.
+        """
+        frame = self.frame.copy()
+        overlay.blend(frame)
+        return frame
+
+    def render_from_scratch(self) -> np.ndarray:
+        """Renders the current points with a new overlay.
+
+        Returns:
+            np.ndarray: The frame with the overlay.
+        """
+        overlay = DrawerOverlay()
+        overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+        return self.blend(overlay)
+
+    def random_point(self) -> tuple[int, int]:
+        """Creates a random point, partly outside of the frame so clipping is covered.
+
+        Returns:
+            tuple[int, int]: The point.
+        """
+        return (int(self.rng.integers(-20, FRAME_SHAPE[1] + 20)), int(self.rng.integers(-20, FRAME_SHAPE[0] + 20)))
+
+    def edit(self) -> None:
+        """Moves, adds or removes a random point."""
+        match self.rng.integers(0, 5):
+            case 0:
+                index = int(self.rng.integers(0, len(self.region_of_interest_points)))
+                self.region_of_interest_points[index] = self.random_point()
+            case 1:
+                self.region_of_interest_points.insert(
+                    int(self.rng.integers(0, len(self.region_of_interest_points) + 1)), self.random_point()
+                )
+            case 2 if len(self.region_of_interest_points) > 3:
+                del self.region_of_interest_points[int(self.rng.integers(0, len(self.region_of_interest_points)))]
+            case 3:
+                point_name = list(self.transformation_points)[
+                    int(self.rng.integers(0, len(self.transformation_points)))
+                ]
+                self.transformation_points[point_name] = {
+                    "image": self.random_point(),
+                    "real_world": (round(float(self.rng.uniform(0, 7.5)), 3), round(float(self.rng.uniform(0, 5)), 3)),
+                }
+            case _:
+                self.transformation_points[f"point_{len(self.transformation_points)}"] = {
+                    "image": self.random_point(),
+                    "real_world": (1.0, 1.0),
+                }
+
+    def test_overlay_is_white_near_the_points(self) -> None:
+        """The overlay is white, and only covers the pixels near the points."""
+        frame = self.render_from_scratch()
+
+        changed = np.any(frame != self.frame, axis=2)
+        self.assertTrue(changed.any())
+        self.assertFalse(changed.all())
+        self.assertTrue(np.all(frame[changed] >= self.frame[changed]))
+
+    def test_incremental_updates_match_full_renders(self) -> None:
+        """300 random edits rendered incrementally give the same frames as rendering every state from scratch."""
+        overlay = DrawerOverlay()
+        for edit in range(300):
+            self.edit()
+            overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+            np.testing.assert_array_equal(self.blend(overlay), self.render_from_scratch(), err_msg=f"edit {edit}")
+
+    def test_unchanged_points_keep_the_overlay(self) -> None:
+        """Updating with unchanged points keeps the overlay."""
+        overlay = DrawerOverlay()
+        overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+        expected = self.blend(overlay)
+
+        overlay.update(FRAME_SHAPE, list(self.region_of_interest_points), dict(self.transformation_points))
+
+        np.testing.assert_array_equal(self.blend(overlay), expected)
+
+    def test_changed_points_render_the_overlay_again(self) -> None:
+        """Moving a point renders the overlay of the new points."""
+        overlay = DrawerOverlay()
+        overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+        self.region_of_interest_points[1] = (250, 100)
+        self.transformation_points["top_left"] = {"image": (60, 50), "real_world": (0.5, 0.5)}
+
+        overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+
+        np.testing.assert_array_equal(self.blend(overlay), self.render_from_scratch())
+
+    def test_frame_shape_change_renders_the_overlay_again(self) -> None:
+        """A new frame shape renders the whole overlay again."""
+        overlay = DrawerOverlay()
+        overlay.update((120, 160, 3), self.region_of_interest_points, self.transformation_points)
+        overlay.update(FRAME_SHAPE, self.region_of_interest_points, self.transformation_points)
+
+        np.testing.assert_array_equal(self.blend(overlay), self.render_from_scratch())
+
+
+def shade_with_pil(
+    frame: np.ndarray, region_of_interest_points: list[tuple[int, int]], color: tuple[int, int, int, int]
+) -> np.ndarray:
+    """Shades a frame like the point shower did before the shading was cached.
+
+    Args:
+        frame (np.ndarray): The BGR frame.
+        region_of_interest_points (list[tuple[int, int]]): The points of the region of interest.
+        color (tuple[int, int, int, int]): The RGBA color everything outside of the region of interest is shaded with.
+
+    Returns:
+        np.ndarray: The shaded frame.
+    """
+    image_frame = Image.fromarray(frame.copy())
+    cv2_mask = cv2.cvtColor(np.array(Image.new("RGBA", (frame.shape[1], frame.shape[0]), color)), cv2.COLOR_RGBA2BGRA)
+    if len(region_of_interest_points) > 0:
+        cv2_mask = cv2.fillPoly(cv2_mask, [np.array(region_of_interest_points)], (0, 0, 0, 0))
+    image_mask = Image.fromarray(cv2_mask)
+    image_frame.paste(image_mask, mask=image_mask)
+    return np.array(image_frame)
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed.")
+class RegionOfInterestShadeTest(unittest.TestCase):
+    """Tests that the cached shading matches the shading composited with PIL."""
+
+    def setUp(self) -> None:
+        self.frame = np.random.default_rng(0).integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+        self.shade = RegionOfInterestShade()
+        self.output = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+
+    def test_shading_matches_pil(self) -> None:
+        """Opaque, translucent and transparent colors shade the frame like PIL, up to rounding."""
+        region_of_interest_points = [(20, 20), (300, 30), (280, 220), (40, 200)]
+        for color in ((0, 0, 0, 255), (255, 255, 255, 255), (64, 64, 64, 192), (200, 30, 90, 77), (10, 20, 30, 0)):
+            with self.subTest(color=color):
+                self.shade.update(FRAME_SHAPE, region_of_interest_points, color)
+
+                self.shade.apply(self.frame, self.output)
+
+                expected = shade_with_pil(self.frame, region_of_interest_points, color)
+                difference = np.abs(self.output.astype(np.int16) - expected)
+                self.assertLessEqual(int(difference.max()), 1)
+
+    def test_frame_without_region_of_interest_is_shaded_entirely(self) -> None:
+        """Without region of interest points the whole frame is shaded."""
+        self.shade.update(FRAME_SHAPE, [], (255, 0, 0, 255))
+
+        self.shade.apply(self.frame, self.output)
+
+        np.testing.assert_array_equal(self.output, shade_with_pil(self.frame, [], (255, 0, 0, 255)))
+        self.assertTrue(np.all(self.output == (0, 0, 255)))
+
+
+if __name__ == "__main__":
+    unittest.main()
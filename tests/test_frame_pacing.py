@@ -0,0 +1,183 @@
+"""Tests pacing the rendered frames to the display."""
+# Copyright (C) 2023, NG:ITL
+
+from threading import Timer
+from typing import Callable
+import asyncio
+import unittest
+import time
+
+from vehicle_tracking_configurator.frame_pacing import FramePacer
+
+
+class FramePacerTestCase(unittest.TestCase):
+    """Calls the pacer from another thread, like the UI does."""
+
+    def call_later(self, delay: float, function: Callable[[], None]) -> None:
+        """Calls a function on another thread after a delay.
+
+        Args:
+            delay (float): The delay in seconds.
+            function (Callable[[], None]): The function to call.
+        """
+        timer = Timer(delay, function)
+        timer.start()
+        self.addCleanup(timer.join)
+
+    def timed_wait(self, pacer: FramePacer) -> tuple[bool, float]:
+        """Waits for the next frame on an event loop.
+
+        Args:
+            pacer (FramePacer): The pacer.
+
+        Returns:
+            tuple[bool, float]: The result of the wait and the time it took in seconds.
+        """
+        start = time.monotonic()
+        consumed = asyncio.run(pacer.async_wait())
+        return consumed, time.monotonic() - start
+
+
+class FramePacerTest(FramePacerTestCase):
+    """Tests blocking until the next frame should be rendered."""
+
+    def timed_blocking_wait(self, pacer: FramePacer) -> tuple[bool, float]:
+        """Blocks until the next frame should be rendered.
+
+        Args:
+            pacer (FramePacer): The pacer.
+
+        Returns:
+            tuple[bool, float]: The result of the wait and the time it took in seconds.
+        """
+        start = time.monotonic()
+        consumed = pacer.wait()
+        return consumed, time.monotonic() - start
+
+    def test_wait_ends_once_the_frame_is_shown(self) -> None:
+        """The wait ends as soon as the UI showed the previous frame."""
+        pacer = FramePacer(timeout=2)
+        pacer.frame_published()
+        self.call_later(0.05, pacer.frame_consumed)
+
+        consumed, duration = self.timed_blocking_wait(pacer)
+
+        self.assertTrue(consumed)
+        self.assertGreaterEqual(duration, 0.04)
+        self.assertLess(duration, 1)
+
+    def test_wait_times_out(self) -> None:
+        """The wait ends after the timeout if the UI does not show the previous frame."""
+        pacer = FramePacer(timeout=0.05)
+        pacer.frame_published()
+
+        consumed, duration = self.timed_blocking_wait(pacer)
+
+        self.assertFalse(consumed)
+        self.assertGreaterEqual(duration, 0.04)
+
+    def test_frames_are_not_waited_for_without_demand(self) -> None:
+        """Without demand driven pacing, and for frames the UI does not show, the wait does not wait for the UI."""
+        for pacer, shown in ((FramePacer(demand_driven=False, timeout=2), True), (FramePacer(timeout=2), False)):
+            with self.subTest(shown=shown):
+                pacer.frame_published(shown)
+
+                consumed, duration = self.timed_blocking_wait(pacer)
+
+                self.assertTrue(consumed)
+                self.assertLess(duration, 1)
+
+    def test_frames_are_spaced_by_the_target_rate(self) -> None:
+        """A frame is not rendered faster than the target rate, although the UI showed the previous one."""
+        pacer = FramePacer(max_fps=10)
+        pacer.frame_published()
+        pacer.frame_consumed()
+
+        _, duration = self.timed_blocking_wait(pacer)
+
+        self.assertGreaterEqual(duration, 0.09)
+
+    def test_idle_rate_is_used_while_idle(self) -> None:
+        """While idle frames are spaced by the idle rate, leaving the idle rate ends the wait early."""
+        pacer = FramePacer(demand_driven=False, idle_fps=5)
+        pacer.set_idle(True)
+        pacer.frame_published()
+        _, idle_duration = self.timed_blocking_wait(pacer)
+
+        pacer = FramePacer(demand_driven=False, idle_fps=0.5)
+        pacer.set_idle(True)
+        pacer.frame_published()
+        self.call_later(0.05, lambda: pacer.set_idle(False))
+        _, left_duration = self.timed_blocking_wait(pacer)
+
+        self.assertGreaterEqual(idle_duration, 0.18)
+        self.assertLess(left_duration, 1)
+
+
+class AsyncFramePacerTest(FramePacerTestCase):
+    """Tests waiting for the next frame without blocking the event loop."""
+
+    def test_wait_ends_once_the_frame_is_shown(self) -> None:
+        """The wait ends as soon as the UI showed the previous frame."""
+        pacer = FramePacer(timeout=2)
+        pacer.frame_published()
+        self.call_later(0.05, pacer.frame_consumed)
+
+        consumed, duration = self.timed_wait(pacer)
+
+        self.assertTrue(consumed)
+        self.assertGreaterEqual(duration, 0.04)
+        self.assertLess(duration, 1)
+
+    def test_wait_times_out(self) -> None:
+        """The wait ends after the timeout if the UI does not show the previous frame."""
+        pacer = FramePacer(timeout=0.05)
+        pacer.frame_published()
+
+        consumed, duration = self.timed_wait(pacer)
+
+        self.assertFalse(consumed)
+        self.assertGreaterEqual(duration, 0.04)
+
+    def test_shown_frame_does_not_end_the_interval(self) -> None:
+        """The target rate is kept although the UI showed the previous frame early."""
+        pacer = FramePacer(max_fps=5, demand_driven=False)
+        pacer.frame_published()
+        self.call_later(0.05, pacer.frame_consumed)
+
+        _, duration = self.timed_wait(pacer)
+
+        self.assertGreaterEqual(duration, 0.18)
+
+    def test_leaving_the_idle_rate_ends_the_wait(self) -> None:
+        """Leaving the idle rate does not wait for the idle interval."""
+        pacer = FramePacer(demand_driven=False, idle_fps=0.5)
+        pacer.set_idle(True)
+        pacer.frame_published()
+        self.call_later(0.05, lambda: pacer.set_idle(False))
+
+        _, duration = self.timed_wait(pacer)
+
+        self.assertLess(duration, 1)
+
+    def test_event_loop_is_not_blocked(self) -> None:
+        """Other coroutines run on the event loop while the pacer waits."""
+        pacer = FramePacer(timeout=0.2)
+        pacer.frame_published()
+        ticks = []
+
+        async def tick() -> None:
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def wait_and_tick() -> bool:
+            consumed, _ = await asyncio.gather(pacer.async_wait(), tick())
+            return consumed
+
+        self.assertFalse(asyncio.run(wait_and_tick()))
+        self.assertEqual(len(ticks), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Tests the message format of the camera frame stream."""
+# Copyright (C) 2023, NG:ITL
+
+import unittest
+
+import numpy as np
+
+from vehicle_tracking_configurator.frame_protocol import (
+    FRAME_HEADER,
+    FRAME_MAGIC,
+    FrameEncoding,
+    FrameHeader,
+    decode_compressed_frame,
+    decode_frame_header,
+    encode_frame,
+)
+
+
+class FrameProtocolTest(unittest.TestCase):
+    """Tests encoding and decoding frame messages."""
+
+    def setUp(self) -> None:
+        self.frame = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+    def test_raw_frame_round_trip(self) -> None:
+        """A raw frame is decoded to its header and its unchanged bytes."""
+        header, frame_data = decode_frame_header(encode_frame(self.frame))
+
+        self.assertEqual(header, FrameHeader(FrameEncoding.RAW, 64, 48, 3))
+        self.assertEqual(bytes(frame_data), self.frame.tobytes())
+
+    def test_png_frame_round_trip(self) -> None:
+        """A PNG frame is decoded losslessly."""
+        header, frame_data = decode_frame_header(encode_frame(self.frame, FrameEncoding.PNG))
+
+        self.assertEqual(header, FrameHeader(FrameEncoding.PNG, 64, 48, 3))
+        np.testing.assert_array_equal(decode_compressed_frame(frame_data), self.frame)
+
+    def test_jpeg_frame_keeps_the_geometry(self) -> None:
+        """A JPEG frame is decoded with the size of the encoded frame."""
+        header, frame_data = decode_frame_header(encode_frame(self.frame, FrameEncoding.JPEG, quality=50))
+
+        self.assertEqual(header, FrameHeader(FrameEncoding.JPEG, 64, 48, 3))
+        self.assertEqual(decode_compressed_frame(frame_data).shape, self.frame.shape)
+
+    def test_bare_frame_has_no_header(self) -> None:
+        """A frame without the magic is returned as a whole."""
+        message = self.frame.tobytes()
+
+        header, frame_data = decode_frame_header(message)
+
+        self.assertIsNone(header)
+        self.assertEqual(bytes(frame_data), message)
+
+    def test_bare_frame_starting_with_the_magic(self) -> None:
+        """A bare frame starting with the magic by chance is not mistaken for a frame with a header."""
+        message = bytearray(self.frame.tobytes())
+        message[: FRAME_HEADER.size] = FRAME_HEADER.pack(FRAME_MAGIC, FrameEncoding.RAW, 64, 48, 3)
+
+        header, frame_data = decode_frame_header(bytes(message))
+
+        self.assertIsNone(header)
+        self.assertEqual(len(frame_data), len(message))
+
+    def test_unknown_encoding_is_a_bare_frame(self) -> None:
+        """A header with an unknown encoding is treated as part of a bare frame."""
+        message = FRAME_HEADER.pack(FRAME_MAGIC, 200, 64, 48, 3) + self.frame.tobytes()
+
+        header, _ = decode_frame_header(message)
+
+        self.assertIsNone(header)
+
+    def test_shared_memory_frames_are_not_encoded(self) -> None:
+        """Shared memory frames are announced by their writer, not encoded into a message."""
+        with self.assertRaises(ValueError):
+            encode_frame(self.frame, FrameEncoding.SHARED_MEMORY)
+
+    def test_truncated_frame_is_not_decoded(self) -> None:
+        """A truncated compressed frame raises a ValueError."""
+        _, frame_data = decode_frame_header(encode_frame(self.frame, FrameEncoding.PNG))
+
+        with self.assertRaises(ValueError):
+            decode_compressed_frame(frame_data[:20])
+
+
+if __name__ == "__main__":
+    unittest.main()
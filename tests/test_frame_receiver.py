@@ -0,0 +1,253 @@
+"""Tests receiving camera frames from a publisher."""
+# Copyright (C) 2023, NG:ITL
+
+from multiprocessing import resource_tracker
+from tempfile import TemporaryDirectory
+import asyncio
+import unittest
+import time
+import os
+
+from pynng import Pub0
+import numpy as np
+
+from vehicle_tracking_configurator.frame_receiver import ConflatingFrameReceiver, FrameReceiver
+from vehicle_tracking_configurator.frame_protocol import FrameEncoding, encode_frame
+from vehicle_tracking_configurator.shared_frame_memory import SharedFrameWriter
+
+
+FRAME_SHAPE = (2, 4, 3)
+
+
+class FrameReceiverTestCase(unittest.TestCase):
+    """Publishes frames to the receivers under test."""
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.address = f"ipc://{self.directory.name}/camera_frame.ipc"
+        self.publisher = Pub0(listen=self.address)
+
+    def tearDown(self) -> None:
+        self.publisher.close()
+        self.directory.cleanup()
+
+    def create_receiver(self, receiver_type: type[FrameReceiver] = FrameReceiver, **kwargs) -> FrameReceiver:
+        """Creates a receiver connected to the publisher.
+
+        Args:
+            receiver_type (type[FrameReceiver]): The class of the receiver.
+            kwargs: The further arguments of the receiver.
+
+        Returns:
+            FrameReceiver: The receiver.
+        """
+        receiver = receiver_type(self.address, [], FRAME_SHAPE[1], FRAME_SHAPE[0], recv_timeout=200, **kwargs)
+        self.addCleanup(receiver.close)
+        # The publisher drops the frames published before the receiver is connected.
+        time.sleep(0.1)
+        return receiver
+
+    def publish(self, message: bytes) -> None:
+        """Publishes a message and gives the receiver time to receive it.
+
+        Args:
+            message (bytes): The message.
+        """
+        self.publisher.send(message)
+        time.sleep(0.02)
+
+    def publish_frame(self, value: int, encoding: FrameEncoding = FrameEncoding.RAW) -> None:
+        """Publishes a frame filled with a value.
+
+        Args:
+            value (int): The value of every pixel.
+            encoding (FrameEncoding): The encoding of the frame.
+        """
+        self.publish(encode_frame(np.full(FRAME_SHAPE, value, dtype=np.uint8), encoding))
+
+
+class ConflationTest(FrameReceiverTestCase):
+    """Tests that the conflating receivers hand out the newest frame and count the skipped ones."""
+
+    def test_frames_are_read_in_order(self) -> None:
+        """Without conflation every frame is read in the order it was published."""
+        receiver = self.create_receiver()
+        for value in range(1, 4):
+            self.publish_frame(value)
+
+        self.assertEqual([int(receiver.read()[0, 0, 0]) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(receiver.dropped_frames, 0)
+
+    def test_newest_frame_wins(self) -> None:
+        """Frames superseded before they are read are dropped and counted."""
+        receiver = self.create_receiver(ConflatingFrameReceiver)
+        for value in range(1, 6):
+            self.publish_frame(value)
+
+        frame = receiver.read()
+
+        self.assertEqual(frame.shape, FRAME_SHAPE)
+        self.assertTrue(np.all(frame == 5))
+        self.assertEqual(receiver.dropped_frames, 4)
+
+    def test_read_frame_is_not_read_again(self) -> None:
+        """Reading waits for a frame newer than the last read one."""
+        receiver = self.create_receiver(ConflatingFrameReceiver)
+        self.publish_frame(1)
+        receiver.read()
+
+        with self.assertRaises(TimeoutError):
+            receiver.read()
+        self.publish_frame(2)
+        self.assertTrue(np.all(receiver.read() == 2))
+        self.assertEqual(receiver.dropped_frames, 0)
+
+    def test_conflating_aread_skips_to_the_newest_frame(self) -> None:
+        """Reading on the event loop with conflation skips the queued frames."""
+        receiver = self.create_receiver()
+        for value in range(1, 4):
+            self.publish_frame(value)
+
+        frame = asyncio.run(receiver.aread(conflate=True))
+
+        self.assertTrue(np.all(frame == 3))
+        self.assertEqual(receiver.dropped_frames, 2)
+
+
+class FrameGeometryTest(FrameReceiverTestCase):
+    """Tests that the geometry of the frames is learned from their headers."""
+
+    def test_geometry_follows_the_header(self) -> None:
+        """A frame with a header of another geometry is received with that geometry."""
+        receiver = self.create_receiver()
+        self.publish(encode_frame(np.full((6, 8, 3), 4, dtype=np.uint8)))
+
+        frame = receiver.read()
+
+        self.assertEqual(frame.shape, (6, 8, 3))
+        self.assertEqual(receiver.frame_shape, (6, 8, 3))
+        self.assertTrue(np.all(frame == 4))
+
+    def test_bare_frame_has_the_configured_geometry(self) -> None:
+        """A frame without a header is received with the configured geometry."""
+        receiver = self.create_receiver()
+        self.publish(bytes([3]) * int(np.prod(FRAME_SHAPE)))
+
+        frame = receiver.read()
+
+        self.assertEqual(frame.shape, FRAME_SHAPE)
+        self.assertTrue(np.all(frame == 3))
+
+
+class FrameDecodingTest(FrameReceiverTestCase):
+    """Tests decoding compressed frames and dropping frames that can not be used."""
+
+    def test_compressed_frames_are_read_in_order(self) -> None:
+        """Compressed frames are decoded in parallel, but read in the order they were published."""
+        receiver = self.create_receiver()
+        for value in range(1, 5):
+            self.publish_frame(value, FrameEncoding.PNG)
+
+        self.assertEqual([int(receiver.read()[0, 0, 0]) for _ in range(4)], [1, 2, 3, 4])
+        self.assertEqual(receiver.invalid_frames, 0)
+
+    def test_undecodable_frame_is_dropped(self) -> None:
+        """A compressed frame that can not be decoded is dropped and counted, the next frame is read instead."""
+        for receiver_type in (FrameReceiver, ConflatingFrameReceiver):
+            with self.subTest(receiver_type.__name__):
+                receiver = self.create_receiver(receiver_type)
+                self.publish(encode_frame(np.zeros(FRAME_SHAPE, dtype=np.uint8), FrameEncoding.PNG)[:30])
+                self.publish_frame(6, FrameEncoding.PNG)
+
+                self.assertTrue(np.all(receiver.read() == 6))
+                self.assertEqual(receiver.invalid_frames, 1)
+
+    def test_undecodable_frame_is_dropped_on_the_event_loop(self) -> None:
+        """A compressed frame that can not be decoded is also dropped when reading on the event loop."""
+        receiver = self.create_receiver()
+        self.publish(encode_frame(np.zeros(FRAME_SHAPE, dtype=np.uint8), FrameEncoding.JPEG)[:30])
+        self.publish_frame(6, FrameEncoding.PNG)
+
+        self.assertTrue(np.all(asyncio.run(receiver.aread()) == 6))
+        self.assertEqual(receiver.invalid_frames, 1)
+
+    def test_unusable_raw_frames_are_dropped(self) -> None:
+        """A bare frame of the wrong size and a frame that is not BGR are dropped and counted."""
+        receiver = self.create_receiver()
+        self.publish(b"\x00" * 10)
+        self.publish(encode_frame(np.zeros((2, 4, 1), dtype=np.uint8)))
+        self.publish_frame(7)
+
+        self.assertTrue(np.all(receiver.read() == 7))
+        self.assertEqual(receiver.invalid_frames, 2)
+
+
+class SharedMemoryFrameTest(FrameReceiverTestCase):
+    """Tests receiving frames announced to lie in shared memory."""
+
+    def create_writer(self) -> SharedFrameWriter:
+        """Creates a shared memory block to write frames into.
+
+        Returns:
+            SharedFrameWriter: The writer of the block.
+        """
+        writer = SharedFrameWriter(FRAME_SHAPE[1], FRAME_SHAPE[0], slots=2)
+        self.addCleanup(self.close_writer, writer)
+        return writer
+
+    @staticmethod
+    def close_writer(writer: SharedFrameWriter) -> None:
+        """Removes a shared memory block.
+
+        Args:
+            writer (SharedFrameWriter): The writer of the block.
+        """
+        # The receiver unregisters the block, which belongs to another process outside of the tests, so it is
+        # registered again for the writer to remove it.
+        if os.name == "posix":
+            resource_tracker.register(f"/{writer.name.lstrip('/')}", "shared_memory")
+        writer.close()
+
+    def test_shared_frame_is_read_and_verified(self) -> None:
+        """An announced frame is read from the shared memory, and is torn once the writer overwrote it."""
+        receiver = self.create_receiver()
+        writer = self.create_writer()
+        self.publish(writer.write(np.full(FRAME_SHAPE, 8, dtype=np.uint8)))
+
+        frame = receiver.read()
+
+        self.assertTrue(np.all(frame == 8))
+        self.assertTrue(receiver.verify_frame())
+        writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8))
+        writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8))
+        self.assertFalse(receiver.verify_frame())
+        self.assertEqual(receiver.torn_frames, 1)
+
+    def test_overwritten_frame_is_skipped(self) -> None:
+        """An announced frame that was overwritten before it was read is skipped as a torn frame."""
+        receiver = self.create_receiver()
+        writer = self.create_writer()
+        self.publish(writer.write(np.full(FRAME_SHAPE, 1, dtype=np.uint8)))
+        writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8))
+        writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8))
+        self.publish(writer.write(np.full(FRAME_SHAPE, 2, dtype=np.uint8)))
+
+        self.assertTrue(np.all(receiver.read() == 2))
+        self.assertEqual(receiver.torn_frames, 1)
+
+    def test_unreadable_shared_frames_are_dropped(self) -> None:
+        """A frame in a removed block and a truncated message are dropped and counted, the next frame is read."""
+        receiver = self.create_receiver()
+        removed_writer = SharedFrameWriter(FRAME_SHAPE[1], FRAME_SHAPE[0], slots=2)
+        self.publish(removed_writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8)))
+        removed_writer.close()
+        writer = self.create_writer()
+        self.publish(writer.write(np.zeros(FRAME_SHAPE, dtype=np.uint8))[:12])
+        self.publish(writer.write(np.full(FRAME_SHAPE, 3, dtype=np.uint8)))
+
+        self.assertTrue(np.all(receiver.read() == 3))
+        self.assertEqual(receiver.invalid_frames, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests the shared memory transport of camera frames."""
+# Copyright (C) 2023, NG:ITL
+
+from multiprocessing import resource_tracker
+import unittest
+import os
+
+import numpy as np
+
+from vehicle_tracking_configurator.frame_protocol import FrameEncoding, decode_frame_header
+from vehicle_tracking_configurator.shared_frame_memory import (
+    SHARED_FRAME_MESSAGE,
+    SharedFrame,
+    SharedFrameReader,
+    SharedFrameWriter,
+    decode_shared_frame,
+)
+
+
+class SharedFrameMemoryTest(unittest.TestCase):
+    """Tests reading frames from the shared memory block of a writer."""
+
+    def setUp(self) -> None:
+        self.writer = SharedFrameWriter(64, 48, slots=4)
+        self.reader = SharedFrameReader()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self) -> None:
+        self.reader.close()
+        # The reader unregisters the block, which belongs to another process outside of the tests, so it is
+        # registered again for the writer to remove it.
+        if os.name == "posix":
+            resource_tracker.register(f"/{self.writer.name.lstrip('/')}", "shared_memory")
+        self.writer.close()
+
+    def write(self) -> tuple[np.ndarray, bytes]:
+        """Writes a random frame.
+
+        Returns:
+            tuple[np.ndarray, bytes]: The frame and the message announcing it.
+        """
+        frame = self.rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        return frame, self.writer.write(frame)
+
+    def test_announced_frame_is_read(self) -> None:
+        """The announced frame is read from the shared memory block without a copy."""
+        frame, message = self.write()
+        header, frame_data = decode_frame_header(message)
+        assert header is not None
+        shared_frame = decode_shared_frame(frame_data)
+
+        self.assertEqual(header.encoding, FrameEncoding.SHARED_MEMORY)
+        self.assertEqual(shared_frame.name.lstrip("/"), self.writer.name.lstrip("/"))
+        read_frame = self.reader.read(header, shared_frame)
+        assert read_frame is not None
+        np.testing.assert_array_equal(read_frame, frame)
+        self.assertTrue(self.reader.is_intact(header, shared_frame))
+
+    def test_overwritten_frame_is_torn(self) -> None:
+        """A frame the writer overwrote after it was read is detected, and is not read anymore."""
+        frame, message = self.write()
+        header, frame_data = decode_frame_header(message)
+        assert header is not None
+        shared_frame = decode_shared_frame(frame_data)
+        read_frame = self.reader.read(header, shared_frame)
+        assert read_frame is not None
+        np.testing.assert_array_equal(read_frame, frame)
+
+        for _ in range(4):
+            self.write()
+
+        self.assertFalse(self.reader.is_intact(header, shared_frame))
+        self.assertIsNone(self.reader.read(header, shared_frame))
+
+    def test_frame_outside_of_the_block_is_rejected(self) -> None:
+        """A slot outside of the shared memory block raises a ValueError."""
+        _, message = self.write()
+        header, frame_data = decode_frame_header(message)
+        assert header is not None
+        shared_frame = decode_shared_frame(frame_data)
+
+        with self.assertRaises(ValueError):
+            self.reader.read(header, SharedFrame(shared_frame.name, 100, shared_frame.sequence, shared_frame.timestamp))
+
+    def test_removed_block_is_rejected(self) -> None:
+        """A frame in a block the writer already removed raises a ValueError."""
+        writer = SharedFrameWriter(64, 48, slots=2)
+        header, frame_data = decode_frame_header(writer.write(np.zeros((48, 64, 3), dtype=np.uint8)))
+        assert header is not None
+        writer.close()
+
+        with self.assertRaises(ValueError):
+            self.reader.read(header, decode_shared_frame(frame_data))
+
+    def test_truncated_message_is_rejected(self) -> None:
+        """A truncated message or one without the name of the block raises a ValueError."""
+        _, message = self.write()
+        _, frame_data = decode_frame_header(message)
+
+        with self.assertRaises(ValueError):
+            decode_shared_frame(frame_data[:5])
+        with self.assertRaises(ValueError):
+            decode_shared_frame(frame_data[: SHARED_FRAME_MESSAGE.size])
+
+    def test_mis_sized_frame_is_not_written(self) -> None:
+        """A frame of the wrong size raises a ValueError."""
+        with self.assertRaises(ValueError):
+            self.writer.write(np.zeros((10, 10, 3), dtype=np.uint8))
+
+
+if __name__ == "__main__":
+    unittest.main()
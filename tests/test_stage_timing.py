@@ -0,0 +1,128 @@
+"""Tests timing the stages of the frame pipeline."""
+# Copyright (C) 2023, NG:ITL
+
+from tempfile import TemporaryDirectory
+from unittest import mock
+from threading import Thread
+from pathlib import Path
+from json import load
+import unittest
+
+from vehicle_tracking_configurator.stage_timing import TOTAL_STAGE, StageTimer, format_summary
+
+
+class StageTimerTest(unittest.TestCase):
+    """Tests the durations recorded by the stage timer on a fake clock."""
+
+    def setUp(self) -> None:
+        self.now_ns = 0
+        patcher = mock.patch("vehicle_tracking_configurator.stage_timing.time.perf_counter_ns", lambda: self.now_ns)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def advance(self, milliseconds: float) -> None:
+        """Advances the fake clock.
+
+        Args:
+            milliseconds (float): The time to advance by.
+        """
+        self.now_ns += round(milliseconds * 1e6)
+
+    def time_frame(self, timer: StageTimer, receive_ms: float, render_ms: float) -> None:
+        """Times a frame with a receive and a render stage.
+
+        Args:
+            timer (StageTimer): The timer.
+            receive_ms (float): The duration of the receive stage.
+            render_ms (float): The duration of the render stage.
+        """
+        timer.start()
+        self.advance(receive_ms)
+        timer.lap("receive")
+        self.advance(render_ms)
+        timer.lap("render")
+        timer.finish()
+
+    def test_stages_are_timed_from_the_previous_stage(self) -> None:
+        """Every stage is timed from the end of the previous one, the total from the start of the frame."""
+        timer = StageTimer(enabled=True)
+        self.time_frame(timer, 2, 5)
+
+        summary = timer.summary()
+
+        self.assertEqual(list(summary), ["receive", "render", TOTAL_STAGE])
+        self.assertEqual(summary["receive"]["mean_ms"], 2)
+        self.assertEqual(summary["render"]["mean_ms"], 5)
+        self.assertEqual(summary[TOTAL_STAGE]["mean_ms"], 7)
+
+    def test_disabled_timer_records_nothing(self) -> None:
+        """A disabled timer does not record any stage."""
+        timer = StageTimer()
+        self.time_frame(timer, 2, 5)
+
+        self.assertEqual(timer.summary(), {})
+
+    def test_summary_covers_the_window(self) -> None:
+        """The statistics and the histogram only cover the last frames of the window, the frames are all counted."""
+        timer = StageTimer(enabled=True, window=3)
+        for render_ms in (100, 100, 1, 2, 3):
+            self.time_frame(timer, 0, render_ms)
+
+        render = timer.summary()["render"]
+
+        self.assertEqual(render["frames"], 5)
+        self.assertEqual(render["mean_ms"], 2)
+        self.assertEqual(render["max_ms"], 3)
+        self.assertEqual(sum(render["histogram"]["counts"]), 3)
+        self.assertEqual(render["histogram"]["counts"][7:9], [1, 2])
+
+    def test_stages_on_other_threads_are_timed_from_resume(self) -> None:
+        """A stage on another thread is timed from the resume on that thread."""
+        timer = StageTimer(enabled=True)
+        timer.start()
+        self.advance(4)
+
+        def render() -> None:
+            timer.resume()
+            self.advance(3)
+            timer.lap("render")
+
+        thread = Thread(target=render)
+        thread.start()
+        thread.join()
+        timer.finish()
+
+        summary = timer.summary()
+        self.assertEqual(summary["render"]["mean_ms"], 3)
+        self.assertEqual(summary[TOTAL_STAGE]["mean_ms"], 7)
+
+    def test_summary_is_dumped_on_close(self) -> None:
+        """The summary is written to the dump file when the timer is closed."""
+        with TemporaryDirectory() as directory:
+            dump_file = Path(directory) / "frame_timing.json"
+            timer = StageTimer(enabled=True, dump_file=dump_file)
+            self.time_frame(timer, 2, 5)
+
+            timer.close()
+
+            with open(dump_file, "r", encoding="utf-8") as timing_file:
+                self.assertEqual(load(timing_file), timer.summary())
+
+    def test_summary_is_formatted_per_stage(self) -> None:
+        """The formatted summary has a header and a line per stage."""
+        timer = StageTimer(enabled=True)
+        self.time_frame(timer, 2, 5)
+
+        lines = format_summary(timer.summary()).splitlines()
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith("receive"))
+
+    def test_window_needs_a_frame(self) -> None:
+        """A window without frames raises a ValueError."""
+        with self.assertRaises(ValueError):
+            StageTimer(window=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+"""Tests transforming points between image and world coordinates."""
+# Copyright (C) 2023, NG:ITL
+
+from tempfile import TemporaryDirectory
+from pathlib import Path
+import unittest
+
+import numpy as np
+
+from vehicle_tracking_configurator.topview_transformation import CameraModel, TopviewTransformation
+
+
+FRAME_SIZE = (320, 240)
+CORNERS = {
+    "top_left": ((60, 40), (0.0, 0.0)),
+    "top_right": ((250, 50), (7.5, 0.0)),
+    "bottom_left": ((20, 220), (0.0, 5.0)),
+    "bottom_right": ((300, 210), (7.5, 5.0)),
+}
+CAMERA_MODEL = CameraModel(
+    np.array([[300.0, 0.0, 160.0], [0.0, 300.0, 120.0], [0.0, 0.0, 1.0]]), np.array([-0.2, 0.05, 0.0, 0.0, 0.0])
+)
+
+
+def create_transformation(**kwargs) -> TopviewTransformation:
+    """Creates a transformation of the corner points.
+
+    Args:
+        kwargs: The arguments of the transformation.
+
+    Returns:
+        TopviewTransformation: The transformation.
+    """
+    transformation = TopviewTransformation(**kwargs)
+    for point_name, (image_point, world_point) in CORNERS.items():
+        transformation.set_transformation_point(point_name, image_point, world_point)
+    return transformation
+
+
+class TopviewTransformationTest(unittest.TestCase):
+    """Tests the transformation of the four corners and of more points."""
+
+    def setUp(self) -> None:
+        self.transformation = create_transformation()
+
+    def test_corners_are_transformed_exactly(self) -> None:
+        """The four corners define the transformation exactly, in both directions."""
+        self.assertIsNone(self.transformation.error)
+        for point_name, (image_point, world_point) in CORNERS.items():
+            np.testing.assert_allclose(
+                self.transformation.image_to_world_transform(image_point), world_point, atol=1e-3
+            )
+            np.testing.assert_allclose(
+                self.transformation.world_to_image_transform_batch(np.array([world_point]))[0],
+                image_point,
+                atol=1e-3,
+                err_msg=point_name,
+            )
+        self.assertAlmostEqual(self.transformation.rms_reprojection_error or 0.0, 0.0)
+
+    def test_batch_transforms_match_single_transforms(self) -> None:
+        """The batch transforms give the same points as the single point transforms, and invert each other."""
+        image_points = np.random.default_rng(0).uniform(0, 240, (50, 2))
+
+        world_points = self.transformation.image_to_world_transform_batch(image_points)
+
+        for image_point, world_point in zip(image_points, world_points):
+            np.testing.assert_allclose(
+                self.transformation.image_to_world_transform(tuple(image_point)), world_point, atol=1e-3
+            )
+        np.testing.assert_allclose(self.transformation.world_to_image_transform_batch(world_points), image_points)
+
+    def test_batch_transforms_check_the_shape(self) -> None:
+        """An empty batch gives no points, a batch that is not Nx2 raises a ValueError."""
+        self.assertEqual(self.transformation.image_to_world_transform_batch(np.zeros((0, 2))).shape, (0, 2))
+        with self.assertRaises(ValueError):
+            self.transformation.image_to_world_transform_batch(np.zeros((3, 3)))
+
+    def test_unset_points_are_degenerate(self) -> None:
+        """Without points every point is transformed to (0, 0) and the error is reported."""
+        transformation = TopviewTransformation()
+
+        self.assertIsNotNone(transformation.error)
+        self.assertIsNone(transformation.rms_reprojection_error)
+        self.assertIsNone(transformation.get_topview_size(50))
+        self.assertEqual(transformation.image_to_world_transform((100, 100)), (0.0, 0.0))
+
+    def test_collinear_corners_are_degenerate(self) -> None:
+        """Three collinear corners do not define a transformation."""
+        self.transformation.set_transformation_point("bottom_right", (440, 60), (7.5, 5.0))
+
+        self.assertIn("collinear", self.transformation.error or "")
+        self.assertEqual(self.transformation.image_to_world_transform((100, 100)), (0.0, 0.0))
+
+    def test_collinear_points_are_degenerate(self) -> None:
+        """More than four points on a line can not be fitted."""
+        transformation = TopviewTransformation()
+        for index in range(6):
+            name = list(CORNERS)[index] if index < 4 else f"point_{index}"
+            transformation.set_transformation_point(name, (index * 10, index * 20), (index, index / 2))
+
+        self.assertIn("All of the image points are collinear", transformation.error or "")
+
+    def test_consistent_additional_point_keeps_the_transformation(self) -> None:
+        """An additional point on the transformation of the corners does not change it."""
+        image_point = (150, 120)
+        world_point = self.transformation.image_to_world_transform_batch(np.array([image_point]))[0]
+        expected = self.transformation.image_to_world_transform((200, 100))
+
+        self.transformation.set_transformation_point("point_4", image_point, tuple(world_point))
+
+        self.assertEqual(self.transformation.point_names, [*CORNERS, "point_4"])
+        self.assertIsNone(self.transformation.error)
+        np.testing.assert_allclose(self.transformation.image_to_world_transform((200, 100)), expected, atol=2e-3)
+        self.assertLess(self.transformation.rms_reprojection_error or 0.0, 1e-6)
+
+    def test_least_squares_spreads_the_error(self) -> None:
+        """A wrong additional point is fitted by least squares, which spreads its error over all points."""
+        self.transformation.set_transformation_point("point_4", (150, 120), (1.0, 4.0))
+
+        errors = self.transformation.reprojection_errors
+        self.assertEqual(list(errors), [*CORNERS, "point_4"])
+        self.assertTrue(all(error > 1e-3 for error in errors.values()))
+
+    def test_ransac_leaves_out_the_outlier(self) -> None:
+        """RANSAC fits the consistent points exactly and leaves out the wrong one."""
+        transformation = create_transformation(fit_method="ransac", ransac_threshold=0.05)
+        consistent_points = np.array([(150, 120), (100, 80), (220, 180)])
+        for index, (image_point, world_point) in enumerate(
+            zip(consistent_points, transformation.image_to_world_transform_batch(consistent_points))
+        ):
+            transformation.set_transformation_point(f"point_{index + 4}", tuple(image_point), tuple(world_point))
+        transformation.set_transformation_point("point_7", (200, 60), (1.0, 4.0))
+
+        errors = transformation.reprojection_errors
+        self.assertLess(transformation.rms_reprojection_error or 1.0, 1e-3)
+        self.assertGreater(errors["point_7"], 1.0)
+        self.assertTrue(all(error < 1e-3 for point_name, error in errors.items() if point_name != "point_7"))
+
+    def test_corners_can_not_be_removed(self) -> None:
+        """Only additional points can be removed."""
+        self.transformation.set_transformation_point("point_4", (150, 120), (3.0, 2.0))
+        self.transformation.remove_transformation_point("point_4")
+
+        self.assertEqual(self.transformation.point_names, list(CORNERS))
+        with self.assertRaises(ValueError):
+            self.transformation.remove_transformation_point("top_left")
+        with self.assertRaises(ValueError):
+            self.transformation.remove_transformation_point("point_4")
+
+    def test_invalid_settings_are_rejected(self) -> None:
+        """An unknown fit method or an invalid camera model raise a ValueError."""
+        with self.assertRaises(ValueError):
+            TopviewTransformation(fit_method="median")
+        with self.assertRaises(ValueError):
+            TopviewTransformation(camera_model=CameraModel(np.eye(3), np.zeros(3)))
+
+
+class ImageToWorldMapTest(unittest.TestCase):
+    """Tests that looking points up in the image to world map matches transforming them directly."""
+
+    def assert_map_matches_transform(self, transformation: TopviewTransformation) -> None:
+        """Checks every pixel of the image to world map against the batch transform.
+
+        Args:
+            transformation (TopviewTransformation): The transformation.
+        """
+        width, height = FRAME_SIZE
+        image_to_world_map = transformation.get_image_to_world_map(width, height)
+        xs, ys = np.meshgrid(np.arange(width), np.arange(height))
+        pixels = np.stack([xs.ravel(), ys.ravel()], axis=1)
+
+        world_points = transformation.image_to_world_transform_batch(pixels)
+
+        self.assertEqual(image_to_world_map.shape, (height, width, 2))
+        np.testing.assert_allclose(image_to_world_map.reshape(-1, 2), world_points, atol=1e-4)
+
+    def test_map_matches_the_transform(self) -> None:
+        """The map holds the transformed coordinates of every pixel."""
+        self.assert_map_matches_transform(create_transformation())
+
+    def test_undistorted_map_matches_the_transform(self) -> None:
+        """With a camera model the map holds the transformed coordinates of the undistorted pixels."""
+        self.assert_map_matches_transform(create_transformation(camera_model=CAMERA_MODEL))
+
+    def test_lookup_matches_the_transform(self) -> None:
+        """A lookup gives the directly transformed point before and after the map is built, and outside of it."""
+        transformation = create_transformation()
+        points = [(0, 0), (150, 120), (319, 239), (400, 100), (-5, 10)]
+        expected = [transformation.image_to_world_transform(point) for point in points]
+
+        self.assertFalse(transformation.has_image_to_world_map(*FRAME_SIZE))
+        lookups_without_map = [transformation.image_to_world_lookup(point, FRAME_SIZE) for point in points]
+        transformation.get_image_to_world_map(*FRAME_SIZE)
+        self.assertTrue(transformation.has_image_to_world_map(*FRAME_SIZE))
+        lookups_with_map = [transformation.image_to_world_lookup(point, FRAME_SIZE) for point in points]
+
+        self.assertEqual(lookups_without_map, expected)
+        np.testing.assert_allclose(lookups_with_map, expected, atol=2e-3)
+
+    def test_changed_point_drops_the_map(self) -> None:
+        """A changed point drops the map, which is built again for the new points."""
+        transformation = create_transformation()
+        transformation.get_image_to_world_map(*FRAME_SIZE)
+
+        transformation.set_transformation_point("top_left", (70, 40), (0.0, 0.0))
+
+        self.assertFalse(transformation.has_image_to_world_map(*FRAME_SIZE))
+        self.assert_map_matches_transform(transformation)
+
+    def test_cached_map_is_reused(self) -> None:
+        """The map is cached on disk by its points, and reused by another transformation with the same points."""
+        with TemporaryDirectory() as cache_dir:
+            first = create_transformation(cache_dir=Path(cache_dir)).get_image_to_world_map(*FRAME_SIZE)
+            second = create_transformation(cache_dir=Path(cache_dir)).get_image_to_world_map(*FRAME_SIZE)
+
+            self.assertEqual(len(list(Path(cache_dir).glob("*.npy"))), 1)
+            np.testing.assert_array_equal(first, second)
+            del first, second
+
+    def test_disabled_cache_keeps_the_map_in_memory(self) -> None:
+        """After the cache is disabled, the map is built again without writing it to disk."""
+        with TemporaryDirectory() as cache_dir:
+            transformation = create_transformation(cache_dir=Path(cache_dir))
+
+            self.assertTrue(transformation.disable_cache())
+            self.assertFalse(transformation.disable_cache())
+            self.assert_map_matches_transform(transformation)
+            self.assertEqual(list(Path(cache_dir).iterdir()), [])
+
+    def test_distortion_round_trip(self) -> None:
+        """Distorting undistorted points gives the original points."""
+        transformation = TopviewTransformation(camera_model=CAMERA_MODEL)
+        points = np.random.default_rng(0).uniform(20, 220, (50, 2))
+
+        undistorted_points = transformation.undistort_points(points)
+
+        self.assertGreater(np.abs(undistorted_points - points).max(), 1.0)
+        np.testing.assert_allclose(transformation.distort_points(undistorted_points), points, atol=1e-2)
+
+
+class TopviewMapsTest(unittest.TestCase):
+    """Tests warping the camera frame to the top view."""
+
+    def test_corners_are_warped_to_the_edges(self) -> None:
+        """A spot at a corner of the area ends up at the corner of the top view."""
+        transformation = create_transformation()
+        frame = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+        frame[205:216, 295:306] = 255
+        size = transformation.get_topview_size(20)
+        assert size is not None
+        output = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+
+        transformation.warp_to_topview(frame, output)
+
+        self.assertEqual(size, (150, 100))
+        self.assertEqual(output[-1, -1].tolist(), [255, 255, 255])
+        self.assertEqual(output[0, 0].tolist(), [0, 0, 0])
+
+    def test_maps_are_cached_until_a_point_changes(self) -> None:
+        """The maps are built once per set of points and size."""
+        transformation = create_transformation()
+        maps = transformation.get_topview_maps(FRAME_SIZE, (150, 100))
+
+        self.assertIs(transformation.get_topview_maps(FRAME_SIZE, (150, 100)), maps)
+        transformation.set_transformation_point("top_left", (70, 40), (0.0, 0.0))
+        self.assertIsNot(transformation.get_topview_maps(FRAME_SIZE, (150, 100)), maps)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+"""Benchmarks the drawer and shower render pipeline of the configurator without starting the UI."""
+# Copyright (C) 2023, NG:ITL
+
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timezone
+from json import dump, dumps, load, loads
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from typing import Any, Callable, NamedTuple
+from itertools import product
+from functools import partial
+from pathlib import Path
+import subprocess
+import tracemalloc
+import platform
+import time
+import sys
+
+import numpy as np
+import pynng
+import cv2
+
+
+BASE_DIR = Path(__file__).parent.parent
+RESULTS_DIR = BASE_DIR / "benchmark_results"
+
+sys.path.insert(0, str(BASE_DIR))
+
+from vehicle_tracking_configurator.configurator import (
+    ConfiguratorHandler,
+    VIDEO_SIZE,
+    DRAWER_VIEW,
+    SHOWER_VIEW,
+    TOPVIEW_VIEW,
+    VIEWS,
+)
+
+
+TRANSFORMATION_SETUPS: dict[str, dict[str, dict[str, list[float]]]] = {
+    "unset": {},
+    "corners": {
+        "top_left": {"image": [0, 0], "real_world": [0.0, 0.0]},
+        "top_right": {"image": [VIDEO_SIZE[0] - 1, 0], "real_world": [7.5, 0.0]},
+        "bottom_left": {"image": [0, VIDEO_SIZE[1] - 1], "real_world": [0.0, 5.0]},
+        "bottom_right": {"image": [VIDEO_SIZE[0] - 1, VIDEO_SIZE[1] - 1], "real_world": [7.5, 5.0]},
+    },
+    "perspective": {
+        "top_left": {"image": [420, 180], "real_world": [0.0, 0.0]},
+        "top_right": {"image": [910, 180], "real_world": [7.5, 0.0]},
+        "bottom_left": {"image": [60, 930], "real_world": [0.0, 5.0]},
+        "bottom_right": {"image": [1270, 930], "real_world": [7.5, 5.0]},
+    },
+}
+
+
+class Scenario(NamedTuple):
+    """A configuration the render pipeline is benchmarked with.
+
+    Args:
+        roi_vertices (int): The number of vertices of the region of interest.
+        transformation_setup (str): The name of the transformation point setup.
+    """
+
+    roi_vertices: int
+    transformation_setup: str
+
+
+class SyntheticFrameSource:
+    """Publishes synthetic camera frames on a pynng Pub0 socket.
+
+    Args:
+        address (str): The address to publish the frames on.
+        fps (float): The publishing rate, 0 to publish as fast as possible.
+    """
+
+    def __init__(self, address: str, fps: float) -> None:
+        self.__publisher = pynng.Pub0(listen=address)
+        self.__interval = 1 / fps if fps > 0 else 0.0
+
+        rng = np.random.default_rng(0)
+        gradient = np.linspace(0, 255, VIDEO_SIZE[0], dtype=np.float32)
+        self.__frames: list[bytes] = []
+        for shift in range(8):
+            frame = np.empty((VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+            frame[...] = np.roll(gradient, shift * 32).astype(np.uint8)[np.newaxis, :, np.newaxis]
+            frame[..., 1] = rng.integers(0, 256, (VIDEO_SIZE[1], VIDEO_SIZE[0]), dtype=np.uint8)
+            self.__frames.append(frame.tobytes())
+
+        self.__stop_event = Event()
+        self.__thread = Thread(target=self.__publish_worker, daemon=True)
+
+    def start(self) -> None:
+        """Starts publishing frames."""
+        self.__thread.start()
+
+    def __publish_worker(self) -> None:
+        """Constantly publishes frames."""
+        frame_index = 0
+        while not self.__stop_event.is_set():
+            self.__publisher.send(self.__frames[frame_index % len(self.__frames)])
+            frame_index += 1
+            if self.__interval > 0:
+                time.sleep(self.__interval)
+
+    def close(self) -> None:
+        """Stops publishing and closes the socket."""
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__publisher.close()
+
+
+class StandInTracker:
+    """Answers the configuration requests of the configurator like the vehicle tracker would.
+
+    Args:
+        address (str): The address to listen for configuration requests on.
+    """
+
+    def __init__(self, address: str) -> None:
+        self.__replier = pynng.Rep0(listen=address, recv_timeout=200)
+        self.payload: dict[str, Any] = {}
+
+        self.__stop_event = Event()
+        self.__thread = Thread(target=self.__reply_worker, daemon=True)
+        self.__thread.start()
+
+    def __reply_worker(self) -> None:
+        """Constantly answers requests."""
+        while not self.__stop_event.is_set():
+            try:
+                request = loads(self.__replier.recv())
+            except pynng.Timeout:
+                continue
+
+            match request.get("request_type"):
+                case "get_config":
+                    self.__replier.send(dumps({"status": 0, "payload": self.payload}).encode("utf-8"))
+                case "set_config":
+                    self.payload = request["payload"]
+                    self.__replier.send(dumps({"status": 0}).encode("utf-8"))
+
+    def close(self) -> None:
+        """Stops answering and closes the socket."""
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__replier.close()
+
+
+def create_region_of_interest(vertex_count: int) -> list[list[int]]:
+    """Creates an elliptic region of interest inside the frame.
+
+    Args:
+        vertex_count (int): The number of vertices.
+
+    Returns:
+        list[list[int]]: The vertices of the region of interest.
+    """
+    angles = np.linspace(0, 2 * np.pi, vertex_count, endpoint=False)
+    center_x, center_y = VIDEO_SIZE[0] / 2, VIDEO_SIZE[1] / 2
+    xs = center_x + np.cos(angles) * VIDEO_SIZE[0] * 0.45
+    ys = center_y + np.sin(angles) * VIDEO_SIZE[1] * 0.45
+    return [[int(x), int(y)] for x, y in zip(xs, ys)]
+
+
+def summarize(samples_ns: list[int], alloc_bytes: list[int]) -> dict[str, float]:
+    """Summarizes the measurements of a stage.
+
+    Args:
+        samples_ns (list[int]): The durations of the stage in nanoseconds.
+        alloc_bytes (list[int]): The peak number of bytes allocated by the stage per frame.
+
+    Returns:
+        dict[str, float]: The summary of the stage.
+    """
+    samples_ms = np.array(samples_ns, dtype=np.float64) / 1e6
+    return {
+        "p50_ms": round(float(np.percentile(samples_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(samples_ms, 99)), 4),
+        "mean_ms": round(float(samples_ms.mean()), 4),
+        "alloc_bytes": int(np.median(alloc_bytes)) if alloc_bytes else 0,
+    }
+
+
+def read_frames(handler: ConfiguratorHandler) -> None:
+    """Reads and renders a frame, and releases the rendered frames right away as there is no UI showing them.
+
+    Args:
+        handler (ConfiguratorHandler): The handler to read the frame with.
+    """
+    for view, frame in zip(VIEWS, handler.read_frames()):
+        if frame is not None:
+            handler.release_frame(view, frame)
+
+
+def run_scenario(
+    handler: ConfiguratorHandler, tracker: StandInTracker, scenario: Scenario, args: Namespace
+) -> dict[str, Any]:
+    """Benchmarks the render pipeline with one configuration.
+
+    Args:
+        handler (ConfiguratorHandler): The handler to benchmark.
+        tracker (StandInTracker): The tracker the handler receives its configuration from.
+        scenario (Scenario): The configuration to benchmark.
+        args (Namespace): The command line arguments.
+
+    Returns:
+        dict[str, Any]: The results of the scenario.
+    """
+    payload: dict[str, Any] = {"transformation_points": TRANSFORMATION_SETUPS[scenario.transformation_setup]}
+    if scenario.roi_vertices > 0:
+        payload["region_of_interest"] = create_region_of_interest(scenario.roi_vertices)
+    tracker.payload = payload
+    handler.receive_config()
+
+    stages: dict[str, Callable[[], Any]] = {"read_frames": partial(read_frames, handler)}
+
+    for _ in range(args.warmup):
+        for stage in stages.values():
+            stage()
+
+    durations: dict[str, list[int]] = {name: [] for name in stages}
+    handler.stage_timer.reset()
+    start = time.perf_counter_ns()
+    for _ in range(args.frames):
+        for name, stage in stages.items():
+            stage_start = time.perf_counter_ns()
+            stage()
+            durations[name].append(time.perf_counter_ns() - stage_start)
+        handler.stage_timer.finish()
+    elapsed_ns = time.perf_counter_ns() - start
+    pipeline_stages = handler.stage_timer.summary()
+
+    allocations: dict[str, list[int]] = {name: [] for name in stages}
+    tracemalloc.start()
+    for _ in range(args.alloc_frames):
+        for name, stage in stages.items():
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+            allocations[name].append(peak - baseline)
+    tracemalloc.stop()
+
+    return {
+        "roi_vertices": scenario.roi_vertices,
+        "transformation_setup": scenario.transformation_setup,
+        "fps": round(args.frames / (elapsed_ns / 1e9), 2),
+        "dropped_frames": handler.dropped_frames,
+        "stages": {name: summarize(durations[name], allocations[name]) for name in stages},
+        "pipeline_stages": {
+            name: {key: stats[key] for key in ("p50_ms", "p99_ms", "mean_ms")}
+            for name, stats in pipeline_stages.items()
+        },
+    }
+
+
+def get_commit() -> str:
+    """Returns the commit the benchmark runs on.
+
+    Returns:
+        str: The abbreviated commit hash, or "unknown" outside of a git checkout.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return result.stdout.strip()
+
+
+def print_comparison(results: dict[str, Any], baseline_path: Path) -> None:
+    """Prints the change of the results relative to an earlier run.
+
+    Args:
+        results (dict[str, Any]): The results of this run.
+        baseline_path (Path): The results file of the earlier run.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+        baseline = load(baseline_file)
+
+    baseline_scenarios = {(s["roi_vertices"], s["transformation_setup"]): s for s in baseline["scenarios"]}
+    print(f"\nCompared to {baseline['commit']} ({baseline_path}):")
+    for scenario in results["scenarios"]:
+        key = (scenario["roi_vertices"], scenario["transformation_setup"])
+        if key not in baseline_scenarios:
+            continue
+        old_fps = baseline_scenarios[key]["fps"]
+        print(f"  roi={key[0]:<4} setup={key[1]:<12} fps {old_fps:>8.1f} -> {scenario['fps']:>8.1f}")
+
+
+def parse_args() -> Namespace:
+    """Parses the command line arguments.
+
+    Returns:
+        Namespace: The parsed arguments.
+    """
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="unmeasured frames before each scenario")
+    parser.add_argument("--alloc-frames", type=int, default=20, help="frames traced for allocations per scenario")
+    parser.add_argument("--fps", type=float, default=0, help="publishing rate of the frame source, 0 for unlimited")
+    parser.add_argument("--roi-vertices", type=int, nargs="+", default=[0, 4, 32, 256])
+    parser.add_argument("--transformation-setups", nargs="+", default=list(TRANSFORMATION_SETUPS))
+    parser.add_argument("--conflate", action="store_true", help="use the conflating frame receiver")
+    parser.add_argument("--render-workers", type=int, default=2, help="views rendered concurrently, 1 for sequential")
+    parser.add_argument(
+        "--view-size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="displayed size of the views"
+    )
+    parser.add_argument("--topview", action="store_true", help="render the top view as well")
+    parser.add_argument("--output", type=Path, help="results file, defaults to benchmark_results/<commit>.json")
+    parser.add_argument("--compare", type=Path, help="results file of an earlier run to compare against")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Runs all benchmark scenarios and stores the results."""
+    args = parse_args()
+
+    with TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        frame_address = f"ipc://{(tmp_path / 'camera_frame.ipc').as_posix()}"
+        tracker_address = f"ipc://{(tmp_path / 'tracker_config.ipc').as_posix()}"
+
+        config_path = tmp_path / "vehicle_tracking_configurator_config.json"
+        with open(BASE_DIR / "vehicle_tracking_configurator_config.json", "r", encoding="utf-8") as config_file:
+            config = load(config_file)
+        config["pynng"]["subscribers"]["camera_frame_receiver"]["address"] = frame_address
+        config["pynng"]["subscribers"]["tracker_config"]["address"] = tracker_address
+        config.setdefault("frame_pipeline", {})["conflate"] = args.conflate
+        config["frame_pipeline"]["render_workers"] = args.render_workers
+        config["frame_pipeline"]["timing"] = {"enabled": True, "window": args.frames, "log_interval": 0}
+        with open(config_path, "w", encoding="utf-8") as config_file:
+            dump(config, config_file, indent=4)
+
+        frame_source = SyntheticFrameSource(frame_address, args.fps)
+        tracker = StandInTracker(tracker_address)
+        handler = ConfiguratorHandler(config_path)
+        if args.view_size is not None:
+            for view in (DRAWER_VIEW, SHOWER_VIEW, TOPVIEW_VIEW):
+                handler.set_view_size(view, *args.view_size)
+        handler.set_view_visible(TOPVIEW_VIEW, args.topview)
+        frame_source.start()
+
+        scenarios = []
+        try:
+            for roi_vertices, setup in product(args.roi_vertices, args.transformation_setups):
+                scenario = run_scenario(handler, tracker, Scenario(roi_vertices, setup), args)
+                read_frames, stages = scenario["stages"]["read_frames"], scenario["pipeline_stages"]
+                print(
+                    f"roi={roi_vertices:<4} setup={setup:<12} fps={scenario['fps']:>8.1f}  "
+                    f"read_frames p50/p99={read_frames['p50_ms']:.2f}/{read_frames['p99_ms']:.2f} ms  "
+                    f"receive/drawer overlay/shower composite p50="
+                    f"{stages['receive']['p50_ms']:.2f}/{stages['drawer_overlay']['p50_ms']:.2f}/"
+                    f"{stages['shower_composite']['p50_ms']:.2f} ms"
+                )
+                scenarios.append(scenario)
+        finally:
+            handler.close()
+            tracker.close()
+            frame_source.close()
+
+    results = {
+        "commit": get_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "video_size": list(VIDEO_SIZE),
+        "frames": args.frames,
+        "conflate": args.conflate,
+        "render_workers": args.render_workers,
+        "view_size": args.view_size,
+        "topview": args.topview,
+        "scenarios": scenarios,
+    }
+
+    output = args.output or RESULTS_DIR / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        dump(results, output_file, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare is not None:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
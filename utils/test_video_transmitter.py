@@ -2,8 +2,10 @@
 """Transmits a video file over IPC to the RAAI camera frame subscriber.""" ""
 # Copyright (C) 2023, NG:ITL
 
+from argparse import ArgumentParser
 from pathlib import Path
 import time
+import sys
 
 import numpy as np
 import pynng
@@ -12,10 +14,30 @@ import cv2
 
 BASE_DIR = Path(__file__).parent.parent
 
+sys.path.insert(0, str(BASE_DIR))
+
+from vehicle_tracking_configurator.frame_protocol import FrameEncoding, encode_frame
+from vehicle_tracking_configurator.shared_frame_memory import SharedFrameWriter
+
+
+parser = ArgumentParser(description="Transmits a video file over IPC to the RAAI camera frame subscriber.")
+parser.add_argument("--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="resize the frames before sending")
+parser.add_argument("--header", action="store_true", help="prefix the frames with a header describing their size")
+parser.add_argument(
+    "--encoding",
+    choices=[encoding.name.lower() for encoding in FrameEncoding],
+    default="raw",
+    help="compress the frames or pass them through shared memory, implies --header",
+)
+parser.add_argument("--quality", type=int, default=90, help="the JPEG quality (0-100)")
+parser.add_argument("--address", default="ipc:///tmp/RAAI/camera_frame.ipc", help="the address to publish on")
+args = parser.parse_args()
+encoding = FrameEncoding[args.encoding.upper()]
 
 source = cv2.VideoCapture(str(BASE_DIR / "resources" / "test_video_1.h265"))
 
-pub = pynng.Pub0(listen="ipc:///tmp/RAAI/camera_frame.ipc")
+pub = pynng.Pub0(listen=args.address)
+shared_frame_writer: SharedFrameWriter | None = None
 
 print("Starting Transmission")
 
@@ -26,5 +48,14 @@ while True:
         success, image = source.read()
         if not success:
             raise FileNotFoundError("The video file could not be found or read.")
-    pub.send(np.array(image).tobytes())
+    if args.size is not None:
+        image = cv2.resize(image, tuple(args.size), interpolation=cv2.INTER_AREA)
+    if encoding == FrameEncoding.SHARED_MEMORY:
+        if shared_frame_writer is None:
+            shared_frame_writer = SharedFrameWriter(image.shape[1], image.shape[0])
+        pub.send(shared_frame_writer.write(image))
+    elif args.header or encoding != FrameEncoding.RAW:
+        pub.send(encode_frame(image, encoding, args.quality))
+    else:
+        pub.send(np.array(image).tobytes())
     time.sleep(0.016666)
@@ -0,0 +1,67 @@
+"""Provides an asyncio event loop running next to the QT event loop."""
+# Copyright (C) 2023, NG:ITL
+
+from concurrent.futures import Future
+from typing import Any, Coroutine, TypeVar
+from threading import Thread
+import traceback
+import asyncio
+
+
+T = TypeVar("T")
+
+
+class AsyncioBridge:
+    """Runs an asyncio event loop on a single background thread, which the QT side hands coroutines to.
+
+    All sockets used by the submitted coroutines share this one thread instead of blocking a thread each.
+    """
+
+    def __init__(self) -> None:
+        self.__loop = asyncio.new_event_loop()
+        self.__loop_thread = Thread(target=self.__run_loop, name="asyncio_bridge", daemon=True)
+        self.__loop_thread.start()
+
+    def __run_loop(self) -> None:
+        """Runs the event loop until it is stopped."""
+        asyncio.set_event_loop(self.__loop)
+        self.__loop.run_forever()
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> Future[T]:
+        """Schedules a coroutine on the event loop, errors of the coroutine are printed.
+
+        Args:
+            coroutine (Coroutine[Any, Any, T]): The coroutine to run.
+
+        Returns:
+            Future[T]: The result of the coroutine.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.__loop)
+        future.add_done_callback(self.__print_error)
+        return future
+
+    @staticmethod
+    def __print_error(future: Future) -> None:
+        """Prints the error a coroutine failed with.
+
+        Args:
+            future (Future): The result of the coroutine.
+        """
+        if not future.cancelled() and future.exception() is not None:
+            traceback.print_exception(future.exception())
+
+    async def __cancel_tasks(self) -> None:
+        """Cancels all other tasks on the event loop and waits for them to finish."""
+        tasks = {task for task in asyncio.all_tasks() if task is not asyncio.current_task()}
+        # pynng swallows a cancellation if a message arrives at the same time, so the tasks are cancelled until they end.
+        while tasks:
+            for task in tasks:
+                task.cancel()
+            _, tasks = await asyncio.wait(tasks, timeout=0.1)
+
+    def stop(self) -> None:
+        """Cancels all running coroutines and stops the event loop."""
+        asyncio.run_coroutine_threadsafe(self.__cancel_tasks(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__loop_thread.join()
+        self.__loop.close()
@@ -1,25 +1,37 @@
 """The backend handling the configuration"""
 # Copyright (C) 2023, NG:ITL
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from json import load, loads, dumps
 from typing import NamedTuple
 from pathlib import Path
+import traceback
+import asyncio
 
 from jsonschema.exceptions import ValidationError
 from jsonschema import validate
-from pynng import Sub0, Req0
-from PIL import Image
+from pynng import Req0
 import numpy as np
 import cv2
 
-from vehicle_tracking_configurator.topview_transformation import TopviewTransformation
+from vehicle_tracking_configurator.topview_transformation import TopviewTransformation, CameraModel, CORNER_POINTS
+from vehicle_tracking_configurator.frame_receiver import FrameReceiver, ConflatingFrameReceiver
+from vehicle_tracking_configurator.stage_timing import StageTimer
+from vehicle_tracking_configurator.frame_overlays import DrawerOverlay, RegionOfInterestShade
+from vehicle_tracking_configurator.double_frame_buffer import DoubleFrameBuffer
 
 
 REGION_OF_INTEREST = "Region of Interest"
 TRANSFORMATION_POINTS = "Transformation Points"
 FILE_PATH = Path(__file__).parent
+CONFIG_FILE_PATH = Path("./vehicle_tracking_configurator_config.json")
 VIDEO_SIZE = (1332, 990)
 REAL_WORLD_SIZE = (7.5, 5.0)
+DRAWER_VIEW = "point_drawer"
+SHOWER_VIEW = "point_shower"
+TOPVIEW_VIEW = "top_view"
+VIEWS = (DRAWER_VIEW, SHOWER_VIEW, TOPVIEW_VIEW)
+NEW_TRANSFORMATION_POINT = "new"
 
 
 class PointData(NamedTuple):
@@ -39,9 +51,13 @@ class PointData(NamedTuple):
 
 
 class ConfiguratorHandler:
-    """Handles the backend of the configurator."""
+    """Handles the backend of the configurator.
 
-    def __init__(self) -> None:
+    Args:
+        config_path (Path): The path of the configurator config file.
+    """
+
+    def __init__(self, config_path: Path = CONFIG_FILE_PATH) -> None:
         self.__schemas: dict[str, dict] = {}
         schemas = ["configurator_config", "response"]
 
@@ -49,7 +65,7 @@ class ConfiguratorHandler:
             with open(FILE_PATH / f"schemas/{name}.json", "r", encoding="utf-8") as schema_file:
                 self.__schemas[name] = load(schema_file)
 
-        with open("./vehicle_tracking_configurator_config.json", "r", encoding="utf-8") as config_file:
+        with open(config_path, "r", encoding="utf-8") as config_file:
             conf = load(config_file)
             validate(conf, self.__schemas["configurator_config"])
             pynng_config = conf["pynng"]
@@ -59,29 +75,262 @@ class ConfiguratorHandler:
             self.__recv_frames_address = recv_frames["address"]
             self.__recv_frames_topics: dict[str, str] = recv_frames["topics"]
             self.__recv_tracker_config_address = recv_tracker_config["address"]
-
-        self.__camera_frame_receiver = Sub0(dial=self.__recv_frames_address, recv_timeout=1000)
-        self.__camera_frame_receiver.subscribe(list(self.__recv_frames_topics.values()))
+            frame_pipeline = conf.get("frame_pipeline", {})
+            self.__conflate_frames: bool = frame_pipeline.get("conflate", False)
+            self.__recv_buffer_size: int | None = frame_pipeline.get("recv_buffer_size")
+            self.__decode_workers: int = frame_pipeline.get("decode_workers", 2)
+            self.__render_workers: int = frame_pipeline.get("render_workers", 2)
+            self.use_asyncio: bool = frame_pipeline.get("asyncio", False)
+            frame_size = frame_pipeline.get("frame_size", VIDEO_SIZE)
+            self.__configured_frame_size: tuple[int, int] = (int(frame_size[0]), int(frame_size[1]))
+            timing = frame_pipeline.get("timing", {})
+            dump_file = timing.get("dump_file")
+            self.stage_timer = StageTimer(
+                timing.get("enabled", False),
+                timing.get("window", 600),
+                timing.get("log_interval", 0),
+                Path(dump_file) if dump_file is not None else None,
+            )
+            topview_transformation = conf.get("topview_transformation", {})
+            cache_dir = topview_transformation.get("cache_dir")
+            self.__topview_cache_dir = Path(cache_dir) if cache_dir is not None else None
+            self.__topview_fit_method: str = topview_transformation.get("fit_method", "least_squares")
+            self.__topview_ransac_threshold: float = topview_transformation.get("ransac_threshold", 0.05)
+            camera = topview_transformation.get("camera")
+            self.__camera_model = (
+                CameraModel(np.array(camera["camera_matrix"]), np.array(camera["distortion_coefficients"]))
+                if camera is not None
+                else None
+            )
+            self.__undistort_shower: bool = self.__camera_model is not None and topview_transformation.get(
+                "undistort_preview", False
+            )
+            self.__topview_pixels_per_meter: float = topview_transformation.get("preview_pixels_per_meter", 100)
+
+        self.__camera_frame_receiver: FrameReceiver
+        if self.__conflate_frames and not self.use_asyncio:
+            self.__camera_frame_receiver = ConflatingFrameReceiver(
+                self.__recv_frames_address,
+                list(self.__recv_frames_topics.values()),
+                self.__configured_frame_size[0],
+                self.__configured_frame_size[1],
+                recv_buffer_size=self.__recv_buffer_size or 1,
+                decode_workers=self.__decode_workers,
+            )
+        else:
+            self.__camera_frame_receiver = FrameReceiver(
+                self.__recv_frames_address,
+                list(self.__recv_frames_topics.values()),
+                self.__configured_frame_size[0],
+                self.__configured_frame_size[1],
+                recv_buffer_size=self.__recv_buffer_size or (1 if self.__conflate_frames else None),
+                decode_workers=self.__decode_workers,
+            )
 
         self.__tracker_config_handler = Req0(
             dial=self.__recv_tracker_config_address, recv_timeout=1000, send_timeout=1000
         )
 
         self.current_selected_point: dict[str, str | int] = {REGION_OF_INTEREST: 0, TRANSFORMATION_POINTS: "top_left"}
-        self.__transformation_points = ["top_left", "top_right", "bottom_left", "bottom_right"]
         self.region_of_interest_points: list[tuple[int, int]] = []
         self.__last_tested: PointData = PointData(0, 0, 0.0, 0.0)
+        self.__topview_transformation = TopviewTransformation(
+            self.__topview_cache_dir, self.__topview_fit_method, self.__topview_ransac_threshold, self.__camera_model
+        )
+        # The points are replaced instead of changed in place, as the render threads iterate them meanwhile.
+        self.configured_transformation_points: dict[str, dict[str, tuple[float, float] | tuple[int, int]]] = {}
+        # The added points whose real world coordinates were not entered yet, they are left out of the fit.
+        self.__unfitted_transformation_points: set[str] = set()
         self.__reset_transformation_points()
-        self.__topview_transformation = TopviewTransformation()
 
         self.__roi_color: tuple[int, int, int, int] = (0, 0, 0, 255)
-        self.__current_frame: np.ndarray
+        self.__drawer_frames = DoubleFrameBuffer()
+        self.__drawer_overlay = DrawerOverlay()
+        self.__shower_frames = DoubleFrameBuffer()
+        self.__region_of_interest_shade = RegionOfInterestShade()
+        self.__topview_frames = DoubleFrameBuffer()
+        self.__view_frames = {
+            DRAWER_VIEW: self.__drawer_frames,
+            SHOWER_VIEW: self.__shower_frames,
+            TOPVIEW_VIEW: self.__topview_frames,
+        }
+        # The first view is rendered on the calling thread, the others on the render threads.
+        self.__render_pool = (
+            ThreadPoolExecutor(self.__render_workers - 1, thread_name_prefix="render")
+            if self.__render_workers > 1
+            else None
+        )
+        # Builds the image to world map after a point changed, so the GUI thread never waits for it.
+        self.__map_pool = ThreadPoolExecutor(1, thread_name_prefix="image_to_world_map")
+        self.__map_build: Future[np.ndarray] | None = None
+        self.__build_maps = True
+        self.__current_frame: np.ndarray = np.zeros(self.__camera_frame_receiver.frame_shape, dtype=np.uint8)
+        self.__scaled_frames: dict[str, np.ndarray] = {}
+        self.__view_sizes: dict[str, tuple[int, int]] = {}
+        # The top view is only rendered once the UI shows it.
+        self.__hidden_views: set[str] = {TOPVIEW_VIEW}
+        self.__window_visible = True
+
+    @property
+    def frame_size(self) -> tuple[int, int]:
+        """The size (width, height) of the current camera frame."""
+        return (self.__current_frame.shape[1], self.__current_frame.shape[0])
+
+    @property
+    def transformation_error(self) -> str | None:
+        """Why the configured transformation points do not define a valid transformation, None if they do."""
+        return self.__topview_transformation.error
+
+    @property
+    def transformation_reprojection_errors(self) -> dict[str, float]:
+        """The distance in meters of every transformed transformation point to its configured real world point."""
+        return self.__topview_transformation.reprojection_errors
+
+    @property
+    def transformation_rms_error(self) -> float | None:
+        """The root mean square reprojection error of the transformation points, None if there is no transformation."""
+        return self.__topview_transformation.rms_reprojection_error
+
+    @property
+    def dropped_frames(self) -> int:
+        """The number of camera frames that were dropped because newer frames arrived before they were rendered."""
+        return self.__camera_frame_receiver.dropped_frames
+
+    @property
+    def torn_frames(self) -> int:
+        """The number of shared memory camera frames that were overwritten by the camera before they were rendered."""
+        return self.__camera_frame_receiver.torn_frames
+
+    @property
+    def invalid_frames(self) -> int:
+        """The number of camera frames that were dropped because they could not be decoded or had a wrong size."""
+        return self.__camera_frame_receiver.invalid_frames
+
+    def set_view_visible(self, view: str, visible: bool) -> None:
+        """Sets whether a view is visible in the UI, hidden views are not rendered.
+
+        Args:
+            view (str): The name of the view, DRAWER_VIEW, SHOWER_VIEW or TOPVIEW_VIEW.
+            visible (bool): Whether the view is visible.
+
+        Raises:
+            ValueError: If the view does not exist.
+        """
+        if view not in VIEWS:
+            raise ValueError(f"Unknown view {view}.")
+        if visible:
+            self.__hidden_views.discard(view)
+        else:
+            self.__hidden_views.add(view)
+
+    def set_window_visible(self, visible: bool) -> None:
+        """Sets whether the window is visible, no view is rendered while it is minimized.
+
+        Args:
+            visible (bool): Whether the window is visible.
+        """
+        self.__window_visible = visible
+
+    def is_view_visible(self, view: str) -> bool:
+        """Checks whether a view is shown in the UI and has to be rendered.
+
+        Args:
+            view (str): The name of the view, DRAWER_VIEW, SHOWER_VIEW or TOPVIEW_VIEW.
+
+        Returns:
+            bool: True if the view is visible.
+        """
+        return self.__window_visible and view not in self.__hidden_views
+
+    def set_view_size(self, view: str, width: int, height: int) -> None:
+        """Sets the size a view is displayed at, the view is rendered at this size instead of the full frame size.
+
+        Args:
+            view (str): The name of the view, DRAWER_VIEW, SHOWER_VIEW or TOPVIEW_VIEW.
+            width (int): The displayed width in pixels, 0 to render at the full frame size.
+            height (int): The displayed height in pixels, 0 to render at the full frame size.
+
+        Raises:
+            ValueError: If the view does not exist.
+        """
+        if view not in VIEWS:
+            raise ValueError(f"Unknown view {view}.")
+        if width > 0 and height > 0:
+            self.__view_sizes[view] = (width, height)
+        else:
+            self.__view_sizes.pop(view, None)
+
+    def get_render_size(self, view: str) -> tuple[int, int]:
+        """Calculates the size a view is rendered at, the frame fitted into the displayed size without enlarging it.
+
+        The frame of the top view is the area the transformation points span at the configured scale, or the default
+        real world size if they do not define a valid transformation.
+
+        Args:
+            view (str): The name of the view, DRAWER_VIEW, SHOWER_VIEW or TOPVIEW_VIEW.
+
+        Returns:
+            tuple[int, int]: The size (width, height) the view is rendered at.
+        """
+        frame_width, frame_height = self.frame_size if view != TOPVIEW_VIEW else self.__get_topview_size()
+        if view not in self.__view_sizes:
+            return frame_width, frame_height
+        display_width, display_height = self.__view_sizes[view]
+        scale = min(display_width / frame_width, display_height / frame_height)
+        if scale >= 1:
+            return frame_width, frame_height
+        return max(1, round(frame_width * scale)), max(1, round(frame_height * scale))
+
+    def __get_topview_size(self) -> tuple[int, int]:
+        """Calculates the size of the top view at the configured scale.
+
+        Returns:
+            tuple[int, int]: The size (width, height) of the top view.
+        """
+        topview_size = self.__topview_transformation.get_topview_size(self.__topview_pixels_per_meter)
+        if topview_size is None:
+            return (
+                max(1, round(REAL_WORLD_SIZE[0] * self.__topview_pixels_per_meter)),
+                max(1, round(REAL_WORLD_SIZE[1] * self.__topview_pixels_per_meter)),
+            )
+        return topview_size
+
+    def release_frame(self, view: str, frame: np.ndarray) -> None:
+        """Marks a rendered frame as no longer read by the UI, so its buffer can be rendered into again.
+
+        Every frame returned by `read_frames` or `aread_frames` has to be released, can be called from any thread.
+
+        Args:
+            view (str): The name of the view the frame was rendered for.
+            frame (np.ndarray): The rendered frame.
+        """
+        self.__view_frames[view].release(frame)
+
+    def verify_frame(self) -> bool:
+        """Checks that the current camera frame was not overwritten by the camera while it was rendered.
+
+        Returns:
+            bool: True if the rendered frames can be shown.
+        """
+        return self.__camera_frame_receiver.verify_frame()
+
+    def close(self) -> None:
+        """Closes the connections to the camera and the tracker."""
+        self.stage_timer.close()
+        if self.__render_pool is not None:
+            self.__render_pool.shutdown()
+        self.__map_pool.shutdown()
+        self.__camera_frame_receiver.close()
+        self.__tracker_config_handler.close()
 
     def __calculate_actual_point_on_video(
         self, clicked_point: tuple[int, int], video_size: tuple[int, int], full_size: tuple[int, int]
     ) -> tuple[int, int]:
         """Calculates the real image point of different sized videos.
 
+        The video may be rendered at a smaller size than the camera frame, the point is always mapped to the full
+        resolution of the camera frame.
+
         Args:
             clicked_point (tuple[int, int]): The clicked point on the video.
             video_size (tuple[int, int]): The size of the video.
@@ -93,97 +342,315 @@ class ConfiguratorHandler:
         width_border_subtract = (full_size[0] - video_size[0]) // 2
         height_border_subtract = (full_size[1] - video_size[1]) // 2
 
-        width_factor = VIDEO_SIZE[0] / video_size[0]
-        height_factor = VIDEO_SIZE[1] / video_size[1]
+        frame_width, frame_height = self.frame_size
+        width_factor = frame_width / video_size[0]
+        height_factor = frame_height / video_size[1]
 
         x, y = clicked_point[0] - width_border_subtract, clicked_point[1] - height_border_subtract
 
         image_x, image_y = int((x * width_factor)), int((y * height_factor))
 
-        image_x = int(np.clip(image_x, 0, VIDEO_SIZE[0]))
-        image_y = int(np.clip(image_y, 0, VIDEO_SIZE[1]))
+        image_x = int(np.clip(image_x, 0, frame_width))
+        image_y = int(np.clip(image_y, 0, frame_height))
 
         return image_x, image_y
 
     def __reset_transformation_points(self) -> None:
-        """Resets the transformation points to the default values."""
-        self.configured_transformation_points: dict[str, dict[str, tuple[float, float] | tuple[int, int]]] = {
-            "top_left": {"real_world": (0, 0), "image": (0, 0)},
-            "top_right": {"real_world": (0, 0), "image": (0, 0)},
-            "bottom_left": {"real_world": (0, 0), "image": (0, 0)},
-            "bottom_right": {"real_world": (0, 0), "image": (0, 0)},
-        }
-
-    def read_drawer_frame(self) -> bytes:
+        """Resets the corner transformation points to the default values and removes the additional points."""
+        for point_name in self.configured_transformation_points:
+            if point_name not in CORNER_POINTS and point_name not in self.__unfitted_transformation_points:
+                self.__topview_transformation.remove_transformation_point(point_name)
+        self.configured_transformation_points = {}
+        self.__unfitted_transformation_points.clear()
+        for point_name in CORNER_POINTS:
+            self.add_transformation_point((0, 0), (0, 0), point_name)
+        if self.current_selected_point[TRANSFORMATION_POINTS] not in CORNER_POINTS:
+            self.current_selected_point[TRANSFORMATION_POINTS] = CORNER_POINTS[0]
+
+    def read_drawer_frame(self) -> np.ndarray:
         """Reads a new frame from the frames receiver.
 
+        Raises:
+            TimeoutError: If no frame was received in time.
+
         Returns:
-            bytes: The drawer frame with the points drawn on it.
-        """
-        frame_bytes: bytes = self.__camera_frame_receiver.recv()
-        self.__current_frame = np.frombuffer(frame_bytes, dtype=np.uint8).reshape(VIDEO_SIZE[1], VIDEO_SIZE[0], 3)
-        frame = self.__current_frame.copy()
-        if len(self.region_of_interest_points) > 0:
-            frame = cv2.polylines(frame, [np.array(self.region_of_interest_points)], True, (255, 255, 255), 2)
-
-        for point_name, point in self.configured_transformation_points.items():
-            if "image" not in point or "real_world" not in point:
-                continue
-            real_world = point["real_world"]
-            image_point = point["image"]
-            image_point = (int(image_point[0]), int(image_point[1]))
-            frame = cv2.circle(frame, image_point, 5, (255, 255, 255), -1)
-            text = f"{real_world}; {point_name}"
-            text_size, _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            match point_name:
-                case "top_left":
-                    offset_x = 10
-                    offset_y = 10
-                case "top_right":
-                    offset_x = -text_size[0] - 10
-                    offset_y = 10
-                case "bottom_left":
-                    offset_x = 10
-                    offset_y = text_size[1] - 10
-                case "bottom_right":
-                    offset_x = -text_size[0] - 10
-                    offset_y = text_size[1] - 10
-                case _:
-                    raise ValueError(f"Point name '{point_name}' is invalid.")
-            frame = cv2.putText(
-                frame,
-                text,
-                (image_point[0] + offset_x, image_point[1] + offset_y),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (255, 255, 255),
-                1,
-                cv2.LINE_AA,
+            np.ndarray: The front buffer of the drawer frame with the points drawn on it.
+        """
+        self.stage_timer.start()
+        self.__current_frame = self.__camera_frame_receiver.read()
+        self.stage_timer.lap("receive")
+        return self.__render_drawer_frame(self.__scale_current_frame(DRAWER_VIEW, self.get_render_size(DRAWER_VIEW)))
+
+    async def aread_drawer_frame(self) -> np.ndarray:
+        """Reads a new frame from the frames receiver without blocking the running event loop.
+
+        Raises:
+            TimeoutError: If no frame was received in time.
+
+        Returns:
+            np.ndarray: The front buffer of the drawer frame with the points drawn on it.
+        """
+        self.stage_timer.start()
+        self.__current_frame = await self.__camera_frame_receiver.aread(self.__conflate_frames)
+        self.stage_timer.lap("receive")
+        drawer_frame = await asyncio.to_thread(self.__render_drawer_frame_on_worker)
+        self.stage_timer.resume()
+        return drawer_frame
+
+    def read_frames(self) -> tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+        """Reads a new frame from the frames receiver and renders the visible drawer, shower and top view from it.
+
+        Raises:
+            TimeoutError: If no frame was received in time.
+
+        Returns:
+            tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]: The front buffers of the drawer frame, the
+                shower frame and the top view, None for a hidden view.
+        """
+        self.stage_timer.start()
+        self.__current_frame = self.__camera_frame_receiver.read()
+        self.stage_timer.lap("receive")
+        return self.__render_frames()
+
+    async def aread_frames(self) -> tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+        """Reads a new frame and renders the visible views without blocking the running event loop.
+
+        Raises:
+            TimeoutError: If no frame was received in time.
+
+        Returns:
+            tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]: The front buffers of the drawer frame, the
+                shower frame and the top view, None for a hidden view.
+        """
+        self.stage_timer.start()
+        self.__current_frame = await self.__camera_frame_receiver.aread(self.__conflate_frames)
+        self.stage_timer.lap("receive")
+        # The frames are rendered on a worker thread, so the event loop keeps serving the sockets meanwhile.
+        frames = await asyncio.to_thread(self.__render_frames_on_worker)
+        self.stage_timer.resume()
+        return frames
+
+    def __render_frames(self) -> tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+        """Renders the visible views from the current frame, concurrently if render threads are set up.
+
+        The current frame is scaled once per displayed size, the views only read the scaled frames and write their own
+        buffers, and cv2 and numpy release the GIL while they process the frames.
+
+        Returns:
+            tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]: The front buffers of the drawer frame, the
+                shower frame and the top view, None for a hidden view.
+        """
+        drawer_size = self.get_render_size(DRAWER_VIEW) if self.is_view_visible(DRAWER_VIEW) else None
+        shower_size = self.get_render_size(SHOWER_VIEW) if self.is_view_visible(SHOWER_VIEW) else None
+        topview_size = self.get_render_size(TOPVIEW_VIEW) if self.is_view_visible(TOPVIEW_VIEW) else None
+
+        drawer_source = self.__scale_current_frame(DRAWER_VIEW, drawer_size) if drawer_size is not None else None
+        if shower_size is None:
+            shower_source = None
+        elif shower_size == drawer_size and not self.__undistort_shower:
+            shower_source = drawer_source
+        else:
+            shower_source = self.__get_shower_source(shower_size)
+
+        if self.__render_pool is None:
+            return (
+                self.__render_drawer_frame(drawer_source) if drawer_source is not None else None,
+                self.__render_shower_frame(shower_source) if shower_source is not None else None,
+                self.__render_topview(topview_size) if topview_size is not None else None,
             )
 
-        return frame.tobytes()
+        shower_frame = (
+            self.__render_pool.submit(self.__render_shower_frame_on_worker, shower_source)
+            if shower_source is not None
+            else None
+        )
+        topview_frame = (
+            self.__render_pool.submit(self.__render_topview_on_worker, topview_size)
+            if topview_size is not None
+            else None
+        )
+        drawer_frame = self.__render_drawer_frame(drawer_source) if drawer_source is not None else None
+        return (
+            drawer_frame,
+            shower_frame.result() if shower_frame is not None else None,
+            topview_frame.result() if topview_frame is not None else None,
+        )
+
+    def __render_frames_on_worker(self) -> tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+        """Renders the visible views from the current frame on a worker thread of the event loop.
 
-    def read_shower_frame(self) -> bytes:
-        """Reads a new frame from the frames receiver.
+        Returns:
+            tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]: The front buffers of the drawer frame, the
+                shower frame and the top view, None for a hidden view.
+        """
+        self.stage_timer.resume()
+        return self.__render_frames()
+
+    def __render_drawer_frame_on_worker(self) -> np.ndarray:
+        """Renders the drawer frame from the current frame on a worker thread of the event loop.
+
+        Returns:
+            np.ndarray: The front buffer of the drawer frame with the points drawn on it.
+        """
+        self.stage_timer.resume()
+        return self.__render_drawer_frame(self.__scale_current_frame(DRAWER_VIEW, self.get_render_size(DRAWER_VIEW)))
+
+    def __scale_current_frame(self, view: str, size: tuple[int, int]) -> np.ndarray:
+        """Scales the current frame to the size a view is rendered at.
+
+        Integer down scaling averages whole pixel blocks with INTER_AREA, any other scale is interpolated linearly,
+        as INTER_AREA is much slower for fractional scales.
+
+        Args:
+            view (str): The name of the view whose buffer receives the scaled frame.
+            size (tuple[int, int]): The size (width, height) to scale to.
+
+        Returns:
+            np.ndarray: The scaled frame, the current frame itself if it already has the size.
+        """
+        if size == self.frame_size:
+            return self.__current_frame
+        scaled_frame = self.__scaled_frames.get(view)
+        if scaled_frame is None or scaled_frame.shape[:2] != (size[1], size[0]):
+            scaled_frame = self.__scaled_frames[view] = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        frame_width, frame_height = self.frame_size
+        factor = frame_width // size[0]
+        integer_downscale = factor > 1 and (frame_width, frame_height) == (size[0] * factor, size[1] * factor)
+        interpolation = cv2.INTER_AREA if integer_downscale else cv2.INTER_LINEAR
+        cv2.resize(self.__current_frame, size, dst=scaled_frame, interpolation=interpolation)
+        self.stage_timer.lap("resize")
+        return scaled_frame
+
+    def __get_shower_source(self, size: tuple[int, int]) -> np.ndarray:
+        """Scales the current frame to the size of the shower, undistorts it in the same remap if configured.
+
+        Args:
+            size (tuple[int, int]): The size (width, height) the shower is rendered at.
+
+        Returns:
+            np.ndarray: The scaled and possibly undistorted frame.
+        """
+        if not self.__undistort_shower:
+            return self.__scale_current_frame(SHOWER_VIEW, size)
+        undistorted_frame = self.__scaled_frames.get(SHOWER_VIEW)
+        if undistorted_frame is None or undistorted_frame.shape[:2] != (size[1], size[0]):
+            undistorted_frame = self.__scaled_frames[SHOWER_VIEW] = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        self.__topview_transformation.undistort_frame(self.__current_frame, undistorted_frame)
+        self.stage_timer.lap("undistort")
+        return undistorted_frame
+
+    def __scale_points(self, points: list[tuple[int, int]], size: tuple[int, int]) -> list[tuple[int, int]]:
+        """Scales image points of the current frame to a frame of another size.
+
+        Args:
+            points (list[tuple[int, int]]): The points on the current frame.
+            size (tuple[int, int]): The size (width, height) of the scaled frame.
+
+        Returns:
+            list[tuple[int, int]]: The points on the scaled frame.
+        """
+        frame_width, frame_height = self.frame_size
+        if size == (frame_width, frame_height):
+            return points
+        width_factor, height_factor = size[0] / frame_width, size[1] / frame_height
+        return [(round(x * width_factor), round(y * height_factor)) for x, y in points]
+
+    def __render_shower_frame_on_worker(self, source: np.ndarray) -> np.ndarray:
+        """Renders the shower frame on a render thread.
+
+        Args:
+            source (np.ndarray): The current frame scaled to the size of the shower.
+
+        Returns:
+            np.ndarray: The front buffer of the shower frame with the region of interest shaded.
+        """
+        self.stage_timer.resume()
+        return self.__render_shower_frame(source)
+
+    def __render_drawer_frame(self, source: np.ndarray) -> np.ndarray:
+        """Draws the configured points on the current frame.
+
+        Args:
+            source (np.ndarray): The current frame scaled to the size of the drawer.
+
+        Returns:
+            np.ndarray: The front buffer of the drawer frame with the points drawn on it.
+        """
+        frame = self.__drawer_frames.back(source.shape)
+        np.copyto(frame, source)
+        self.stage_timer.lap("drawer_copy")
+
+        size = (frame.shape[1], frame.shape[0])
+        region_of_interest_points = self.__scale_points(self.region_of_interest_points, size)
+        transformation_points = {
+            point_name: {**point, "image": self.__scale_points([point["image"]], size)[0]}  # type: ignore[list-item]
+            for point_name, point in self.configured_transformation_points.items()
+        }
+        self.__drawer_overlay.update(frame.shape, region_of_interest_points, transformation_points)
+        self.__drawer_overlay.blend(frame)
+        self.stage_timer.lap("drawer_overlay")
+
+        return self.__drawer_frames.swap()
+
+    def read_shower_frame(self) -> np.ndarray:
+        """Renders the shower frame from the current frame.
 
         Returns:
-            bytes: The shower frame with the points drawn on it.
+            np.ndarray: The front buffer of the shower frame with the region of interest shaded.
         """
-        frame = self.__current_frame.copy()
-        image_frame = Image.fromarray(frame)
+        return self.__render_shower_frame(self.__get_shower_source(self.get_render_size(SHOWER_VIEW)))
 
-        image_mask = Image.new("RGBA", (VIDEO_SIZE[0], VIDEO_SIZE[1]), self.__roi_color)
-        cv2_mask = np.array(image_mask)
-        cv2_mask = cv2.cvtColor(cv2_mask, cv2.COLOR_RGBA2BGRA)
-        if len(self.region_of_interest_points) > 0:
-            cv2_mask = cv2.fillPoly(cv2_mask, [np.array(self.region_of_interest_points)], (0, 0, 0, 0))
-        image_mask = Image.fromarray(cv2_mask)
+    def __render_shower_frame(self, source: np.ndarray) -> np.ndarray:
+        """Shades everything outside of the region of interest.
 
-        image_frame.paste(image_mask, mask=image_mask)
-        image_frame.convert("RGB")
-        frame = np.array(image_frame)
+        Args:
+            source (np.ndarray): The current frame scaled to the size of the shower.
+
+        Returns:
+            np.ndarray: The front buffer of the shower frame with the region of interest shaded.
+        """
+        frame = self.__shower_frames.back(source.shape)
+        size = (frame.shape[1], frame.shape[0])
+        region_of_interest_points = self.region_of_interest_points
+        if self.__undistort_shower and region_of_interest_points:
+            undistorted_points = self.__topview_transformation.undistort_points(np.array(region_of_interest_points))
+            region_of_interest_points = [(round(x), round(y)) for x, y in undistorted_points]
+        region_of_interest_points = self.__scale_points(region_of_interest_points, size)
+        self.__region_of_interest_shade.update(frame.shape, region_of_interest_points, self.__roi_color)
+        self.__region_of_interest_shade.apply(source, frame)
+        self.stage_timer.lap("shower_composite")
+
+        return self.__shower_frames.swap()
+
+    def __render_topview_on_worker(self, size: tuple[int, int]) -> np.ndarray:
+        """Renders the top view on a render thread.
+
+        Args:
+            size (tuple[int, int]): The size (width, height) the top view is rendered at.
+
+        Returns:
+            np.ndarray: The front buffer of the top view.
+        """
+        self.stage_timer.resume()
+        return self.__render_topview(size)
+
+    def __render_topview(self, size: tuple[int, int]) -> np.ndarray:
+        """Warps the current frame to the top view of the area the transformation points span.
+
+        Args:
+            size (tuple[int, int]): The size (width, height) the top view is rendered at.
+
+        Returns:
+            np.ndarray: The front buffer of the top view, black if the transformation points are invalid.
+        """
+        frame = self.__topview_frames.back((size[1], size[0], 3))
+        if self.__topview_transformation.error is None:
+            self.__topview_transformation.warp_to_topview(self.__current_frame, frame)
+        else:
+            frame.fill(0)
+        self.stage_timer.lap("topview")
 
-        return frame.tobytes()
+        return self.__topview_frames.swap()
 
     def receive_config(self) -> None:
         """Receives the running configuration from the supported modules."""
@@ -197,6 +664,40 @@ class ConfiguratorHandler:
             self.__send_err(-1, error)
             raise ValueError(error)
 
+        self.apply_config(data)
+        self.__send_message_to_tracker({"status": 0})
+
+    async def areceive_config(self) -> dict:
+        """Receives the running configuration from the supported modules without blocking the running event loop.
+
+        The configuration is returned instead of applied, so the thread owning the configuration can apply it with
+        `apply_config`.
+
+        Raises:
+            ValueError: If the received data is not a configuration.
+
+        Returns:
+            dict: The received configuration.
+        """
+        request = {"request_type": "get_config"}
+        await self.__asend_message_to_tracker(request)
+
+        data = await self.__arecv_status()
+
+        if data is None or not isinstance(data, dict):
+            error = f"Received data is not a dictionary. It is {type(data)}"
+            await self.__asend_message_to_tracker({"status": -1, "message": error})
+            raise ValueError(error)
+
+        await self.__asend_message_to_tracker({"status": 0})
+        return data
+
+    def apply_config(self, data: dict) -> None:
+        """Replaces the current configuration with a received one.
+
+        Args:
+            data (dict): The received configuration.
+        """
         self.region_of_interest_points = []
         self.__reset_transformation_points()
 
@@ -210,8 +711,6 @@ class ConfiguratorHandler:
                     (point["image"][0], point["image"][1]), (point["real_world"][0], point["real_world"][1]), point_name
                 )
 
-        self.__send_message_to_tracker({"status": 0})
-
     def __send_message_to_tracker(self, request: dict):
         """Sends a message to the tracker.
 
@@ -220,18 +719,45 @@ class ConfiguratorHandler:
         """
         self.__tracker_config_handler.send(dumps(request).encode("utf-8"))
 
+    async def __asend_message_to_tracker(self, request: dict):
+        """Sends a message to the tracker without blocking the running event loop.
+
+        Args:
+            request (dict): The request to send.
+        """
+        await self.__tracker_config_handler.asend(dumps(request).encode("utf-8"))
+
     def send_config(self) -> None:
         """Sends the current configuration to the tracker."""
+        self.__send_message_to_tracker(self.create_set_config_request())
+        self.__recv_status()
+
+    async def asend_config(self, request: dict) -> None:
+        """Sends a configuration to the tracker without blocking the running event loop.
+
+        Args:
+            request (dict): The request created by `create_set_config_request` on the thread owning the configuration.
+        """
+        await self.__asend_message_to_tracker(request)
+        await self.__arecv_status()
+
+    def create_set_config_request(self) -> dict:
+        """Creates the request setting the current configuration on the tracker.
+
+        Returns:
+            dict: The request, a copy of the configuration that later changes do not affect.
+        """
         payload: dict[str, list[tuple[int, int]] | dict[str, dict[str, tuple[int, int] | tuple[float, float]]]] = {}
 
         if len(self.region_of_interest_points) > 2:
-            payload["region_of_interest"] = self.region_of_interest_points
-        payload["transformation_points"] = self.configured_transformation_points.copy()
+            payload["region_of_interest"] = list(self.region_of_interest_points)
+        payload["transformation_points"] = {
+            point_name: dict(point)
+            for point_name, point in self.configured_transformation_points.items()
+            if point_name not in self.__unfitted_transformation_points
+        }
 
-        request = {"request_type": "set_config", "payload": payload}
-
-        self.__send_message_to_tracker(request)
-        self.__recv_status()
+        return {"request_type": "set_config", "payload": payload}
 
     def __send_err(self, code: int, err: str) -> None:
         response = {"status": code, "message": err}
@@ -253,6 +779,37 @@ class ConfiguratorHandler:
             self.__send_err(-1, err.message)
             raise err
 
+        return self.__evaluate_status(tracker_response)
+
+    async def __arecv_status(self) -> dict | None:
+        """Receives the status and the data from the tracker without blocking the running event loop.
+
+        Returns:
+            tuple[dict | None]: The status and the data.
+        """
+        raw_config: bytes = await self.__tracker_config_handler.arecv()
+        tracker_response = loads(raw_config)
+
+        try:
+            validate(tracker_response, self.__schemas["response"])
+        except ValidationError as err:
+            await self.__asend_message_to_tracker({"status": -1, "message": err.message})
+            raise err
+
+        return self.__evaluate_status(tracker_response)
+
+    def __evaluate_status(self, tracker_response: dict) -> dict | None:
+        """Evaluates the status of a validated response of the tracker.
+
+        Args:
+            tracker_response (dict): The response of the tracker.
+
+        Raises:
+            ValueError: If the tracker reported an error.
+
+        Returns:
+            dict | None: The data of the response.
+        """
         status = tracker_response["status"]
         data = tracker_response["payload"] if "payload" in tracker_response.keys() else None
         message = tracker_response["message"] if "message" in tracker_response.keys() else None
@@ -265,13 +822,31 @@ class ConfiguratorHandler:
     def get_real_world_point(self, point: tuple[int, int]) -> tuple[float, float]:
         """Transforms a point from the image to the real world.
 
+        The point is looked up in the image to world map, or transformed directly while the map of the current points
+        is built on the map thread. If a map can not be built, the maps are only kept in memory from then on, and if
+        that fails as well, every point is transformed directly.
+
         Args:
             point (tuple[int, int]): The point on the image.
 
         Returns:
             tuple[float, float]: The point in the real world.
         """
-        return self.__topview_transformation.image_to_world_transform(point)
+        if self.__map_build is not None and self.__map_build.done() and self.__map_build.exception() is not None:
+            traceback.print_exception(self.__map_build.exception())
+            self.__map_build = None
+            # The cache directory may not be writable, otherwise building the maps does not work at all.
+            self.__build_maps = self.__topview_transformation.disable_cache()
+        frame_width, frame_height = self.frame_size
+        if (
+            self.__build_maps
+            and not self.__topview_transformation.has_image_to_world_map(frame_width, frame_height)
+            and (self.__map_build is None or self.__map_build.done())
+        ):
+            self.__map_build = self.__map_pool.submit(
+                self.__topview_transformation.get_image_to_world_map, frame_width, frame_height
+            )
+        return self.__topview_transformation.image_to_world_lookup(point, self.frame_size)
 
     def get_image_point(self, point: tuple[float, float]) -> tuple[int, int]:
         """Transforms a point from the real world to the image.
@@ -301,7 +876,7 @@ class ConfiguratorHandler:
             self.region_of_interest_points.append((0, 0))
 
         if is_image_coord:
-            np.clip(number, 0, VIDEO_SIZE[coord_index])
+            np.clip(number, 0, self.frame_size[coord_index])
 
             image_coords_list = list(self.region_of_interest_points[current_index])
             image_coords_list[coord_index] = int(number)
@@ -336,6 +911,15 @@ class ConfiguratorHandler:
             PointData: The real world and image coordinates.
         """
         current_selected = str(self.current_selected_point[TRANSFORMATION_POINTS])
+        if current_selected == NEW_TRANSFORMATION_POINT:
+            current_selected = self.__add_new_transformation_point((0, 0))
+        if current_selected in self.__unfitted_transformation_points and is_image_coord:
+            image_coords = self.configured_transformation_points[current_selected]["image"]
+            image_coords = (
+                (int(number), int(image_coords[1])) if coord_index == 0 else (int(image_coords[0]), int(number))
+            )
+            real_coords = self.__update_unfitted_transformation_point(current_selected, image_coords)
+            return PointData(image_coords[0], image_coords[1], float(real_coords[0]), float(real_coords[1]))
         key: str
         if is_image_coord:
             key = "image"
@@ -343,11 +927,15 @@ class ConfiguratorHandler:
             key = "real_world"
         to_change = self.configured_transformation_points[current_selected][key]
         to_change = (number, to_change[1]) if coord_index == 0 else (to_change[0], number)
-        self.configured_transformation_points[current_selected][key] = to_change
+        self.configured_transformation_points = {
+            **self.configured_transformation_points,
+            current_selected: {**self.configured_transformation_points[current_selected], key: to_change},
+        }
 
         image_x, image_y = self.configured_transformation_points[current_selected]["image"]
         real_x, real_y = self.configured_transformation_points[current_selected]["real_world"]
 
+        self.__unfitted_transformation_points.discard(current_selected)
         self.__topview_transformation.set_transformation_point(
             current_selected, (int(image_x), int(image_y)), (real_x, real_y)
         )
@@ -414,7 +1002,7 @@ class ConfiguratorHandler:
         return self.__roi_color
 
     def delete_button_pressed(self, config_name: str) -> None:
-        """Deletes a point from the configuration.
+        """Deletes a point from the configuration, the corner transformation points are reset instead.
 
         Args:
             config_name (str): The name of the configuration.
@@ -432,7 +1020,22 @@ class ConfiguratorHandler:
                 )
             case "Transformation Points":
                 current_index = str(self.current_selected_point[TRANSFORMATION_POINTS])
-                self.add_transformation_point((0, 0), (0.0, 0.0), current_index)
+                if current_index == NEW_TRANSFORMATION_POINT:
+                    return
+                if current_index in CORNER_POINTS:
+                    self.add_transformation_point((0, 0), (0.0, 0.0), current_index)
+                    return
+                point_names = list(self.configured_transformation_points)
+                self.current_selected_point[TRANSFORMATION_POINTS] = point_names[point_names.index(current_index) - 1]
+                self.configured_transformation_points = {
+                    point_name: point
+                    for point_name, point in self.configured_transformation_points.items()
+                    if point_name != current_index
+                }
+                if current_index in self.__unfitted_transformation_points:
+                    self.__unfitted_transformation_points.remove(current_index)
+                else:
+                    self.__topview_transformation.remove_transformation_point(current_index)
 
     def add_transformation_point(
         self, image_coords: tuple[int, int], real_coords: tuple[float, float], coord_name: str
@@ -444,9 +1047,54 @@ class ConfiguratorHandler:
             real_coords (tuple[float, float]): The coordinates of the point in the real world.
             coord_name (str): The name of the point.
         """
-        self.configured_transformation_points[coord_name] = {"image": image_coords, "real_world": real_coords}
+        self.configured_transformation_points = {
+            **self.configured_transformation_points,
+            coord_name: {"image": image_coords, "real_world": real_coords},
+        }
+        self.__unfitted_transformation_points.discard(coord_name)
         self.__topview_transformation.set_transformation_point(coord_name, image_coords, real_coords)
 
+    def __add_new_transformation_point(self, image_coords: tuple[int, int]) -> str:
+        """Adds a transformation point in addition to the corners and selects it.
+
+        The point is left out of the fit until its real world coordinates are entered, until then they follow the
+        current transformation of its image point.
+
+        Args:
+            image_coords (tuple[int, int]): The coordinates of the point on the image.
+
+        Returns:
+            str: The name of the new point.
+        """
+        index = len(self.configured_transformation_points)
+        while f"point_{index}" in self.configured_transformation_points:
+            index += 1
+        point_name = f"point_{index}"
+
+        self.__unfitted_transformation_points.add(point_name)
+        self.__update_unfitted_transformation_point(point_name, image_coords)
+        self.current_selected_point[TRANSFORMATION_POINTS] = point_name
+        return point_name
+
+    def __update_unfitted_transformation_point(
+        self, point_name: str, image_coords: tuple[int, int]
+    ) -> tuple[float, float]:
+        """Moves a point left out of the fit, its real world coordinates are transformed from the new image point.
+
+        Args:
+            point_name (str): The name of the point.
+            image_coords (tuple[int, int]): The new coordinates of the point on the image.
+
+        Returns:
+            tuple[float, float]: The real world coordinates of the point.
+        """
+        real_coords = self.get_real_world_point(image_coords) if self.transformation_error is None else (0.0, 0.0)
+        self.configured_transformation_points = {
+            **self.configured_transformation_points,
+            point_name: {"image": image_coords, "real_world": real_coords},
+        }
+        return real_coords
+
     def color_chooser_button(self, button_color: str) -> tuple[int, int, int, int]:
         """Changes the ROI color.
 
@@ -530,9 +1178,13 @@ class ConfiguratorHandler:
             PointData: The clicked point data.
         """
         current_point = str(self.current_selected_point[TRANSFORMATION_POINTS])
+        if current_point == NEW_TRANSFORMATION_POINT:
+            current_point = self.__add_new_transformation_point(point_coords)
+        if current_point in self.__unfitted_transformation_points:
+            real_x, real_y = self.__update_unfitted_transformation_point(current_point, point_coords)
+            return PointData(int(point_coords[0]), int(point_coords[1]), float(real_x), float(real_y))
         real_x, real_y = self.configured_transformation_points[current_point]["real_world"]
 
-        self.configured_transformation_points[current_point]["image"] = point_coords
         self.add_transformation_point(point_coords, (real_x, real_y), current_point)
 
         data = PointData(int(point_coords[0]), int(point_coords[1]), float(real_x), float(real_y))
@@ -542,7 +1194,7 @@ class ConfiguratorHandler:
     def points_shower_clicked(
         self, clicked_point: tuple[int, int], video_size: tuple[int, int], full_size: tuple[int, int]
     ) -> PointData:
-        """Handles the click event on the points shower.
+        """Handles the click event on the points shower, a click on the undistorted shower is distorted again.
 
         Args:
             clicked_point (tuple[int, int]): The coordinates of the clicked point.
@@ -553,6 +1205,10 @@ class ConfiguratorHandler:
             PointData: The clicked point data.
         """
         image_x, image_y = self.__calculate_actual_point_on_video(clicked_point, video_size, full_size)
+        if self.__undistort_shower:
+            distorted_point = self.__topview_transformation.distort_points(np.array([(image_x, image_y)]))[0]
+            image_x = int(np.clip(distorted_point[0], 0, self.frame_size[0]))
+            image_y = int(np.clip(distorted_point[1], 0, self.frame_size[1]))
         real_x, real_y = self.get_real_world_point((image_x, image_y))
 
         data = PointData(int(image_x), int(image_y), float(real_x), float(real_y))
@@ -615,14 +1271,18 @@ class ConfiguratorHandler:
         Returns:
             tuple[str, PointData]: The new point data.
         """
-        current_index = self.__transformation_points.index(str(self.current_selected_point[TRANSFORMATION_POINTS]))
-        next_index = (current_index + 1 if direction == "right" else current_index - 1) % 4
-        next_name = self.__transformation_points[next_index]
+        point_names = [*self.configured_transformation_points, NEW_TRANSFORMATION_POINT]
+        current_index = point_names.index(str(self.current_selected_point[TRANSFORMATION_POINTS]))
+        next_index = (current_index + 1 if direction == "right" else current_index - 1) % len(point_names)
+        next_name = point_names[next_index]
         self.current_selected_point[TRANSFORMATION_POINTS] = next_name
 
-        conf = self.configured_transformation_points[next_name]
-        image_coords = (int(conf["image"][0]), int(conf["image"][1]))
-        real_coords = conf["real_world"]
+        if next_name == NEW_TRANSFORMATION_POINT:
+            image_coords, real_coords = (0, 0), (0.0, 0.0)
+        else:
+            conf = self.configured_transformation_points[next_name]
+            image_coords = (int(conf["image"][0]), int(conf["image"][1]))
+            real_coords = conf["real_world"]
 
         data = PointData(int(image_coords[0]), int(image_coords[1]), float(real_coords[0]), float(real_coords[1]))
 
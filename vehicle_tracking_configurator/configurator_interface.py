@@ -4,52 +4,33 @@
 from threading import Thread, Event
 from pathlib import Path
 from json import load, dump
+from functools import partial
+from typing import cast
+import asyncio
 
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QGuiApplication, QImage
-from PySide6.QtQml import QQmlApplicationEngine
-from PySide6.QtQuick import QQuickImageProvider
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtQml import QQmlApplicationEngine, qmlRegisterType
 from jsonschema import validate
+import numpy as np
 import pynng
 
 from vehicle_tracking_configurator.configurator_interface_model import ModelVehicleTrackingConfigurator
-from vehicle_tracking_configurator.configurator import ConfiguratorHandler
+from vehicle_tracking_configurator.configurator import (
+    ConfiguratorHandler,
+    DRAWER_VIEW,
+    SHOWER_VIEW,
+    TOPVIEW_VIEW,
+    VIEWS,
+)
+from vehicle_tracking_configurator.asyncio_bridge import AsyncioBridge
+from vehicle_tracking_configurator.frame_pacing import FramePacer
+from vehicle_tracking_configurator.video_item import VideoFrameItem
 
 
 FILE_DIR = Path(__file__).parent
 CONFIG_FILE_PATH = Path("./vehicle_tracking_configurator_config.json")
 
 
-class StreamImageProvider(QQuickImageProvider):
-    """A class for providing images to the UI.
-
-    Args:
-        width (int): The width of the image.
-        height (int): The height of the image.
-    """
-
-    def __init__(self, width: int, height: int) -> None:
-        super().__init__(QQuickImageProvider.Image)  # type: ignore[attr-defined]
-        self.img = QImage(width, height, QImage.Format_RGB888)  # type: ignore[attr-defined]
-
-    # Camel case is required by PySide6
-    def requestImage(self, frame_id: str, size: QSize, requested_size: QSize) -> QImage:
-        """Scales image to the requested size.
-
-        Args:
-            frame_id (str): The frame number.
-            size (QSize): The size of the image.
-            requested_size (QSize): The requested size of the image.
-
-        Returns:
-            QImage: The scaled image.
-        """
-        del frame_id, size
-        if requested_size.width() > 0 and requested_size.height() > 0:
-            return self.img.scaled(requested_size, Qt.KeepAspectRatio)  # type: ignore[attr-defined]
-        return self.img
-
-
 class ConfiguratorInterface:
     """A class for starting the QT application."""
 
@@ -68,21 +49,30 @@ class ConfiguratorInterface:
             conf = load(config_file)
             validate(instance=conf, schema=config_schema)
             self.__recv_frames_address = conf["pynng"]["subscribers"]["camera_frame_receiver"]["address"]
+            frame_pipeline = conf.get("frame_pipeline", {})
+            demand_driven: bool = frame_pipeline.get("demand_driven", True)
+            max_fps: float = frame_pipeline.get("max_fps", 0)
+            idle_fps: float = frame_pipeline.get("idle_fps", 2)
 
         self.__app = QGuiApplication()
+        # Without a configured rate, frames are not rendered faster than the display refreshes.
+        self.__frame_pacer = FramePacer(
+            max_fps or self.__app.primaryScreen().refreshRate(), demand_driven, idle_fps=idle_fps
+        )
         self.__engine = QQmlApplicationEngine()
         self.__configuration_handler = ConfiguratorHandler()
+        self.__asyncio_bridge = AsyncioBridge() if self.__configuration_handler.use_asyncio else None
 
-        self.__vehicle_tracking_configurator_model = ModelVehicleTrackingConfigurator(self.__configuration_handler)
+        self.__vehicle_tracking_configurator_model = ModelVehicleTrackingConfigurator(
+            self.__configuration_handler, self.__asyncio_bridge, self.__frame_pacer
+        )
 
         self.__frames_receiver = pynng.Sub0(dial=self.__recv_frames_address, block_on_dial=False)
         self.__frames_receiver.subscribe("")
 
-        self.__point_drawer_image_provider = StreamImageProvider(1332, 990)
-        self.__point_shower_image_provider = StreamImageProvider(1332, 990)
-
-        self.__engine.addImageProvider("point_drawer", self.__point_drawer_image_provider)
-        self.__engine.addImageProvider("point_shower", self.__point_shower_image_provider)
+        qmlRegisterType(
+            VideoFrameItem, "VehicleTrackingConfigurator", 1, 0, "VideoFrameItem"  # type: ignore[call-overload]
+        )
 
         self.__engine.rootContext().setContextProperty("configurator_interface", self)
         self.__engine.rootContext().setContextProperty(
@@ -91,27 +81,85 @@ class ConfiguratorInterface:
 
         self.__engine.load(FILE_DIR / "frontend/qml/main.qml")
 
+        root = self.__engine.rootObjects()[0]
+        self.__point_drawer_item = cast(VideoFrameItem, root.findChild(VideoFrameItem, "pointsDrawerStream"))
+        self.__point_shower_item = cast(VideoFrameItem, root.findChild(VideoFrameItem, "pointsShowerStream"))
+        self.__topview_item = cast(VideoFrameItem, root.findChild(VideoFrameItem, "topviewStream"))
+        self.__point_drawer_item.frame_pacer = self.__frame_pacer
+        self.__point_shower_item.frame_pacer = self.__frame_pacer
+        self.__topview_item.frame_pacer = self.__frame_pacer
+        self.__release_drawer_frame = partial(self.__configuration_handler.release_frame, DRAWER_VIEW)
+        self.__release_shower_frame = partial(self.__configuration_handler.release_frame, SHOWER_VIEW)
+        self.__release_topview_frame = partial(self.__configuration_handler.release_frame, TOPVIEW_VIEW)
+
         self.image_count = 0
 
         self.__stop_thread_event = Event()
         self.__transmit_images_from_backend_to_frontend_thread = Thread(
             target=self.__transmit_images_from_backend_to_frontend_worker
         )
-        self.__transmit_images_from_backend_to_frontend_thread.start()
+        if self.__asyncio_bridge is not None:
+            self.__asyncio_bridge.submit(self.__transmit_images_from_backend_to_frontend())
+        else:
+            self.__transmit_images_from_backend_to_frontend_thread.start()
 
     def __transmit_images_from_backend_to_frontend_worker(self) -> None:
         """A function that constantly sends new images to the UI."""
         while not self.__stop_thread_event.is_set():
-            drawer_frame = self.__configuration_handler.read_drawer_frame()
-            shower_frame = self.__configuration_handler.read_shower_frame()
-
-            self.__point_drawer_image_provider.img = QImage(drawer_frame, 1332, 990, QImage.Format_BGR888)  # type: ignore[attr-defined]
-            self.__point_shower_image_provider.img = QImage(shower_frame, 1332, 990, QImage.Format_BGR888)  # type: ignore[attr-defined]
+            self.__frame_pacer.wait()
+            try:
+                drawer_frame, shower_frame, topview_frame = self.__configuration_handler.read_frames()
+            except TimeoutError:
+                continue
+            self.__show_frames(drawer_frame, shower_frame, topview_frame)
+
+    async def __transmit_images_from_backend_to_frontend(self) -> None:
+        """A coroutine that constantly sends new images to the UI, running on the asyncio bridge."""
+        while not self.__stop_thread_event.is_set():
+            await self.__frame_pacer.async_wait()
+            try:
+                drawer_frame, shower_frame, topview_frame = await self.__configuration_handler.aread_frames()
+            except TimeoutError:
+                continue
+            self.__show_frames(drawer_frame, shower_frame, topview_frame)
+
+    def __show_frames(
+        self, drawer_frame: np.ndarray | None, shower_frame: np.ndarray | None, topview_frame: np.ndarray | None
+    ) -> None:
+        """Hands the rendered frames to the UI, the images of hidden views are kept.
 
-            self.__vehicle_tracking_configurator_model.reload_image.emit()
+        Args:
+            drawer_frame (np.ndarray | None): The rendered drawer frame, None if the drawer is hidden.
+            shower_frame (np.ndarray | None): The rendered shower frame, None if the shower is hidden.
+            topview_frame (np.ndarray | None): The rendered top view, None if the top view is hidden.
+        """
+        stage_timer = self.__configuration_handler.stage_timer
+        if not self.__configuration_handler.verify_frame():
+            for view, frame in zip(VIEWS, (drawer_frame, shower_frame, topview_frame)):
+                if frame is not None:
+                    self.__configuration_handler.release_frame(view, frame)
+            stage_timer.lap("torn_frame")
+            stage_timer.finish()
+            return
+
+        shown = drawer_frame is not None or shower_frame is not None or topview_frame is not None
+        # The pacer is told first, the items may show the frames before set_frame returns.
+        self.__frame_pacer.frame_published(shown)
+        if drawer_frame is not None:
+            self.__point_drawer_item.set_frame(drawer_frame, self.__release_drawer_frame)
+        if shower_frame is not None:
+            self.__point_shower_item.set_frame(shower_frame, self.__release_shower_frame)
+        if topview_frame is not None:
+            self.__topview_item.set_frame(topview_frame, self.__release_topview_frame)
+        stage_timer.lap("hand_over")
+        stage_timer.finish()
 
     def run(self) -> None:
         """Run the QT application."""
         self.__app.exec_()
         self.__stop_thread_event.set()
-        self.__transmit_images_from_backend_to_frontend_thread.join()
+        if self.__asyncio_bridge is not None:
+            self.__asyncio_bridge.stop()
+        else:
+            self.__transmit_images_from_backend_to_frontend_thread.join()
+        self.__configuration_handler.close()
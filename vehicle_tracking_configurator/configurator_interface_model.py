@@ -1,9 +1,13 @@
 """The interface model for the configurator."""
 # Copyright (C) 2023, NG:ITL
 
+from concurrent.futures import Future
+
 from PySide6.QtCore import QObject, Signal, Slot
 
 from vehicle_tracking_configurator.configurator import ConfiguratorHandler
+from vehicle_tracking_configurator.asyncio_bridge import AsyncioBridge
+from vehicle_tracking_configurator.frame_pacing import FramePacer
 
 
 REGION_OF_INTEREST = "Region of Interest"
@@ -16,10 +20,10 @@ class ModelVehicleTrackingConfigurator(QObject):
 
     Args:
         configurator (ConfiguratorHandler): The configuration handler.
+        asyncio_bridge (AsyncioBridge | None): The event loop to exchange the config on, None to exchange it directly.
+        frame_pacer (FramePacer | None): The pacer to switch to the idle rate while the window is not in use.
     """
 
-    reload_image = Signal(name="reloadImage")
-
     color_text_changed_signal = Signal(list, name="colorTextChanged")
 
     region_of_interest_points_changed_signal = Signal(list, name="regionOfInterestPointsChanged")
@@ -28,12 +32,24 @@ class ModelVehicleTrackingConfigurator(QObject):
 
     region_of_interest_point_chosen_signal = Signal(str, name="regionOfInterestPointChosen")
     transformation_point_chosen_signal = Signal(str, name="transformationPointChosen")
+    transformation_fit_changed_signal = Signal(str, name="transformationFitChanged")
 
-    def __init__(self, configurator: ConfiguratorHandler) -> None:
+    config_received = Signal(dict)
+
+    def __init__(
+        self,
+        configurator: ConfiguratorHandler,
+        asyncio_bridge: AsyncioBridge | None = None,
+        frame_pacer: FramePacer | None = None,
+    ) -> None:
         QObject.__init__(self)
         self.__configurator = configurator
+        self.__asyncio_bridge = asyncio_bridge
+        self.__frame_pacer = frame_pacer
 
         self.__active_mode: str = REGION_OF_INTEREST
+        # Emitted on the event loop thread, so the configuration is applied on the GUI thread.
+        self.config_received.connect(self.__apply_received_config)
 
     def update_ui_data(self, to_update: str) -> None:
         """Updates the data in the UI.
@@ -61,13 +77,32 @@ class ModelVehicleTrackingConfigurator(QObject):
                 self.region_of_interest_points_changed_signal.emit(data)
             case "Transformation Points":
                 current_point = str(self.__configurator.current_selected_point[TRANSFORMATION_POINTS])
-                complete_data = self.__configurator.configured_transformation_points[current_point]
-
-                image_coords = complete_data["image"]
-                real_coords = complete_data["real"]
-
-                data = [real_coords[0], real_coords[1], str(image_coords[0]), str(image_coords[1])]
+                image_coords: tuple[int, int] | tuple[float, float] = (0, 0)
+                real_coords: tuple[int, int] | tuple[float, float] = (0.0, 0.0)
+                if current_point in self.__configurator.configured_transformation_points:
+                    complete_data = self.__configurator.configured_transformation_points[current_point]
+                    image_coords = complete_data["image"]
+                    real_coords = complete_data["real_world"]
+
+                data = [int(image_coords[0]), int(image_coords[1]), str(real_coords[0]), str(real_coords[1])]
+                self.transformation_point_chosen_signal.emit(current_point)
                 self.transformation_points_changed_signal.emit(data)
+                self.update_transformation_fit()
+
+    def update_transformation_fit(self) -> None:
+        """Shows the reprojection error of the selected transformation point and of the whole fit in the UI."""
+        error = self.__configurator.transformation_error
+        rms_error = self.__configurator.transformation_rms_error
+        if error is not None or rms_error is None:
+            self.transformation_fit_changed_signal.emit(error or "")
+            return
+
+        current_point = str(self.__configurator.current_selected_point[TRANSFORMATION_POINTS])
+        point_error = self.__configurator.transformation_reprojection_errors.get(current_point)
+        if point_error is None:
+            self.transformation_fit_changed_signal.emit(f"RMS error: {rms_error:.3f} m")
+        else:
+            self.transformation_fit_changed_signal.emit(f"Error: {point_error:.3f} m, RMS error: {rms_error:.3f} m")
 
     @Slot(bool, bool, bool)  # type: ignore[arg-type]
     def updated_mode(self, roi_state: bool, t_point_state: bool, time_tracking_state: bool) -> None:
@@ -85,6 +120,39 @@ class ModelVehicleTrackingConfigurator(QObject):
         elif time_tracking_state:
             self.__active_mode = TIME_TRACKING
 
+    @Slot(str, bool)  # type: ignore[arg-type]
+    def view_visibility_changed(self, view: str, visible: bool) -> None:
+        """A function that is called from the frontend when a video view is shown or covered.
+
+        Args:
+            view (str): The name of the view, "point_drawer", "point_shower" or "top_view".
+            visible (bool): Whether the view is visible.
+        """
+        self.__configurator.set_view_visible(view, visible)
+
+    @Slot(str, int, int)  # type: ignore[arg-type]
+    def view_size_changed(self, view: str, width: int, height: int) -> None:
+        """A function that is called from the frontend when a video view is resized.
+
+        Args:
+            view (str): The name of the view, "point_drawer", "point_shower" or "top_view".
+            width (int): The displayed width of the view in device pixels.
+            height (int): The displayed height of the view in device pixels.
+        """
+        self.__configurator.set_view_size(view, width, height)
+
+    @Slot(bool, bool)  # type: ignore[arg-type]
+    def window_state_changed(self, visible: bool, active: bool) -> None:
+        """A function that is called from the frontend when the window is minimized, restored, focused or unfocused.
+
+        Args:
+            visible (bool): Whether the window is visible, False while it is minimized or hidden.
+            active (bool): Whether the window has the focus.
+        """
+        self.__configurator.set_window_visible(visible)
+        if self.__frame_pacer is not None:
+            self.__frame_pacer.set_idle(not (visible and active))
+
     @Slot(str)  # type: ignore[arg-type]
     def config_button_pressed(self, button_text: str) -> None:
         """A function that is called from the frontend when a config button is pressed.
@@ -92,12 +160,41 @@ class ModelVehicleTrackingConfigurator(QObject):
         Args:
             button_text (str): The text of the button that was pressed.
         """
+        if self.__asyncio_bridge is not None:
+            # Only the sockets are served on the event loop, the configuration is read and changed on the GUI thread.
+            match button_text:
+                case "Receive Config":
+                    receiving = self.__asyncio_bridge.submit(self.__configurator.areceive_config())
+                    receiving.add_done_callback(self.__config_received)
+                case "Transmit Config":
+                    request = self.__configurator.create_set_config_request()
+                    self.__asyncio_bridge.submit(self.__configurator.asend_config(request))
+            return
+
         match button_text:
             case "Receive Config":
                 self.__configurator.receive_config()
             case "Transmit Config":
                 self.__configurator.send_config()
 
+    def __config_received(self, receiving: Future[dict]) -> None:
+        """Hands a received configuration to the GUI thread, called on the event loop thread.
+
+        Args:
+            receiving (Future[dict]): The finished receiving of the configuration, errors are printed by the bridge.
+        """
+        if not receiving.cancelled() and receiving.exception() is None:
+            self.config_received.emit(receiving.result())
+
+    @Slot(dict)  # type: ignore[arg-type]
+    def __apply_received_config(self, config: dict) -> None:
+        """Applies a configuration received on the event loop.
+
+        Args:
+            config (dict): The received configuration.
+        """
+        self.__configurator.apply_config(config)
+
     @Slot(str, str, str)  # type: ignore[arg-type]
     def coordinate_text_changed(self, input_id: str, config_name: str, text: str) -> None:
         """A function that is called from the frontend when a coordinate text is changed.
@@ -115,6 +212,10 @@ class ModelVehicleTrackingConfigurator(QObject):
         match config_name:
             case "Transformation Points":
                 self.__configurator.transformation_config_text_changed(is_image_coord, coord_index, number)
+                self.transformation_point_chosen_signal.emit(
+                    str(self.__configurator.current_selected_point[TRANSFORMATION_POINTS])
+                )
+                self.update_transformation_fit()
             case "Region of Interest":
                 image_x, image_y, real_x, real_y = self.__configurator.roi_config_text_changed(
                     is_image_coord, coord_index, number
@@ -171,6 +272,7 @@ class ModelVehicleTrackingConfigurator(QObject):
             case "Transformation Points":
                 self.transformation_point_chosen_signal.emit(new_name)
                 self.transformation_points_changed_signal.emit(list(coords))
+                self.update_transformation_fit()
 
     @Slot(str)  # type: ignore[arg-type]
     def color_chooser_button_clicked(self, button_color: str) -> None:
@@ -203,7 +305,11 @@ class ModelVehicleTrackingConfigurator(QObject):
             case "Region of Interest":
                 self.region_of_interest_points_changed_signal.emit(list(points))
             case "Transformation Points":
+                self.transformation_point_chosen_signal.emit(
+                    str(self.__configurator.current_selected_point[TRANSFORMATION_POINTS])
+                )
                 self.transformation_points_changed_signal.emit(list(points))
+                self.update_transformation_fit()
 
     @Slot(int, int, int, int, int, int)  # type: ignore[arg-type]
     def points_shower_clicked(
@@ -0,0 +1,77 @@
+"""Provides the persistent double buffer the views are rendered into."""
+# Copyright (C) 2023, NG:ITL
+
+from threading import Lock
+
+import numpy as np
+
+
+class DoubleFrameBuffer:
+    """Two persistent frame buffers, the back buffer is rendered into while the front buffer is shown.
+
+    The buffers are only allocated again when the shape of the rendered frames changes, so the UI can wrap them into
+    images once instead of copying every frame. A buffer handed to the UI by `swap` is in use until the UI releases it,
+    and is never returned as back buffer before. If the UI still reads the previous frame when the next one is
+    rendered, a third buffer is allocated instead of overwriting it.
+    """
+
+    def __init__(self) -> None:
+        self.__buffers = [np.zeros((0, 0, 3), dtype=np.uint8), np.zeros((0, 0, 3), dtype=np.uint8)]
+        self.__in_use = [False, False]
+        self.__front = 0
+        self.__back = 1
+        self.__lock = Lock()
+
+    def back(self, shape: tuple[int, ...]) -> np.ndarray:
+        """Returns the back buffer to render the next frame into.
+
+        Args:
+            shape (tuple[int, ...]): The shape of the next frame.
+
+        Returns:
+            np.ndarray: The back buffer, its content is undefined.
+        """
+        with self.__lock:
+            free = [index for index in range(len(self.__buffers)) if index != self.__front and not self.__in_use[index]]
+            if free:
+                self.__back = free[0]
+            else:
+                self.__back = len(self.__buffers)
+                self.__buffers.append(np.zeros(shape, dtype=np.uint8))
+                self.__in_use.append(False)
+            if self.__buffers[self.__back].shape != shape:
+                self.__buffers[self.__back] = np.zeros(shape, dtype=np.uint8)
+            return self.__buffers[self.__back]
+
+    def swap(self) -> np.ndarray:
+        """Makes the back buffer the front buffer, once the next frame is completely rendered into it.
+
+        The new front buffer is in use until it is released.
+
+        Returns:
+            np.ndarray: The new front buffer.
+        """
+        with self.__lock:
+            self.__front = self.__back
+            self.__in_use[self.__front] = True
+            return self.__buffers[self.__front]
+
+    def release(self, frame: np.ndarray) -> None:
+        """Marks a buffer handed out by `swap` as no longer read, so it can be rendered into again.
+
+        Args:
+            frame (np.ndarray): The released buffer.
+        """
+        with self.__lock:
+            for index, buffer in enumerate(self.__buffers):
+                if buffer is frame:
+                    self.__in_use[index] = False
+
+    def front(self) -> np.ndarray:
+        """Returns the front buffer holding the last completely rendered frame.
+
+        Returns:
+            np.ndarray: The front buffer.
+        """
+        with self.__lock:
+            return self.__buffers[self.__front]
@@ -0,0 +1,65 @@
+"""Provides preallocated buffers for ingesting camera frames."""
+# Copyright (C) 2023, NG:ITL
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """A ring of preallocated frame buffers which received frames are copied into.
+
+    Stored frames are handed out as views on the preallocated buffers. A view stays valid until the ring has
+    wrapped around, i.e. for `slots - 1` further stored frames.
+
+    Args:
+        width (int): The width of the frames.
+        height (int): The height of the frames.
+        slots (int): The number of preallocated buffers.
+    """
+
+    def __init__(self, width: int, height: int, slots: int = 3) -> None:
+        if slots < 2:
+            raise ValueError(f"A frame ring buffer needs at least 2 slots, got {slots}.")
+
+        self.__buffers = np.zeros((slots, height, width, 3), dtype=np.uint8)
+        self.__flat_buffers = self.__buffers.reshape(slots, -1)
+        self.__index = 0
+
+    @property
+    def frame_shape(self) -> tuple[int, int, int]:
+        """The shape of the stored frames (height, width, channels)."""
+        _, height, width, channels = self.__buffers.shape
+        return (height, width, channels)
+
+    @property
+    def latest(self) -> np.ndarray:
+        """The most recently stored frame."""
+        return self.__buffers[self.__index]
+
+    def next_buffer(self) -> np.ndarray:
+        """Advances the ring and returns the buffer the next frame is written into.
+
+        Returns:
+            np.ndarray: The buffer of the next frame, which also becomes the latest frame.
+        """
+        self.__index = (self.__index + 1) % len(self.__buffers)
+        return self.__buffers[self.__index]
+
+    def store(self, frame_bytes: bytes | memoryview) -> np.ndarray:
+        """Copies a raw BGR frame into the next buffer of the ring.
+
+        Args:
+            frame_bytes (bytes | memoryview): The raw frame data.
+
+        Raises:
+            ValueError: If the size of the frame does not match the size of the buffers.
+
+        Returns:
+            np.ndarray: A view on the buffer holding the frame.
+        """
+        expected_size = self.__flat_buffers.shape[1]
+        if len(frame_bytes) != expected_size:
+            raise ValueError(f"Received frame has {len(frame_bytes)} bytes, expected {expected_size} bytes.")
+
+        self.next_buffer()
+        np.copyto(self.__flat_buffers[self.__index], np.frombuffer(frame_bytes, dtype=np.uint8))
+        return self.__buffers[self.__index]
@@ -0,0 +1,362 @@
+"""Provides the overlays drawn on top of the camera frames.
+
+The overlays only change on user input, so they are rendered once into cached layers and composited onto every frame
+with a few vectorized operations.
+"""
+# Copyright (C) 2023, NG:ITL
+
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+import cv2
+
+
+OVERLAY_COVERAGE = 255
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.5
+LABEL_MARGIN = 3
+LABEL_SPRITE_CACHE_SIZE = 64
+
+
+def get_label_offset(point_name: str, text_size: tuple[int, int]) -> tuple[int, int]:
+    """Calculates the position of a label relative to its transformation point.
+
+    Args:
+        point_name (str): The name of the transformation point, the labels of additional points are placed like the
+            top left one.
+        text_size (tuple[int, int]): The size (width, height) of the label text.
+
+    Returns:
+        tuple[int, int]: The offset of the bottom left corner of the text.
+    """
+    match point_name:
+        case "top_left":
+            return 10, 10
+        case "top_right":
+            return -text_size[0] - 10, 10
+        case "bottom_left":
+            return 10, text_size[1] - 10
+        case "bottom_right":
+            return -text_size[0] - 10, text_size[1] - 10
+        case _:
+            return 10, 10
+
+
+class LabelSprite(NamedTuple):
+    """A pre-rasterized label.
+
+    Args:
+        coverage (np.ndarray): The read only coverage of the label, with a margin around the text.
+        text_size (tuple[int, int]): The size (width, height) of the text, like cv2.getTextSize returns it.
+        origin (tuple[int, int]): The position of the bottom left corner of the text within the sprite.
+    """
+
+    coverage: np.ndarray
+    text_size: tuple[int, int]
+    origin: tuple[int, int]
+
+
+class OverlaySegment(NamedTuple):
+    """A segment of the region of interest outline.
+
+    Args:
+        start (tuple[int, int]): The start point of the segment.
+        end (tuple[int, int]): The end point of the segment.
+    """
+
+    start: tuple[int, int]
+    end: tuple[int, int]
+
+
+class OverlayCircle(NamedTuple):
+    """The circle marking a transformation point.
+
+    Args:
+        center (tuple[int, int]): The transformation point.
+    """
+
+    center: tuple[int, int]
+
+
+class OverlayLabel(NamedTuple):
+    """The label of a transformation point.
+
+    Args:
+        text (str): The text of the label.
+        corner (tuple[int, int]): The position of the top left corner of the label sprite.
+        size (tuple[int, int]): The size (width, height) of the label sprite.
+    """
+
+    text: str
+    corner: tuple[int, int]
+    size: tuple[int, int]
+
+
+OverlayElement = OverlaySegment | OverlayCircle | OverlayLabel
+
+
+@lru_cache(maxsize=LABEL_SPRITE_CACHE_SIZE)
+def render_label_sprite(text: str, font: int, scale: float, color: int, thickness: int = 1) -> LabelSprite:
+    """Rasterizes a label once, later calls with the same label are served from a LRU cache.
+
+    Args:
+        text (str): The text of the label.
+        font (int): The cv2 font of the label.
+        scale (float): The font scale of the label.
+        color (int): The coverage the text is drawn with.
+        thickness (int): The thickness of the strokes.
+
+    Returns:
+        LabelSprite: The rasterized label.
+    """
+    (width, height), baseline = cv2.getTextSize(text, font, scale, thickness)
+    origin = (LABEL_MARGIN, LABEL_MARGIN + height)
+    coverage = np.zeros((height + baseline + 2 * LABEL_MARGIN, width + 2 * LABEL_MARGIN), dtype=np.uint8)
+    cv2.putText(coverage, text, origin, font, scale, (color,), thickness, cv2.LINE_AA)
+    coverage.flags.writeable = False
+    return LabelSprite(coverage, (width, height), origin)
+
+
+class DrawerOverlay:
+    """The region of interest and the labeled transformation points drawn on the point drawer frames.
+
+    The overlay is white, so it is rendered into a cached coverage mask. The mask is made up of elements, the segments
+    of the region of interest outline, the point circles and their labels. Once the points change, only the bounding
+    boxes of the removed and added elements are rendered again, so moving a single point stays cheap even with hundreds
+    of region of interest points. Labels are blitted from pre-rasterized sprites, so text is only rasterized when a
+    label changes. Every frame is blended towards white by the coverage of the covered pixels, whose
+    cost only depends on the covered area and not on the number of points and labels.
+    """
+
+    def __init__(self) -> None:
+        self.__key: tuple | None = None
+        self.__mask = np.zeros((0, 0), dtype=np.uint8)
+        self.__scratch = np.zeros((0, 0), dtype=np.uint8)
+        self.__elements: list[OverlayElement] = []
+        self.__element_bounds = np.zeros((0, 4), dtype=np.int64)
+        self.__indices = np.zeros(0, dtype=np.intp)
+        self.__coverage = np.zeros((0, 1), dtype=np.uint16)
+
+    def update(
+        self,
+        frame_shape: tuple[int, ...],
+        region_of_interest_points: list[tuple[int, int]],
+        transformation_points: dict[str, dict[str, tuple[float, float] | tuple[int, int]]],
+    ) -> None:
+        """Renders the changed parts of the overlay again if the points or the frame shape changed.
+
+        Args:
+            frame_shape (tuple[int, ...]): The shape of the frames the overlay is blended onto.
+            region_of_interest_points (list[tuple[int, int]]): The points of the region of interest.
+            transformation_points (dict[str, dict[str, tuple[float, float] | tuple[int, int]]]): The transformation
+                points with their image and real world coordinates.
+        """
+        key = (frame_shape, tuple(region_of_interest_points), repr(transformation_points))
+        if key == self.__key:
+            return
+
+        previous_elements = set(self.__elements)
+        self.__elements = self.__create_elements(region_of_interest_points, transformation_points)
+        self.__key = key
+        self.__element_bounds = np.array(
+            [self.__get_bounds(element) for element in self.__elements], dtype=np.int64
+        ).reshape(-1, 4)
+
+        height, width = frame_shape[:2]
+        if self.__mask.shape != (height, width):
+            self.__mask = np.zeros((height, width), dtype=np.uint8)
+            self.__scratch = np.zeros((height, width), dtype=np.uint8)
+            self.__indices = np.zeros(0, dtype=np.intp)
+            self.__coverage = np.zeros((0, 1), dtype=np.uint16)
+            self.__render((0, 0, width, height))
+        else:
+            changed_elements = previous_elements.symmetric_difference(self.__elements)
+            dirty_rectangles = [self.__get_bounds(element) for element in changed_elements]
+            dirty_area = sum((right - left) * (bottom - top) for left, top, right, bottom in dirty_rectangles)
+            # Rendering many large rectangles one by one costs more than rendering the whole mask once.
+            if dirty_area >= width * height // 4:
+                dirty_rectangles = [(0, 0, width, height)]
+            for dirty_rectangle in dirty_rectangles:
+                self.__render(dirty_rectangle)
+
+    @staticmethod
+    def __create_elements(
+        region_of_interest_points: list[tuple[int, int]],
+        transformation_points: dict[str, dict[str, tuple[float, float] | tuple[int, int]]],
+    ) -> list[OverlayElement]:
+        """Splits the overlay into the elements it is drawn from.
+
+        Args:
+            region_of_interest_points (list[tuple[int, int]]): The points of the region of interest.
+            transformation_points (dict[str, dict[str, tuple[float, float] | tuple[int, int]]]): The transformation
+                points with their image and real world coordinates.
+
+        Returns:
+            list[OverlayElement]: The segments, circles and labels of the overlay.
+        """
+        elements: list[OverlayElement] = []
+        points = [(int(x), int(y)) for x, y in region_of_interest_points]
+        for index, start in enumerate(points):
+            elements.append(OverlaySegment(start, points[(index + 1) % len(points)]))
+
+        for point_name, point in transformation_points.items():
+            if "image" not in point or "real_world" not in point:
+                continue
+            image_point = (int(point["image"][0]), int(point["image"][1]))
+            elements.append(OverlayCircle(image_point))
+            text = f"{point['real_world']}; {point_name}"
+            sprite = render_label_sprite(text, LABEL_FONT, LABEL_SCALE, OVERLAY_COVERAGE)
+            offset_x, offset_y = get_label_offset(point_name, sprite.text_size)
+            corner = (image_point[0] + offset_x - sprite.origin[0], image_point[1] + offset_y - sprite.origin[1])
+            elements.append(OverlayLabel(text, corner, (sprite.coverage.shape[1], sprite.coverage.shape[0])))
+        return elements
+
+    @staticmethod
+    def __get_bounds(element: OverlayElement) -> tuple[int, int, int, int]:
+        """Calculates the rectangle an element is drawn within.
+
+        Args:
+            element (OverlayElement): The element.
+
+        Returns:
+            tuple[int, int, int, int]: The left, top, right and bottom edges of the rectangle, right and bottom exclusive.
+        """
+        match element:
+            case OverlaySegment((start_x, start_y), (end_x, end_y)):
+                return (
+                    min(start_x, end_x) - 2,
+                    min(start_y, end_y) - 2,
+                    max(start_x, end_x) + 3,
+                    max(start_y, end_y) + 3,
+                )
+            case OverlayCircle((x, y)):
+                return x - 6, y - 6, x + 7, y + 7
+            case OverlayLabel(_, (x, y), (width, height)):
+                return x, y, x + width, y + height
+        raise ValueError(f"Overlay element {element} is invalid.")
+
+    def __render(self, rectangle: tuple[int, int, int, int]) -> None:
+        """Draws all elements overlapping a rectangle of the mask again and updates the covered pixels within it.
+
+        Args:
+            rectangle (tuple[int, int, int, int]): The left, top, right and bottom edges of the rectangle.
+        """
+        height, width = self.__mask.shape
+        left, top = max(rectangle[0], 0), max(rectangle[1], 0)
+        right, bottom = min(rectangle[2], width), min(rectangle[3], height)
+        if left >= right or top >= bottom:
+            return
+
+        bounds = self.__element_bounds
+        overlapping = np.flatnonzero(
+            (bounds[:, 0] < right) & (bounds[:, 2] > left) & (bounds[:, 1] < bottom) & (bounds[:, 3] > top)
+        )
+        # Clipping a line to a smaller image changes its rasterization, so the elements are drawn on a frame sized
+        # scratch mask, of which only the rectangle is copied.
+        scratch = self.__scratch
+        for index in overlapping:
+            match self.__elements[index]:
+                case OverlaySegment(start, end):
+                    cv2.line(scratch, start, end, (OVERLAY_COVERAGE,), 2)
+                case OverlayCircle(center):
+                    cv2.circle(scratch, center, 5, (OVERLAY_COVERAGE,), -1)
+                case OverlayLabel(text, corner, _):
+                    self.__blit_label(text, corner)
+        region = scratch[top:bottom, left:right]
+        self.__mask[top:bottom, left:right] = region
+
+        rows, columns = np.divmod(self.__indices, width)
+        outside = (rows < top) | (rows >= bottom) | (columns < left) | (columns >= right)
+        region_rows, region_columns = np.nonzero(region)
+        self.__indices = np.concatenate(
+            (self.__indices[outside], (region_rows + top) * width + region_columns + left)
+        ).astype(np.intp)
+        self.__coverage = np.concatenate(
+            (self.__coverage[outside], region[region_rows, region_columns, np.newaxis].astype(np.uint16))
+        )
+
+        if len(overlapping) > 0:
+            drawn_left, drawn_top = np.maximum(bounds[overlapping, :2].min(axis=0), 0)
+            drawn_right, drawn_bottom = bounds[overlapping, 2:].max(axis=0)
+            scratch[drawn_top:drawn_bottom, drawn_left:drawn_right] = 0
+
+    def __blit_label(self, text: str, corner: tuple[int, int]) -> None:
+        """Composites a label sprite onto the scratch mask like cv2.putText would draw it.
+
+        Args:
+            text (str): The text of the label.
+            corner (tuple[int, int]): The position of the top left corner of the sprite.
+        """
+        coverage = render_label_sprite(text, LABEL_FONT, LABEL_SCALE, OVERLAY_COVERAGE).coverage
+        height, width = self.__scratch.shape
+        left, top = max(corner[0], 0), max(corner[1], 0)
+        right, bottom = min(corner[0] + coverage.shape[1], width), min(corner[1] + coverage.shape[0], height)
+        if left >= right or top >= bottom:
+            return
+
+        region = self.__scratch[top:bottom, left:right]
+        sprite = coverage[top - corner[1] : bottom - corner[1], left - corner[0] : right - corner[0]].astype(np.uint16)
+        region += ((255 - region) * sprite + 127) // 255  # type: ignore[arg-type]
+
+    def blend(self, frame: np.ndarray) -> None:
+        """Blends the overlay onto a frame in place.
+
+        Args:
+            frame (np.ndarray): The contiguous BGR frame with the shape the overlay was last updated for.
+        """
+        pixels = frame.reshape(-1, 3)
+        values = pixels[self.__indices].astype(np.uint16)
+        values += ((255 - values) * self.__coverage + 127) // 255  # type: ignore[arg-type]
+        pixels[self.__indices] = values
+
+
+class RegionOfInterestShade:
+    """The shading of everything outside of the region of interest on the point shower frames.
+
+    The weight of every frame pixel and the premultiplied shading color are calculated once per change of the region of
+    interest or its color. Every frame is then shaded with a multiplication and an addition into an output buffer.
+    """
+
+    def __init__(self) -> None:
+        self.__key: tuple | None = None
+        self.__weights = np.zeros((0, 0, 3), dtype=np.uint8)
+        self.__premultiplied_color = np.zeros((0, 0, 3), dtype=np.uint8)
+
+    def update(
+        self,
+        frame_shape: tuple[int, ...],
+        region_of_interest_points: list[tuple[int, int]],
+        color: tuple[int, int, int, int],
+    ) -> None:
+        """Calculates the shading again if the region of interest, its color or the frame shape changed.
+
+        Args:
+            frame_shape (tuple[int, ...]): The shape of the frames to shade.
+            region_of_interest_points (list[tuple[int, int]]): The points of the region of interest.
+            color (tuple[int, int, int, int]): The RGBA color everything outside of the region of interest is shaded with.
+        """
+        key = (frame_shape, tuple(region_of_interest_points), color)
+        if key == self.__key:
+            return
+        self.__key = key
+
+        red, green, blue, alpha = color
+        outside = np.full(frame_shape[:2], 255, dtype=np.uint8)
+        if len(region_of_interest_points) > 0:
+            cv2.fillPoly(outside, [np.array(region_of_interest_points, dtype=np.int32)], (0,))
+        coverage = outside.astype(np.uint16)[:, :, np.newaxis] * alpha // 255
+
+        self.__weights = (255 - coverage).astype(np.uint8).repeat(3, axis=2)
+        bgr = np.array((blue, green, red), dtype=np.uint16)
+        self.__premultiplied_color = ((bgr * coverage + 127) // 255).astype(np.uint8)
+
+    def apply(self, frame: np.ndarray, output: np.ndarray) -> None:
+        """Shades a frame.
+
+        Args:
+            frame (np.ndarray): The BGR frame with the shape the shading was last updated for.
+            output (np.ndarray): The buffer with the same shape to write the shaded frame into.
+        """
+        cv2.multiply(frame, self.__weights, dst=output, scale=1 / 255)
+        cv2.add(output, self.__premultiplied_color, dst=output)
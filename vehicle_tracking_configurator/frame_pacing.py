@@ -0,0 +1,133 @@
+"""Provides the pacing of the rendered frames to the display."""
+# Copyright (C) 2023, NG:ITL
+
+from typing import Callable
+from threading import Event, Lock
+import asyncio
+import time
+
+
+class FramePacer:
+    """Paces the rendering of frames to the rate the UI displays them at.
+
+    A frame is only rendered once the UI showed the previous frame, and not faster than the target rate. If the UI does
+    not show a frame in time, e.g. because the window is hidden, the next frame is rendered anyway after a timeout.
+    While the UI is idle, e.g. because the window is minimized or unfocused, frames are rendered at the idle rate
+    instead.
+
+    Args:
+        max_fps (float): The target rate in frames per second, 0 for no limit.
+        demand_driven (bool): Wait until the previous frame was shown by the UI.
+        timeout (float): The time in seconds after which a frame is rendered although the previous one was not
+            shown.
+        idle_fps (float): The rate in frames per second while the UI is idle, 0 for no limit.
+    """
+
+    def __init__(
+        self, max_fps: float = 0, demand_driven: bool = True, timeout: float = 0.5, idle_fps: float = 2
+    ) -> None:
+        self.__active_interval = 1 / max_fps if max_fps > 0 else 0.0
+        self.__idle_interval = 1 / idle_fps if idle_fps > 0 else 0.0
+        self.__min_interval = self.__active_interval
+        self.__rate_changed = Event()
+        self.__demand_driven = demand_driven
+        self.__timeout = timeout
+        self.__consumed = Event()
+        self.__consumed.set()
+        self.__last_published = 0.0
+        self.__wakers: set[Callable[[], None]] = set()
+        self.__wakers_lock = Lock()
+
+    def set_idle(self, idle: bool) -> None:
+        """Switches between the target rate and the idle rate.
+
+        Args:
+            idle (bool): Whether the UI is idle.
+        """
+        self.__min_interval = self.__idle_interval if idle else self.__active_interval
+        self.__rate_changed.set()
+        self.__wake()
+
+    def frame_consumed(self) -> None:
+        """Marks the last published frame as shown by the UI."""
+        self.__consumed.set()
+        self.__wake()
+
+    def frame_published(self, shown: bool = True) -> None:
+        """Marks that a new frame is published, must be called before the frame is handed to the UI.
+
+        Args:
+            shown (bool): Whether the UI will show the frame, False if no view was rendered because none is visible.
+        """
+        if shown:
+            self.__consumed.clear()
+        self.__last_published = time.monotonic()
+
+    def wait(self) -> bool:
+        """Blocks until the next frame should be rendered.
+
+        Returns:
+            bool: True if the previous frame was shown by the UI, False if the wait timed out.
+        """
+        consumed = self.__consumed.wait(self.__timeout) if self.__demand_driven else True
+        # A change of the rate ends the wait early, so leaving the idle rate does not wait for the idle interval.
+        while True:
+            self.__rate_changed.clear()
+            delay = self.__last_published + self.__min_interval - time.monotonic()
+            if delay <= 0 or not self.__rate_changed.wait(delay):
+                return consumed
+
+    async def async_wait(self) -> bool:
+        """Waits until the next frame should be rendered without blocking the running event loop.
+
+        Returns:
+            bool: True if the previous frame was shown by the UI, False if the wait timed out.
+        """
+        consumed = await self.__wait_event(self.__consumed, self.__timeout) if self.__demand_driven else True
+        while True:
+            self.__rate_changed.clear()
+            delay = self.__last_published + self.__min_interval - time.monotonic()
+            if delay <= 0 or not await self.__wait_event(self.__rate_changed, delay):
+                return consumed
+
+    async def __wait_event(self, event: Event, timeout: float) -> bool:
+        """Waits on the running event loop until an event is set, which the UI does from other threads.
+
+        Args:
+            event (Event): The event to wait for.
+            timeout (float): The maximum time to wait in seconds.
+
+        Returns:
+            bool: Whether the event was set.
+        """
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(woken.set)
+
+        deadline = loop.time() + timeout
+        with self.__wakers_lock:
+            self.__wakers.add(wake)
+        try:
+            # The wakers are shared by all events, so the event is checked again after every wake.
+            while True:
+                woken.clear()
+                remaining = deadline - loop.time()
+                if event.is_set() or remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(woken.wait(), remaining)
+                except TimeoutError:
+                    break
+        finally:
+            with self.__wakers_lock:
+                self.__wakers.discard(wake)
+        return event.is_set()
+
+    def __wake(self) -> None:
+        """Wakes the coroutines waiting for an event of the pacer."""
+        with self.__wakers_lock:
+            wakers = list(self.__wakers)
+        for wake in wakers:
+            wake()
@@ -0,0 +1,120 @@
+"""Provides the message format of the camera frame stream.
+
+A frame message is either a bare BGR frame, whose geometry has to be known by the receiver, or a frame prefixed with a
+small header describing its encoding and geometry. Frames with a header can also be sent as JPEG or PNG images, or
+be announced to lie in shared memory (see shared_frame_memory.py).
+"""
+# Copyright (C) 2023, NG:ITL
+
+from typing import NamedTuple
+from enum import IntEnum
+import struct
+
+import numpy as np
+import cv2
+
+
+FRAME_MAGIC = b"RAAI"
+# magic, encoding, width, height, channels
+FRAME_HEADER = struct.Struct("<4sBHHB")
+
+
+class FrameEncoding(IntEnum):
+    """The encodings of the frame data following the header."""
+
+    RAW = 0
+    JPEG = 1
+    PNG = 2
+    SHARED_MEMORY = 3
+
+
+IMAGE_EXTENSIONS = {FrameEncoding.JPEG: ".jpg", FrameEncoding.PNG: ".png"}
+
+
+class FrameHeader(NamedTuple):
+    """The header of a frame message.
+
+    Args:
+        encoding (FrameEncoding): The encoding of the frame data.
+        width (int): The width of the frame.
+        height (int): The height of the frame.
+        channels (int): The number of color channels of the frame.
+    """
+
+    encoding: FrameEncoding
+    width: int
+    height: int
+    channels: int
+
+
+def encode_frame(frame: np.ndarray, encoding: FrameEncoding = FrameEncoding.RAW, quality: int = 90) -> bytes:
+    """Creates a frame message with a header from a BGR frame.
+
+    Args:
+        frame (np.ndarray): The frame with the shape (height, width, 3).
+        encoding (FrameEncoding): The encoding of the frame data.
+        quality (int): The JPEG quality (0-100), ignored for other encodings.
+
+    Raises:
+        ValueError: If the frame could not be encoded.
+
+    Returns:
+        bytes: The frame message.
+    """
+    height, width, channels = frame.shape
+    header = FRAME_HEADER.pack(FRAME_MAGIC, encoding, width, height, channels)
+
+    if encoding == FrameEncoding.RAW:
+        return header + np.ascontiguousarray(frame).tobytes()
+
+    if encoding not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Frames can not be encoded as {encoding.name} into a single message.")
+    params: list[int] = [cv2.IMWRITE_JPEG_QUALITY, quality] if encoding == FrameEncoding.JPEG else []
+    success, encoded = cv2.imencode(IMAGE_EXTENSIONS[encoding], frame, params)
+    if not success:
+        raise ValueError(f"The frame could not be encoded as {encoding.name}.")
+    return header + encoded.tobytes()
+
+
+def decode_compressed_frame(frame_data: bytes | memoryview) -> np.ndarray:
+    """Decodes a JPEG or PNG frame.
+
+    Args:
+        frame_data (bytes | memoryview): The encoded frame data.
+
+    Raises:
+        ValueError: If the frame could not be decoded.
+
+    Returns:
+        np.ndarray: The decoded BGR frame.
+    """
+    frame = cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Received frame could not be decoded.")
+    return frame
+
+
+def decode_frame_header(message: bytes) -> tuple[FrameHeader | None, memoryview]:
+    """Splits a frame message into its header and its frame data.
+
+    Args:
+        message (bytes): The received frame message.
+
+    Returns:
+        tuple[FrameHeader | None, memoryview]: The header, None for a bare frame, and the frame data.
+    """
+    data = memoryview(message)
+    if len(message) < FRAME_HEADER.size or not message.startswith(FRAME_MAGIC):
+        return None, data
+
+    _, raw_encoding, width, height, channels = FRAME_HEADER.unpack_from(message)
+    payload = data[FRAME_HEADER.size :]
+    # A bare frame could start with the magic by chance, in which case the header does not add up.
+    try:
+        encoding = FrameEncoding(raw_encoding)
+    except ValueError:
+        return None, data
+    if encoding == FrameEncoding.RAW and len(payload) != width * height * channels:
+        return None, data
+
+    return FrameHeader(encoding, width, height, channels), payload
@@ -0,0 +1,427 @@
+"""Provides receivers for the camera frame stream."""
+# Copyright (C) 2023, NG:ITL
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import BoundedSemaphore, Condition, Event, Thread
+from collections import deque
+from functools import partial
+import asyncio
+import time
+
+from pynng import Sub0, Timeout, TryAgain
+import numpy as np
+
+from vehicle_tracking_configurator.frame_buffer import FrameRingBuffer
+from vehicle_tracking_configurator.frame_protocol import (
+    IMAGE_EXTENSIONS,
+    FrameEncoding,
+    FrameHeader,
+    decode_compressed_frame,
+    decode_frame_header,
+)
+from vehicle_tracking_configurator.shared_frame_memory import SharedFrame, SharedFrameReader, decode_shared_frame
+
+
+class FrameReceiver:
+    """Receives every camera frame in the order it was published.
+
+    The geometry of the frames is taken from the frame header if the publisher sends one, otherwise the configured
+    geometry is used. The frame buffers are reallocated whenever the geometry changes.
+
+    Compressed frames are decoded on a bounded pool of worker threads. Frames that are already queued on the socket
+    are decoded ahead in parallel, while they are still handed out in order.
+
+    Frames announced to lie in shared memory are handed out as views on the shared memory without copying them.
+    Frames that the publisher already overwrote are dropped as torn frames.
+
+    Frames can also be received on an asyncio event loop with `aread`, which does not need a thread of its own.
+
+    Frames that can not be decoded or do not have the expected size are dropped and counted as invalid frames.
+
+    Args:
+        address (str): The address of the camera frame publisher.
+        topics (list[str]): The topics to subscribe to.
+        width (int): The width of frames sent without a header.
+        height (int): The height of frames sent without a header.
+        recv_timeout (int): The time in milliseconds to wait for a frame.
+        recv_buffer_size (int | None): The number of messages the socket may queue, None for the pynng default.
+        decode_workers (int): The number of threads decoding compressed frames.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        topics: list[str],
+        width: int,
+        height: int,
+        recv_timeout: int = 1000,
+        recv_buffer_size: int | None = None,
+        decode_workers: int = 2,
+    ) -> None:
+        self._socket = Sub0(dial=address, recv_timeout=recv_timeout)
+        if recv_buffer_size is not None:
+            self._socket.recv_buffer_size = recv_buffer_size
+        self._socket.subscribe(topics)
+
+        self._recv_timeout = recv_timeout
+        self.__configured_size = (width, height)
+        self._frame_buffer = FrameRingBuffer(width, height)
+
+        self._decode_workers = decode_workers
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="frame_decoder")
+        self.__queued_frames: deque[bytes | Future[np.ndarray]] = deque()
+
+        self.__shared_frame_reader = SharedFrameReader()
+        self.__last_shared_frame: tuple[FrameHeader, SharedFrame] | None = None
+        self.__torn_frames = 0
+        self.__skipped_frames = 0
+        self.__invalid_frames = 0
+
+    @property
+    def frame_shape(self) -> tuple[int, int, int]:
+        """The shape of the received frames (height, width, channels)."""
+        return self._frame_buffer.frame_shape
+
+    @property
+    def dropped_frames(self) -> int:
+        """The number of received frames that were never read."""
+        return self.__skipped_frames
+
+    @property
+    def torn_frames(self) -> int:
+        """The number of shared memory frames that were overwritten by the publisher before they were rendered."""
+        return self.__torn_frames
+
+    @property
+    def invalid_frames(self) -> int:
+        """The number of received frames that were dropped because they could not be decoded or had a wrong size."""
+        return self.__invalid_frames
+
+    def _drop_invalid_frame(self) -> None:
+        """Counts a received frame that is dropped because it could not be decoded or had a wrong size."""
+        self.__invalid_frames += 1
+
+    def verify_frame(self) -> bool:
+        """Checks that the last read frame was not overwritten by the publisher since it was read.
+
+        Only frames in shared memory can be overwritten, all other frames are always intact.
+
+        Returns:
+            bool: True if the frame is intact.
+        """
+        if self.__last_shared_frame is None or self.__shared_frame_reader.is_intact(*self.__last_shared_frame):
+            return True
+        self.__torn_frames += 1
+        return False
+
+    def _take_decoded(self, frame: np.ndarray) -> np.ndarray:
+        """Hands out a decoded frame.
+
+        Args:
+            frame (np.ndarray): The decoded frame.
+
+        Returns:
+            np.ndarray: The frame.
+        """
+        self.__last_shared_frame = None
+        return frame
+
+    def _take(self, message: bytes) -> np.ndarray | None:
+        """Takes the frame out of a received raw or shared memory frame message.
+
+        Raw frames are copied into the frame buffer, shared memory frames are not copied.
+
+        Args:
+            message (bytes): The received frame message.
+
+        Returns:
+            np.ndarray | None: A view on the frame, None if the publisher already overwrote the frame or the frame is
+                invalid.
+        """
+        try:
+            return self.__take_frame(message)
+        except ValueError:
+            self._drop_invalid_frame()
+            self.__last_shared_frame = None
+            return None
+
+    def __take_frame(self, message: bytes) -> np.ndarray | None:
+        """Takes the frame out of a received raw or shared memory frame message.
+
+        Args:
+            message (bytes): The received frame message.
+
+        Raises:
+            ValueError: If the frame is not a BGR frame or does not have the announced size.
+
+        Returns:
+            np.ndarray | None: A view on the frame, None if the publisher already overwrote the frame.
+        """
+        header, frame_data = decode_frame_header(message)
+        if header is not None and header.channels != 3:
+            raise ValueError(f"Received frame has {header.channels} channels, expected a BGR frame.")
+
+        if header is not None and header.encoding == FrameEncoding.SHARED_MEMORY:
+            shared_frame = decode_shared_frame(frame_data)
+            frame = self.__shared_frame_reader.read(header, shared_frame)
+            if frame is None:
+                self.__torn_frames += 1
+                self.__last_shared_frame = None
+            else:
+                self.__last_shared_frame = (header, shared_frame)
+            return frame
+
+        self.__last_shared_frame = None
+        if header is None:
+            width, height = self.__configured_size
+        else:
+            width, height = header.width, header.height
+
+        if self._frame_buffer.frame_shape[:2] != (height, width):
+            self._frame_buffer = FrameRingBuffer(width, height)
+
+        return self._frame_buffer.store(frame_data)
+
+    def __queue_frame(self, message: bytes) -> None:
+        """Queues a received frame message to be handed out in order, compressed frames start decoding right away.
+
+        Args:
+            message (bytes): The received frame message.
+        """
+        header, frame_data = decode_frame_header(message)
+        if header is not None and header.encoding in IMAGE_EXTENSIONS:
+            self.__queued_frames.append(self._decode_pool.submit(decode_compressed_frame, frame_data))
+        else:
+            self.__queued_frames.append(message)
+
+    def read(self) -> np.ndarray:
+        """Receives the next frame.
+
+        Raises:
+            TimeoutError: If no frame was received in time.
+
+        Returns:
+            np.ndarray: A view on the frame, valid until the frame after next has been read.
+        """
+        while True:
+            if not self.__queued_frames:
+                try:
+                    self.__queue_frame(self._socket.recv())
+                except Timeout as err:
+                    raise TimeoutError("Timed out waiting for a camera frame.") from err
+
+            while len(self.__queued_frames) < self._decode_workers:
+                try:
+                    self.__queue_frame(self._socket.recv(block=False))
+                except TryAgain:
+                    break
+
+            queued_frame = self.__queued_frames.popleft()
+            if isinstance(queued_frame, Future):
+                try:
+                    return self._take_decoded(queued_frame.result())
+                except ValueError:
+                    self._drop_invalid_frame()
+                    continue
+            frame = self._take(queued_frame)
+            if frame is not None:
+                return frame
+
+    def __skip_to_newest(self, message: bytes) -> bytes:
+        """Skips all frames queued on the socket after a received frame.
+
+        Args:
+            message (bytes): The received frame message.
+
+        Returns:
+            bytes: The newest frame message.
+        """
+        while True:
+            try:
+                message = self._socket.recv(block=False)
+            except TryAgain:
+                return message
+            self.__skipped_frames += 1
+
+    async def aread(self, conflate: bool = False) -> np.ndarray:
+        """Receives the next frame without blocking the running event loop.
+
+        Args:
+            conflate (bool): Skip to the newest frame queued on the socket, the skipped frames count as dropped.
+
+        Raises:
+            TimeoutError: If no frame was received in time.
+
+        Returns:
+            np.ndarray: A view on the frame, valid until the frame after next has been read.
+        """
+        while True:
+            try:
+                message: bytes = await self._socket.arecv()
+            except Timeout as err:
+                raise TimeoutError("Timed out waiting for a camera frame.") from err
+            if conflate:
+                message = self.__skip_to_newest(message)
+
+            header, frame_data = decode_frame_header(message)
+            if header is not None and header.encoding in IMAGE_EXTENSIONS:
+                decoding = self._decode_pool.submit(decode_compressed_frame, frame_data)
+                try:
+                    return self._take_decoded(await asyncio.wrap_future(decoding))
+                except ValueError:
+                    self._drop_invalid_frame()
+                    continue
+            frame = self._take(message)
+            if frame is not None:
+                return frame
+
+    def close(self) -> None:
+        """Closes the frame socket, stops the decoding threads and detaches from shared memory."""
+        self._socket.close()
+        self._decode_pool.shutdown(cancel_futures=True)
+        self.__shared_frame_reader.close()
+
+
+class ConflatingFrameReceiver(FrameReceiver):
+    """Receives camera frames on a dedicated thread and only keeps the newest one.
+
+    Frames that are superseded before they are read are dropped and counted. Only the frame that is read is copied
+    into the frame buffer. Compressed frames are dropped right away if all decoding threads are busy.
+
+    Args:
+        address (str): The address of the camera frame publisher.
+        topics (list[str]): The topics to subscribe to.
+        width (int): The width of frames sent without a header.
+        height (int): The height of frames sent without a header.
+        recv_timeout (int): The time in milliseconds to wait for a frame.
+        recv_buffer_size (int | None): The number of messages the socket may queue, None for the pynng default.
+        decode_workers (int): The number of threads decoding compressed frames.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        topics: list[str],
+        width: int,
+        height: int,
+        recv_timeout: int = 1000,
+        recv_buffer_size: int | None = 1,
+        decode_workers: int = 2,
+    ) -> None:
+        super().__init__(address, topics, width, height, recv_timeout, recv_buffer_size, decode_workers)
+
+        self.__new_frame = Condition()
+        self.__pending_frame: bytes | np.ndarray | None = None
+        self.__published_sequence = 0
+        self.__dropped_frames = 0
+        self.__free_decoders = BoundedSemaphore(decode_workers)
+
+        self.__stop_thread_event = Event()
+        self.__receive_thread = Thread(target=self.__receive_worker, daemon=True)
+        self.__receive_thread.start()
+
+    @property
+    def dropped_frames(self) -> int:
+        """The number of received frames that were superseded before they were read."""
+        return self.__dropped_frames
+
+    def __receive_worker(self) -> None:
+        """Constantly receives frames and keeps the newest one."""
+        sequence = 0
+        while not self.__stop_thread_event.is_set():
+            try:
+                message: bytes = self._socket.recv()
+            except Timeout:
+                continue
+            sequence += 1
+
+            header, frame_data = decode_frame_header(message)
+            if header is None or header.encoding not in IMAGE_EXTENSIONS:
+                self.__publish(sequence, message)
+            elif self.__free_decoders.acquire(blocking=False):
+                decoded_frame = self._decode_pool.submit(decode_compressed_frame, frame_data)
+                decoded_frame.add_done_callback(partial(self.__decoded, sequence))
+            else:
+                with self.__new_frame:
+                    self.__dropped_frames += 1
+
+    def __decoded(self, sequence: int, decoded_frame: Future[np.ndarray]) -> None:
+        """Publishes a decoded frame.
+
+        Args:
+            sequence (int): The sequence number of the frame.
+            decoded_frame (Future[np.ndarray]): The finished decoding of the frame.
+        """
+        self.__free_decoders.release()
+        if decoded_frame.cancelled():
+            with self.__new_frame:
+                self.__dropped_frames += 1
+            return
+        if decoded_frame.exception() is not None:
+            with self.__new_frame:
+                self._drop_invalid_frame()
+            return
+        self.__publish(sequence, decoded_frame.result())
+
+    def __publish(self, sequence: int, frame: bytes | np.ndarray) -> None:
+        """Makes a frame the newest frame, unless a newer one has already been published.
+
+        Args:
+            sequence (int): The sequence number of the frame.
+            frame (bytes | np.ndarray): The received frame message or the decoded frame.
+        """
+        with self.__new_frame:
+            if sequence < self.__published_sequence:
+                self.__dropped_frames += 1
+                return
+            if self.__pending_frame is not None:
+                self.__dropped_frames += 1
+            self.__pending_frame = frame
+            self.__published_sequence = sequence
+            self.__new_frame.notify()
+
+    def read(self) -> np.ndarray:
+        """Waits for a frame newer than the last read one and returns the newest frame.
+
+        Raises:
+            TimeoutError: If no new frame was received in time.
+
+        Returns:
+            np.ndarray: A view on the frame, valid until the frame after next has been read.
+        """
+        deadline = time.monotonic() + self._recv_timeout / 1000
+        while True:
+            with self.__new_frame:
+                self.__new_frame.wait_for(lambda: self.__pending_frame is not None, deadline - time.monotonic())
+                pending_frame, self.__pending_frame = self.__pending_frame, None
+
+            if pending_frame is None:
+                raise TimeoutError("Timed out waiting for a camera frame.")
+            if isinstance(pending_frame, np.ndarray):
+                return self._take_decoded(pending_frame)
+            frame = self._take(pending_frame)
+            if frame is not None:
+                return frame
+
+    async def aread(self, conflate: bool = True) -> np.ndarray:
+        """Waits for a frame newer than the last read one without blocking the running event loop.
+
+        The frames are received on the thread of this receiver, which is waited for on a worker thread.
+
+        Args:
+            conflate (bool): Ignored, this receiver always conflates.
+
+        Raises:
+            TimeoutError: If no new frame was received in time.
+
+        Returns:
+            np.ndarray: A view on the frame, valid until the frame after next has been read.
+        """
+        del conflate
+        return await asyncio.to_thread(self.read)
+
+    def close(self) -> None:
+        """Stops the receiving thread and closes the receiver."""
+        self.__stop_thread_event.set()
+        self.__receive_thread.join()
+        super().close()
@@ -23,6 +23,10 @@ Rectangle {
         chosenConfigText.text = chosenPoint;
     }
 
+    function setStatus(status) {
+        statusText.text = status;
+    }
+
     Text {
         id: configNameText
 
@@ -132,6 +136,25 @@ Rectangle {
         anchors.left: realPointXInput.right
     }
 
+    Text {
+        id: statusText
+
+        anchors.bottom: parent.bottom
+        anchors.bottomMargin: 5
+        anchors.left: realPointYInput.right
+        anchors.leftMargin: 5
+        anchors.right: chooserContainer.left
+        anchors.rightMargin: 5
+
+        height: parent.height * 0.1594
+
+        color: window.headlineColor
+        elide: Text.ElideRight
+        minimumPixelSize: 10
+        font.pixelSize: 5000
+        fontSizeMode: Text.Fit
+    }
+
     Rectangle {
         id: binBackground
 
@@ -0,0 +1,29 @@
+// Copyright (C) 2023 NGITL
+
+import QtQuick 2.15
+import QtQuick.Window 2.15
+import VehicleTrackingConfigurator 1.0
+
+VideoFrameItem {
+    id: videoView
+
+    anchors.fill: parent
+
+    visible: true
+
+    // The name of the view, "point_drawer", "point_shower" or "top_view".
+    property string viewName
+
+    // The frames are rendered at the displayed size instead of being scaled down by the UI.
+    function reportDisplaySize() {
+        vehicle_tracking_configurator_model.view_size_changed(
+            videoView.viewName,
+            Math.round(videoView.width * Screen.devicePixelRatio),
+            Math.round(videoView.height * Screen.devicePixelRatio)
+        );
+    }
+
+    onWidthChanged: reportDisplaySize()
+    onHeightChanged: reportDisplaySize()
+    Component.onCompleted: reportDisplaySize()
+}
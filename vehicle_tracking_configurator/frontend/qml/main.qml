@@ -39,6 +39,14 @@ Window {
         if (window.visibility == Window.Maximized) {
             window.visibility = Window.FullScreen;
         }
+        reportWindowState();
+    }
+
+    onActiveChanged: reportWindowState()
+
+    function reportWindowState() {
+        var shown = window.visibility != Window.Minimized && window.visibility != Window.Hidden;
+        vehicle_tracking_configurator_model.window_state_changed(shown, window.active);
     }
 
     Item {
@@ -78,21 +86,11 @@ Window {
 
             color: window.placeholderColor
 
-            Image {
+            VideoView {
                 id: pointsDrawerStream
+                objectName: "pointsDrawerStream"
 
-                property int id: 0
-
-                anchors.fill: parent
-                fillMode: Image.PreserveAspectFit
-
-                visible: true
-                cache: false
-                source: "image://point_drawer/" + id
-
-                function reload() {
-                    id++;
-                }
+                viewName: "point_drawer"
             }
 
             MouseArea {
@@ -176,24 +174,18 @@ Window {
             height: window.videosY
             width: window.videosX
 
+            // The shower is pushed out of the window while the drawer is maximized.
+            readonly property bool shown: y < window.height
+
+            onShownChanged: vehicle_tracking_configurator_model.view_visibility_changed("point_shower", shown)
 
             color: window.placeholderColor
 
-            Image {
+            VideoView {
                 id: pointsShowerStream
+                objectName: "pointsShowerStream"
 
-                property int id: 0
-
-                anchors.fill: parent
-                fillMode: Image.PreserveAspectFit
-
-                visible: true
-                cache: false
-                source: "image://point_shower/" + id
-
-                function reload() {
-                    id++;
-                }
+                viewName: "point_shower"
             }
 
             MouseArea {
@@ -228,6 +220,8 @@ Window {
             property int confBoxSizeY: (parent.height / 10 - 2.5) * 3
 
             Flickable {
+                id: optionsFlickable
+
                 anchors.fill: parent
                 contentWidth: optionsRectangle.width
                 contentHeight: Math.max(column.height, parent.height)
@@ -449,6 +443,51 @@ Window {
                             anchors.rightMargin: parent.width / 4 - width / 2
                         }
                     }
+
+                    Rectangle {
+                        id: topview
+
+                        width: parent.width
+                        height: width * 2 / 3
+
+                        color: window.placeholderColor
+
+                        // The top view is only rendered while it is scrolled into view and the drawer is not maximized.
+                        readonly property bool shown: optionsRectangle.x < window.width
+                            && y + height > optionsFlickable.contentY
+                            && y < optionsFlickable.contentY + optionsFlickable.height
+
+                        onShownChanged: vehicle_tracking_configurator_model.view_visibility_changed("top_view", shown)
+                        Component.onCompleted: {
+                            vehicle_tracking_configurator_model.view_visibility_changed("top_view", shown);
+                        }
+
+                        VideoView {
+                            id: topviewStream
+                            objectName: "topviewStream"
+
+                            viewName: "top_view"
+                        }
+
+                        Text {
+                            id: topviewText
+
+                            text: "Top View"
+
+                            anchors.top: parent.top
+                            anchors.topMargin: 5
+                            anchors.left: parent.left
+                            anchors.leftMargin: 5
+
+                            width: parent.width * 0.5
+                            height: parent.height * 0.08
+
+                            color: window.headlineColor
+                            fontSizeMode: Text.Fit
+                            font.pixelSize: 5000
+                            minimumPixelSize: 10
+                        }
+                    }
                 }
             }
         }
@@ -458,11 +497,6 @@ Window {
     Connections {
         target: vehicle_tracking_configurator_model
 
-        function onReloadImage() {
-            pointsDrawerStream.reload()
-            pointsShowerStream.reload()
-        }
-
         function onColorTextChanged(texts) {
             redColorTextField.text = texts[0];
             greenColorTextField.text = texts[1];
@@ -489,5 +523,9 @@ Window {
         function onTransformationPointChosen(point) {
             transformationPoints.setChosenPoint(point);
         }
+
+        function onTransformationFitChanged(status) {
+            transformationPoints.setStatus(status);
+        }
     }
 }
@@ -0,0 +1,233 @@
+"""Provides a shared memory transport for camera frames of publishers on the same host.
+
+The frames are written into a ring of slots in a shared memory block. Only a small message naming the slot, the
+sequence number and the timestamp of a frame is sent over the frame socket. Every slot starts with the sequence number
+of the frame it holds, which is invalidated while the slot is written. Readers compare it with the announced sequence
+number to detect frames that were overwritten while they were read.
+"""
+# Copyright (C) 2023, NG:ITL
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+import struct
+import time
+import os
+
+import numpy as np
+
+from vehicle_tracking_configurator.frame_protocol import FRAME_HEADER, FRAME_MAGIC, FrameEncoding, FrameHeader
+
+
+# slot, sequence, timestamp, followed by the name of the shared memory block
+SHARED_FRAME_MESSAGE = struct.Struct("<HQd")
+SLOT_ALIGNMENT = 64
+WRITING_SEQUENCE = -1
+
+
+class SharedFrame(NamedTuple):
+    """A frame announced to be in shared memory.
+
+    Args:
+        name (str): The name of the shared memory block.
+        slot (int): The slot holding the frame.
+        sequence (int): The sequence number of the frame.
+        timestamp (float): The time the frame was written, in seconds since the epoch.
+    """
+
+    name: str
+    slot: int
+    sequence: int
+    timestamp: float
+
+
+def get_slot_size(width: int, height: int, channels: int) -> int:
+    """Calculates the size of a slot in the shared memory block.
+
+    Args:
+        width (int): The width of the frames.
+        height (int): The height of the frames.
+        channels (int): The number of color channels of the frames.
+
+    Returns:
+        int: The size of a slot in bytes, including the sequence number.
+    """
+    size = 8 + width * height * channels
+    return (size + SLOT_ALIGNMENT - 1) // SLOT_ALIGNMENT * SLOT_ALIGNMENT
+
+
+def decode_shared_frame(frame_data: bytes | memoryview) -> SharedFrame:
+    """Decodes the data of a shared memory frame message.
+
+    Args:
+        frame_data (bytes | memoryview): The frame data following the frame header.
+
+    Raises:
+        ValueError: If the frame data is truncated or the name of the shared memory block is invalid.
+
+    Returns:
+        SharedFrame: The announced frame.
+    """
+    try:
+        slot, sequence, timestamp = SHARED_FRAME_MESSAGE.unpack_from(frame_data)
+    except struct.error as err:
+        raise ValueError("Received shared memory frame message is truncated.") from err
+    name = bytes(frame_data[SHARED_FRAME_MESSAGE.size :]).decode("utf-8")
+    if not name:
+        raise ValueError("Received shared memory frame message does not name a shared memory block.")
+    return SharedFrame(name, slot, sequence, timestamp)
+
+
+class SharedFrameWriter:
+    """Writes frames into a ring of slots in a new shared memory block.
+
+    Args:
+        width (int): The width of the frames.
+        height (int): The height of the frames.
+        slots (int): The number of slots in the ring.
+        name (str | None): The name of the shared memory block, None for a random name.
+    """
+
+    def __init__(self, width: int, height: int, slots: int = 4, name: str | None = None) -> None:
+        self.__frame_shape = (height, width, 3)
+        self.__slot_size = get_slot_size(width, height, 3)
+        self.__memory = SharedMemory(name=name, create=True, size=self.__slot_size * slots)
+        self.__slots = slots
+        self.__sequence = 0
+
+        buffer: np.ndarray = np.ndarray((slots, self.__slot_size), dtype=np.uint8, buffer=self.__memory.buf)
+        self.__sequences = buffer[:, :8].view(np.int64)[:, 0]
+        self.__sequences[:] = WRITING_SEQUENCE
+        frame_size = width * height * 3
+        self.__frames = [buffer[slot, 8 : 8 + frame_size].reshape(self.__frame_shape) for slot in range(slots)]
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block."""
+        return self.__memory.name
+
+    def write(self, frame: np.ndarray) -> bytes:
+        """Writes a frame into the next slot.
+
+        Args:
+            frame (np.ndarray): The BGR frame.
+
+        Raises:
+            ValueError: If the frame does not match the size of the slots.
+
+        Returns:
+            bytes: The message announcing the frame, to be sent over the frame socket.
+        """
+        if frame.shape != self.__frame_shape:
+            raise ValueError(f"Frame has the shape {frame.shape}, expected {self.__frame_shape}.")
+
+        self.__sequence += 1
+        slot = self.__sequence % self.__slots
+
+        self.__sequences[slot] = WRITING_SEQUENCE
+        np.copyto(self.__frames[slot], frame)
+        self.__sequences[slot] = self.__sequence
+
+        height, width, channels = self.__frame_shape
+        return (
+            FRAME_HEADER.pack(FRAME_MAGIC, FrameEncoding.SHARED_MEMORY, width, height, channels)
+            + SHARED_FRAME_MESSAGE.pack(slot, self.__sequence, time.time())
+            + self.name.encode("utf-8")
+        )
+
+    def close(self) -> None:
+        """Closes and removes the shared memory block."""
+        del self.__frames, self.__sequences
+        self.__memory.close()
+        self.__memory.unlink()
+
+
+class SharedFrameReader:
+    """Reads frames announced over the frame socket from the shared memory block of the publisher."""
+
+    def __init__(self) -> None:
+        self.__memory: SharedMemory | None = None
+        self.__buffer = np.zeros(0, dtype=np.uint8)
+
+    def __attach(self, name: str) -> None:
+        """Attaches to a shared memory block, detaching from the previous one.
+
+        Args:
+            name (str): The name of the shared memory block.
+
+        Raises:
+            ValueError: If the shared memory block does not exist (anymore) or can not be opened.
+        """
+        self.close()
+        try:
+            self.__memory = SharedMemory(name=name)
+        except OSError as err:
+            # The publisher removes its block when it exits or restarts, frames queued before can not be read anymore.
+            raise ValueError(f"Shared memory block {name} can not be opened: {err}") from err
+        # The block belongs to the publisher, the resource tracker must not remove it when this process exits.
+        if os.name == "posix":
+            resource_tracker.unregister(self.__memory._name, "shared_memory")  # type: ignore[attr-defined]
+        self.__buffer = np.ndarray((self.__memory.size,), dtype=np.uint8, buffer=self.__memory.buf)
+
+    def __sequence_of(self, offset: int) -> int:
+        """Reads the sequence number of a slot.
+
+        Args:
+            offset (int): The offset of the slot.
+
+        Returns:
+            int: The sequence number of the frame in the slot.
+        """
+        return int(self.__buffer[offset : offset + 8].view(np.int64)[0])
+
+    def read(self, header: FrameHeader, frame: SharedFrame) -> np.ndarray | None:
+        """Returns a view on an announced frame without copying it.
+
+        Args:
+            header (FrameHeader): The header of the frame message.
+            frame (SharedFrame): The announced frame.
+
+        Raises:
+            ValueError: If the shared memory block can not be opened or the announced frame lies outside of it.
+
+        Returns:
+            np.ndarray | None: The frame, None if the slot no longer holds the announced frame.
+        """
+        if self.__memory is None or self.__memory.name.lstrip("/") != frame.name.lstrip("/"):
+            self.__attach(frame.name)
+
+        slot_size = get_slot_size(header.width, header.height, header.channels)
+        offset = frame.slot * slot_size
+        if offset + slot_size > len(self.__buffer):
+            raise ValueError(f"Announced frame slot {frame.slot} lies outside of the shared memory block.")
+
+        if self.__sequence_of(offset) != frame.sequence:
+            return None
+
+        frame_size = header.width * header.height * header.channels
+        return self.__buffer[offset + 8 : offset + 8 + frame_size].reshape(header.height, header.width, header.channels)
+
+    def is_intact(self, header: FrameHeader, frame: SharedFrame) -> bool:
+        """Checks that a slot still holds an announced frame.
+
+        Args:
+            header (FrameHeader): The header of the frame message.
+            frame (SharedFrame): The announced frame.
+
+        Returns:
+            bool: True if the frame was not overwritten.
+        """
+        offset = frame.slot * get_slot_size(header.width, header.height, header.channels)
+        return self.__sequence_of(offset) == frame.sequence
+
+    def close(self) -> None:
+        """Detaches from the shared memory block."""
+        if self.__memory is None:
+            return
+        self.__buffer = np.zeros(0, dtype=np.uint8)
+        try:
+            self.__memory.close()
+        except BufferError:
+            # Frames handed out earlier still reference the block, it is unmapped once they are released.
+            pass
+        self.__memory = None
@@ -0,0 +1,157 @@
+"""Provides low overhead timing of the stages of the frame pipeline.
+
+Every frame starts a new measurement, each stage is timed from the end of the previous stage on the same thread with a
+monotonic clock. The durations of the last frames are kept per stage and summarized as rolling histograms, which can be
+logged periodically or dumped to a JSON file. A disabled timer returns right away from every call.
+"""
+# Copyright (C) 2023, NG:ITL
+
+from pathlib import Path
+from json import dump
+import threading
+import time
+
+import numpy as np
+
+
+TOTAL_STAGE = "total"
+# The upper edges of the histogram bins in milliseconds, the last bin holds all longer durations.
+HISTOGRAM_BIN_EDGES_MS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0)
+
+
+class StageTimer:
+    """Measures the time spent in the stages of the frame pipeline.
+
+    Args:
+        enabled (bool): Whether the stages are timed at all.
+        window (int): The number of frames the rolling histograms are calculated over.
+        log_interval (float): The interval in seconds the summary is printed in, 0 to never print it.
+        dump_file (Path | None): The file the summary is written to in the log interval and on close, None for no file.
+    """
+
+    def __init__(
+        self, enabled: bool = False, window: int = 600, log_interval: float = 0, dump_file: Path | None = None
+    ) -> None:
+        if window < 1:
+            raise ValueError(f"The timing window needs at least one frame, got {window}.")
+        self.enabled = enabled
+        self.__window = window
+        self.__log_interval = log_interval
+        self.__dump_file = dump_file
+        self.__durations: dict[str, np.ndarray] = {}
+        self.__counts: dict[str, int] = {}
+        self.__frame_start = 0
+        self.__stage_starts = threading.local()
+        self.__last_report = time.monotonic()
+
+    def start(self) -> None:
+        """Starts the measurement of a new frame."""
+        if not self.enabled:
+            return
+        self.__frame_start = self.__stage_starts.value = time.perf_counter_ns()
+
+    def resume(self) -> None:
+        """Starts timing the stages of the current frame that run on the calling thread."""
+        if not self.enabled:
+            return
+        self.__stage_starts.value = time.perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        """Records the time since the previous stage on the calling thread ended, or the frame started.
+
+        Args:
+            stage (str): The name of the stage that just ended.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.__record(stage, now - getattr(self.__stage_starts, "value", now))
+        self.__stage_starts.value = now
+
+    def finish(self) -> None:
+        """Records the total time of the frame, and prints or dumps the summary once the log interval is over."""
+        if not self.enabled:
+            return
+        self.__record(TOTAL_STAGE, time.perf_counter_ns() - self.__frame_start)
+
+        if self.__log_interval <= 0 or time.monotonic() - self.__last_report < self.__log_interval:
+            return
+        self.__last_report = time.monotonic()
+        summary = self.summary()
+        print(format_summary(summary))
+        if self.__dump_file is not None:
+            self.dump(self.__dump_file, summary)
+
+    def __record(self, stage: str, duration_ns: int) -> None:
+        """Adds a duration to the rolling window of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            duration_ns (int): The duration of the stage in nanoseconds.
+        """
+        durations = self.__durations.get(stage)
+        if durations is None:
+            durations = self.__durations[stage] = np.zeros(self.__window, dtype=np.int64)
+            self.__counts[stage] = 0
+        durations[self.__counts[stage] % self.__window] = duration_ns
+        self.__counts[stage] += 1
+
+    def reset(self) -> None:
+        """Discards all recorded durations."""
+        self.__durations.clear()
+        self.__counts.clear()
+
+    def summary(self) -> dict[str, dict]:
+        """Summarizes the recorded durations of every stage.
+
+        Returns:
+            dict[str, dict]: The statistics and the histogram of the rolling window of every stage.
+        """
+        summary: dict[str, dict] = {}
+        for stage, durations in self.__durations.items():
+            count = self.__counts[stage]
+            samples_ms = durations[: min(count, self.__window)] / 1e6
+            counts, _ = np.histogram(samples_ms, bins=(0, *HISTOGRAM_BIN_EDGES_MS, np.inf))
+            summary[stage] = {
+                "frames": count,
+                "mean_ms": round(float(samples_ms.mean()), 4),
+                "p50_ms": round(float(np.percentile(samples_ms, 50)), 4),
+                "p90_ms": round(float(np.percentile(samples_ms, 90)), 4),
+                "p99_ms": round(float(np.percentile(samples_ms, 99)), 4),
+                "max_ms": round(float(samples_ms.max()), 4),
+                "histogram": {"upper_edges_ms": [*HISTOGRAM_BIN_EDGES_MS, None], "counts": counts.tolist()},
+            }
+        return summary
+
+    def dump(self, path: Path, summary: dict[str, dict] | None = None) -> None:
+        """Writes the summary to a JSON file.
+
+        Args:
+            path (Path): The file to write.
+            summary (dict[str, dict] | None): The summary to write, None to summarize the recorded durations.
+        """
+        with open(path, "w", encoding="utf-8") as dump_file:
+            dump(self.summary() if summary is None else summary, dump_file, indent=4)
+
+    def close(self) -> None:
+        """Writes the final summary to the dump file."""
+        if self.enabled and self.__dump_file is not None and self.__durations:
+            self.dump(self.__dump_file)
+
+
+def format_summary(summary: dict[str, dict]) -> str:
+    """Formats a summary as a table with a line per stage.
+
+    Args:
+        summary (dict[str, dict]): The summary of a stage timer.
+
+    Returns:
+        str: The formatted summary.
+    """
+    lines = ["stage                 mean ms    p50 ms    p90 ms    p99 ms    max ms"]
+    for stage, stats in summary.items():
+        lines.append(
+            f"{stage:<20}"
+            + "".join(f"{stats[key]:>10.3f}" for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"))
+        )
+    return "\n".join(lines)
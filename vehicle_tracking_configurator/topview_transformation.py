@@ -1,56 +1,339 @@
 """Provides a class for transforming points between image and world coordinates."""
 # Copyright (C) 2023, NG:ITL
 
+from typing import NamedTuple
+from pathlib import Path
+from threading import Lock, get_ident
+import hashlib
+import os
+
 import cv2
 import numpy as np
 
 
+CORNER_POINTS = ("top_left", "top_right", "bottom_left", "bottom_right")
+# The methods cv2.findHomography fits more than four transformation points with.
+FIT_METHODS = {"least_squares": 0, "ransac": cv2.RANSAC}
+IMAGE_TO_WORLD_MAP_PREFIX = "image_to_world_"
+MAX_CACHED_MAPS = 8
+# The number of frame sizes the undistortion maps are kept in memory for, one per view is enough.
+MAX_CACHED_UNDISTORTION_MAPS = 4
+# The number of sizes the top view maps are kept in memory for.
+MAX_CACHED_TOPVIEW_MAPS = 4
+# The largest width or height of the top view in pixels.
+MAX_TOPVIEW_SIZE = 4096
+# The numbers of distortion coefficients OpenCV supports.
+DISTORTION_COEFFICIENT_COUNTS = (4, 5, 8, 12, 14)
+# A degenerate configuration maps every point to (0, 0), like cv2.getPerspectiveTransform does for it.
+DEGENERATE_MATRIX = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+# The smallest area of a triangle of three points relative to the squared extent of all points, below it the points
+# count as collinear.
+MIN_RELATIVE_TRIANGLE_AREA = 1e-6
+# The smallest spread of more than four points across their main direction relative to the spread along it, below it
+# the points count as collinear.
+MIN_RELATIVE_SPREAD = 1e-3
+# The largest condition number of a matrix that is still inverted.
+MAX_CONDITION_NUMBER = 1e12
+
+
+class Homography(NamedTuple):
+    """The matrices of a set of transformation points.
+
+    Args:
+        image_to_world (np.ndarray): The 3x3 matrix transforming image points to world points.
+        world_to_image (np.ndarray): The 3x3 matrix transforming world points to image points.
+        error (str | None): Why the points do not define a valid transformation, None if they do.
+        reprojection_errors (np.ndarray): The distance of every transformed image point to its world point.
+        inliers (np.ndarray): Whether every point was used by the fit, RANSAC leaves out the outliers.
+    """
+
+    image_to_world: np.ndarray
+    world_to_image: np.ndarray
+    error: str | None
+    reprojection_errors: np.ndarray
+    inliers: np.ndarray
+
+
+class TransformationPoints(NamedTuple):
+    """A consistent snapshot of the transformation points and their matrices.
+
+    Args:
+        generation (int): The number of changes of the transformation points before the snapshot.
+        names (list[str]): The names of the points, the corners first.
+        image_points (np.ndarray): The Nx2 image points on the camera frame.
+        world_points (np.ndarray): The Nx2 world points.
+        homography (Homography): The matrices of the points.
+    """
+
+    generation: int
+    names: list[str]
+    image_points: np.ndarray
+    world_points: np.ndarray
+    homography: Homography
+
+
+class CameraModel(NamedTuple):
+    """The intrinsics and the lens distortion of the camera, like cv2.calibrateCamera returns them.
+
+    Args:
+        camera_matrix (np.ndarray): The 3x3 camera matrix for the full camera frame.
+        distortion_coefficients (np.ndarray): The distortion coefficients (k1, k2, p1, p2[, k3[, k4, k5, k6[, ...]]]).
+    """
+
+    camera_matrix: np.ndarray
+    distortion_coefficients: np.ndarray
+
+
 class TopviewTransformation:
-    """Transforms a camera point to a world coordinate and vice versa."""
-
-    def __init__(self) -> None:
-        self.__image_points: dict[str, tuple[int, int]] = {
-            "top_left": (0, 0),
-            "top_right": (0, 0),
-            "bottom_left": (0, 0),
-            "bottom_right": (0, 0),
-        }
-        self.__world_points: dict[str, tuple[float, float]] = {
-            "top_left": (0, 0),
-            "top_right": (0, 0),
-            "bottom_left": (0, 0),
-            "bottom_right": (0, 0),
-        }
-        self.__image_to_world_matrix = cv2.getPerspectiveTransform(
-            np.array(list(self.__image_points.values()), dtype=np.float32),  # type: ignore[arg-type]
-            np.array(list(self.__world_points.values()), dtype=np.float32),  # type: ignore[arg-type]
-        )
-        self.__world_to_image_matrix = cv2.getPerspectiveTransform(
-            np.array(list(self.__world_points.values()), dtype=np.float32),  # type: ignore[arg-type]
-            np.array(list(self.__image_points.values()), dtype=np.float32),  # type: ignore[arg-type]
-        )
+    """Transforms a camera point to a world coordinate and vice versa.
+
+    The four corner points define the transformation exactly. Additional points over-determine it, then it is fitted
+    to all points by cv2.findHomography, which spreads a click error over the points instead of putting it into the
+    transformation. The matrices are only calculated on the first transformation after a transformation point changed.
+
+    With a camera model, image points are undistorted before the homography is applied, so a wide angle lens does not
+    bend the transformation. The image points are still given on the distorted camera frame.
+
+    The points can be changed on one thread while the maps are built on another. The maps are built from a snapshot of
+    the points outside of the lock, and only cached if no point changed in the meantime.
+
+    Args:
+        cache_dir (Path | None): The directory the image to world maps are cached in, None to not cache them on disk.
+        fit_method (str): The method more than four points are fitted with, "least_squares" or "ransac".
+        ransac_threshold (float): The largest reprojection error in world units of a point RANSAC still fits.
+        camera_model (CameraModel | None): The intrinsics and the lens distortion of the camera, None to not undistort
+            the image points.
+
+    Raises:
+        ValueError: If the fit method or the camera model is invalid.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        fit_method: str = "least_squares",
+        ransac_threshold: float = 0.05,
+        camera_model: CameraModel | None = None,
+    ) -> None:
+        if fit_method not in FIT_METHODS:
+            raise ValueError(f"Fit method '{fit_method}' is invalid.")
+        if camera_model is not None:
+            camera_model = CameraModel(
+                np.asarray(camera_model.camera_matrix, dtype=np.float64),
+                np.asarray(camera_model.distortion_coefficients, dtype=np.float64).ravel(),
+            )
+            if camera_model.camera_matrix.shape != (3, 3):
+                raise ValueError(f"Expected a 3x3 camera matrix, got the shape {camera_model.camera_matrix.shape}.")
+            if len(camera_model.distortion_coefficients) not in DISTORTION_COEFFICIENT_COUNTS:
+                raise ValueError(
+                    f"Expected {DISTORTION_COEFFICIENT_COUNTS} distortion coefficients, "
+                    f"got {len(camera_model.distortion_coefficients)}."
+                )
+        self.__cache_dir = cache_dir
+        self.__fit_method = fit_method
+        self.__ransac_threshold = ransac_threshold
+        self.__camera_model = camera_model
+        self.__undistortion_maps: dict[tuple[int, int, int, int], tuple[np.ndarray, np.ndarray]] = {}
+        self.__topview_maps: dict[tuple[int, int, int, int], tuple[np.ndarray, np.ndarray]] = {}
+        self.__image_to_world_map: np.ndarray | None = None
+        self.__image_points: dict[str, tuple[int, int]] = {point_name: (0, 0) for point_name in CORNER_POINTS}
+        self.__world_points: dict[str, tuple[float, float]] = {point_name: (0, 0) for point_name in CORNER_POINTS}
+        self.__generation = 0
+        self.__points: TransformationPoints | None = None
+        # Guards the points, their snapshot and the cached maps.
+        self.__lock = Lock()
 
     def set_transformation_point(
         self, point_name: str, image_coords: tuple[int, int], world_coords: tuple[float, float]
     ) -> None:
-        """Sets a transformation point.
+        """Sets a transformation point, adds it if it is not one of the points yet.
 
         Args:
+            point_name (str): The name of the transformation point.
             image_coords (tuple[int, int]): The image coordinates of the transformation point.
             world_coords (tuple[float, float]): The world coordinates of the transformation point.
         """
-        self.__image_points[point_name] = image_coords
-        self.__world_points[point_name] = world_coords
+        with self.__lock:
+            self.__image_points[point_name] = image_coords
+            self.__world_points[point_name] = world_coords
+            self.__invalidate()
+
+    def remove_transformation_point(self, point_name: str) -> None:
+        """Removes an additional transformation point.
+
+        Args:
+            point_name (str): The name of the transformation point.
+
+        Raises:
+            ValueError: If the point is one of the corners or not a transformation point.
+        """
+        with self.__lock:
+            if point_name in CORNER_POINTS or point_name not in self.__image_points:
+                raise ValueError(f"Point name '{point_name}' is invalid.")
+            del self.__image_points[point_name]
+            del self.__world_points[point_name]
+            self.__invalidate()
+
+    def __invalidate(self) -> None:
+        """Drops the snapshot and the maps of the previous points, must be called with the lock held."""
+        self.__generation += 1
+        self.__points = None
+        self.__image_to_world_map = None
+        self.__topview_maps.clear()
+
+    def disable_cache(self) -> bool:
+        """Stops caching the image to world maps on disk, the maps are only kept in memory from now on.
+
+        Returns:
+            bool: True if the maps were cached on disk before.
+        """
+        with self.__lock:
+            cached = self.__cache_dir is not None
+            self.__cache_dir = None
+        return cached
+
+    @property
+    def point_names(self) -> list[str]:
+        """The names of the transformation points, the corners first."""
+        return self.__get_points().names
+
+    @property
+    def camera_model(self) -> CameraModel | None:
+        """The intrinsics and the lens distortion of the camera, None if the image points are not undistorted."""
+        return self.__camera_model
+
+    @property
+    def error(self) -> str | None:
+        """Why the transformation points do not define a valid transformation, None if they do."""
+        return self.__get_homography().error
+
+    @property
+    def reprojection_errors(self) -> dict[str, float]:
+        """The distance in world units of every transformed image point to its world point."""
+        points = self.__get_points()
+        return {
+            point_name: float(error) for point_name, error in zip(points.names, points.homography.reprojection_errors)
+        }
+
+    @property
+    def rms_reprojection_error(self) -> float | None:
+        """The root mean square reprojection error of the points used by the fit, None if there is no transformation."""
+        homography = self.__get_homography()
+        if homography.error is not None:
+            return None
+        return float(np.sqrt(np.mean(homography.reprojection_errors[homography.inliers] ** 2)))
+
+    def __get_points(self) -> TransformationPoints:
+        """Returns a snapshot of the current transformation points, calculates their matrices if a point changed.
+
+        Returns:
+            TransformationPoints: The snapshot of the current transformation points.
+        """
+        with self.__lock:
+            if self.__points is None:
+                names = list(self.__image_points)
+                image_points = np.array([self.__image_points[name] for name in names], dtype=np.float64)
+                world_points = np.array([self.__world_points[name] for name in names], dtype=np.float64)
+                homography = self.__calculate_homography(image_points, world_points)
+                self.__points = TransformationPoints(self.__generation, names, image_points, world_points, homography)
+            return self.__points
+
+    def __get_homography(self) -> Homography:
+        """Returns the matrices of the current transformation points, calculates them if a point changed.
+
+        Returns:
+            Homography: The matrices of the current transformation points.
+        """
+        return self.__get_points().homography
 
-        image_points = list(self.__image_points.values())
-        world_points = list(self.__world_points.values())
-        self.__image_to_world_matrix = cv2.getPerspectiveTransform(
-            np.array(image_points, dtype=np.float32), np.array(world_points, dtype=np.float32)  # type: ignore[arg-type]
+    def __calculate_homography(self, image_points: np.ndarray, world_points: np.ndarray) -> Homography:
+        """Calculates the matrices of transformation points, the inverse from the forward matrix.
+
+        Args:
+            image_points (np.ndarray): The Nx2 image points on the camera frame.
+            world_points (np.ndarray): The Nx2 world points.
+
+        Returns:
+            Homography: The matrices, or the degenerate matrix and the error for a degenerate configuration.
+        """
+        image_points = self.undistort_points(image_points)
+        inliers = np.ones(len(image_points), dtype=bool)
+
+        if len(image_points) == len(CORNER_POINTS):
+            for name, points in (("image", image_points), ("world", world_points)):
+                if self.__has_collinear_points(points):
+                    return self.__degenerate(world_points, f"Three of the {name} points are collinear.")
+            image_to_world = cv2.getPerspectiveTransform(
+                image_points.astype(np.float32), world_points.astype(np.float32)  # type: ignore[arg-type]
+            )
+        else:
+            for name, points in (("image", image_points), ("world", world_points)):
+                if self.__are_collinear(points):
+                    return self.__degenerate(world_points, f"All of the {name} points are collinear.")
+            image_to_world, mask = cv2.findHomography(
+                image_points, world_points, FIT_METHODS[self.__fit_method], self.__ransac_threshold
+            )
+            if image_to_world is None:
+                return self.__degenerate(world_points, "No transformation fits the points.")
+            inliers = mask.ravel().astype(bool)
+
+        if np.linalg.cond(image_to_world) > MAX_CONDITION_NUMBER:
+            return self.__degenerate(world_points, "The transformation is close to singular.")
+        world_to_image = np.linalg.inv(image_to_world)
+        reprojection_errors = np.linalg.norm(
+            self.__transform_batch(image_points, image_to_world) - world_points, axis=1
         )
-        self.__world_to_image_matrix = cv2.getPerspectiveTransform(
-            np.array(world_points, dtype=np.float32), np.array(image_points, dtype=np.float32)  # type: ignore[arg-type]
+        return Homography(image_to_world, world_to_image / world_to_image[2, 2], None, reprojection_errors, inliers)
+
+    def __degenerate(self, world_points: np.ndarray, error: str) -> Homography:
+        """Creates the matrices of a degenerate configuration, which map every point to (0, 0).
+
+        Args:
+            world_points (np.ndarray): The Nx2 world points.
+            error (str): Why the points do not define a valid transformation.
+
+        Returns:
+            Homography: The degenerate matrices.
+        """
+        reprojection_errors = np.linalg.norm(world_points, axis=1)
+        return Homography(
+            DEGENERATE_MATRIX, DEGENERATE_MATRIX, error, reprojection_errors, np.zeros(len(world_points), dtype=bool)
         )
 
+    @staticmethod
+    def __has_collinear_points(points: np.ndarray) -> bool:
+        """Checks whether any three of four points lie on a line, in which case they do not define a homography.
+
+        Args:
+            points (np.ndarray): The 4x2 points.
+
+        Returns:
+            bool: True if three of the points are collinear.
+        """
+        min_area = MIN_RELATIVE_TRIANGLE_AREA * float(np.ptp(points, axis=0).max()) ** 2
+        if min_area == 0:
+            return True
+        for left_out in range(4):
+            first, second, third = np.delete(points, left_out, axis=0)
+            (ax, ay), (bx, by) = second - first, third - first
+            area = abs(ax * by - ay * bx) / 2
+            if area < min_area:
+                return True
+        return False
+
+    @staticmethod
+    def __are_collinear(points: np.ndarray) -> bool:
+        """Checks whether all points lie close to a line, in which case no homography can be fitted to them.
+
+        Args:
+            points (np.ndarray): The Nx2 points.
+
+        Returns:
+            bool: True if the points are collinear.
+        """
+        singular_values = np.linalg.svd(points - points.mean(axis=0), compute_uv=False)
+        return singular_values[0] == 0 or singular_values[1] < MIN_RELATIVE_SPREAD * singular_values[0]
+
     def image_to_world_transform(self, point: tuple[int, int]) -> tuple[float, float]:
         """Transforms an image point to a world point.
 
@@ -60,8 +343,8 @@ class TopviewTransformation:
         Returns:
             tuple[float, float]: The world point.
         """
-        points = cv2.perspectiveTransform(np.array([[point]], dtype=np.float32), self.__image_to_world_matrix)[0][0]  # type: ignore[arg-type]
-        return (round(float(points[0]), 3), round(float(points[1]), 3))
+        world_point = self.image_to_world_transform_batch(np.array([point]))[0]
+        return (round(float(world_point[0]), 3), round(float(world_point[1]), 3))
 
     def world_to_image_transform(self, point: tuple[float, float]) -> tuple[int, int]:
         """Transforms a world point to an image point.
@@ -72,5 +355,399 @@ class TopviewTransformation:
         Returns:
             tuple[int, int]: The image point.
         """
-        points = cv2.perspectiveTransform(np.array([[point]], dtype=np.float32), self.__world_to_image_matrix)[0][0]  # type: ignore[arg-type]
-        return (int(points[0]), int(points[1]))
+        image_point = self.world_to_image_transform_batch(np.array([point]))[0]
+        return (int(image_point[0]), int(image_point[1]))
+
+    def image_to_world_lookup(self, point: tuple[int, int], frame_size: tuple[int, int]) -> tuple[float, float]:
+        """Looks up the world point of an image point in the image to world map of the frame.
+
+        The map is not built here, so the lookup never blocks on it, see `get_image_to_world_map`.
+
+        Args:
+            point (tuple[int, int]): The image point to transform.
+            frame_size (tuple[int, int]): The size (width, height) of the frame the point is on.
+
+        Returns:
+            tuple[float, float]: The world point, transformed directly if the map of the current points is not built
+                yet or the point is outside of the frame.
+        """
+        x, y = int(point[0]), int(point[1])
+        with self.__lock:
+            image_to_world_map = self.__image_to_world_map
+        if (
+            image_to_world_map is None
+            or image_to_world_map.shape[:2] != (frame_size[1], frame_size[0])
+            or not (0 <= x < frame_size[0] and 0 <= y < frame_size[1])
+        ):
+            return self.image_to_world_transform(point)
+        world_point = image_to_world_map[y, x]
+        return (round(float(world_point[0]), 3), round(float(world_point[1]), 3))
+
+    def has_image_to_world_map(self, width: int, height: int) -> bool:
+        """Checks whether the image to world map of the current transformation points is built for a frame size.
+
+        Args:
+            width (int): The width of the frame.
+            height (int): The height of the frame.
+
+        Returns:
+            bool: True if lookups use the map.
+        """
+        with self.__lock:
+            return self.__image_to_world_map is not None and self.__image_to_world_map.shape[:2] == (height, width)
+
+    def get_image_to_world_map(self, width: int, height: int) -> np.ndarray:
+        """Returns the world coordinates of every pixel of a frame, built once per set of transformation points.
+
+        The map is cached in the cache directory as a memory mapped file, which is reused after a restart as long as
+        the transformation points did not change.
+
+        Args:
+            width (int): The width of the frame.
+            height (int): The height of the frame.
+
+        Returns:
+            np.ndarray: The read only HxWx2 float32 world coordinates of the pixels.
+        """
+        with self.__lock:
+            image_to_world_map = self.__image_to_world_map
+        if image_to_world_map is not None and image_to_world_map.shape[:2] == (height, width):
+            return image_to_world_map
+
+        points = self.__get_points()
+        with self.__lock:
+            cache_dir = self.__cache_dir
+        if cache_dir is None:
+            image_to_world_map = np.empty((height, width, 2), dtype=np.float32)
+            self.__build_image_to_world_map(image_to_world_map, points.homography.image_to_world)
+            image_to_world_map.flags.writeable = False
+        else:
+            image_to_world_map = self.__load_image_to_world_map(cache_dir, points, width, height)
+        with self.__lock:
+            # The map is not cached if a point changed while it was built.
+            if points.generation == self.__generation:
+                self.__image_to_world_map = image_to_world_map
+        return image_to_world_map
+
+    def __get_cache_key(self, points: TransformationPoints, width: int, height: int) -> str:
+        """Calculates the key a map is cached with.
+
+        Args:
+            points (TransformationPoints): The snapshot of the transformation points the map is built from.
+            width (int): The width of the frame.
+            height (int): The height of the frame.
+
+        Returns:
+            str: The hash of the transformation points, the fit, the camera model and the frame size.
+        """
+        order = sorted(range(len(points.names)), key=lambda index: points.names[index])
+        key = hashlib.sha256(np.hstack([points.image_points, points.world_points])[order].tobytes())
+        key.update(f"{self.__fit_method}:{self.__ransac_threshold}".encode())
+        if self.__camera_model is not None:
+            key.update(self.__camera_model.camera_matrix.tobytes())
+            key.update(self.__camera_model.distortion_coefficients.tobytes())
+        key.update(np.array([width, height], dtype=np.int64).tobytes())
+        return key.hexdigest()[:32]
+
+    def __load_image_to_world_map(
+        self, cache_dir: Path, points: TransformationPoints, width: int, height: int
+    ) -> np.ndarray:
+        """Maps the cached map of transformation points into memory, builds and caches it if it is missing.
+
+        Args:
+            cache_dir (Path): The directory the maps are cached in.
+            points (TransformationPoints): The snapshot of the transformation points.
+            width (int): The width of the frame.
+            height (int): The height of the frame.
+
+        Returns:
+            np.ndarray: The read only memory mapped map.
+        """
+        path = cache_dir / f"{IMAGE_TO_WORLD_MAP_PREFIX}{self.__get_cache_key(points, width, height)}.npy"
+        try:
+            image_to_world_map = np.load(path, mmap_mode="r")
+            if image_to_world_map.shape == (height, width, 2) and image_to_world_map.dtype == np.float32:
+                path.touch()
+                return image_to_world_map
+        except (OSError, ValueError):
+            pass
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # The map is written to a temporary file first, so a crash does not leave a partial map behind, and two threads
+        # building the same map do not write to the same file.
+        temporary_path = path.with_name(f"{path.stem}.{os.getpid()}.{get_ident()}.tmp")
+        image_to_world_map = np.lib.format.open_memmap(
+            temporary_path, mode="w+", dtype=np.float32, shape=(height, width, 2)
+        )
+        self.__build_image_to_world_map(image_to_world_map, points.homography.image_to_world)
+        image_to_world_map.flush()
+        del image_to_world_map
+        os.replace(temporary_path, path)
+
+        cached_maps = sorted(
+            cache_dir.glob(f"{IMAGE_TO_WORLD_MAP_PREFIX}*.npy"), key=lambda cached: cached.stat().st_mtime
+        )
+        for cached_map in cached_maps[:-MAX_CACHED_MAPS]:
+            cached_map.unlink(missing_ok=True)
+        return np.load(path, mmap_mode="r")
+
+    def __build_image_to_world_map(self, output: np.ndarray, matrix: np.ndarray) -> None:
+        """Transforms every pixel of a frame to world coordinates.
+
+        Args:
+            output (np.ndarray): The HxWx2 array the world coordinates are written to.
+            matrix (np.ndarray): The 3x3 matrix transforming undistorted image points to world points.
+        """
+        height, width = output.shape[:2]
+        xs: np.ndarray = np.arange(width, dtype=np.float64)
+        ys: np.ndarray = np.arange(height, dtype=np.float64)[:, np.newaxis]
+        if self.__camera_model is not None:
+            # The undistorted position of every pixel, calculated like cv2.undistortPoints does for single points.
+            camera_matrix, distortion_coefficients = self.__camera_model
+            undistorted_xs, undistorted_ys = cv2.initInverseRectificationMap(  # type: ignore[call-overload]
+                camera_matrix, distortion_coefficients, None, camera_matrix, (width, height), cv2.CV_32FC1
+            )
+            xs, ys = undistorted_xs.astype(np.float64), undistorted_ys.astype(np.float64)
+        # Like cv2.perspectiveTransform, points with a vanishing denominator are mapped to zero.
+        denominator = matrix[2, 0] * xs + matrix[2, 1] * ys + matrix[2, 2]
+        scale = np.divide(
+            1.0, denominator, out=np.zeros_like(denominator), where=np.abs(denominator) > np.finfo(float).eps
+        )
+        output[..., 0] = (matrix[0, 0] * xs + matrix[0, 1] * ys + matrix[0, 2]) * scale
+        output[..., 1] = (matrix[1, 0] * xs + matrix[1, 1] * ys + matrix[1, 2]) * scale
+
+    def image_to_world_transform_batch(self, points: np.ndarray) -> np.ndarray:
+        """Transforms image points to world points.
+
+        Args:
+            points (np.ndarray): The Nx2 image points to transform.
+
+        Returns:
+            np.ndarray: The Nx2 world points as float64.
+        """
+        return self.__transform_batch(self.undistort_points(points), self.__get_homography().image_to_world)
+
+    def world_to_image_transform_batch(self, points: np.ndarray) -> np.ndarray:
+        """Transforms world points to image points.
+
+        Args:
+            points (np.ndarray): The Nx2 world points to transform.
+
+        Returns:
+            np.ndarray: The Nx2 image points as float64, not rounded to whole pixels.
+        """
+        return self.distort_points(self.__transform_batch(points, self.__get_homography().world_to_image))
+
+    def undistort_points(self, points: np.ndarray) -> np.ndarray:
+        """Removes the lens distortion from image points.
+
+        Args:
+            points (np.ndarray): The Nx2 points on the camera frame.
+
+        Returns:
+            np.ndarray: The Nx2 points on the undistorted frame as float64, the points themselves without a camera
+                model.
+        """
+        points = self.__as_points(points)
+        if self.__camera_model is None or len(points) == 0:
+            return points
+        camera_matrix, distortion_coefficients = self.__camera_model
+        return cv2.undistortPoints(
+            points.reshape(-1, 1, 2), camera_matrix, distortion_coefficients, P=camera_matrix
+        ).reshape(-1, 2)
+
+    def distort_points(self, points: np.ndarray) -> np.ndarray:
+        """Applies the lens distortion to points on the undistorted frame, the inverse of undistort_points.
+
+        Args:
+            points (np.ndarray): The Nx2 points on the undistorted frame.
+
+        Returns:
+            np.ndarray: The Nx2 points on the camera frame as float64, the points themselves without a camera model.
+        """
+        points = self.__as_points(points)
+        if self.__camera_model is None or len(points) == 0:
+            return points
+        camera_matrix, distortion_coefficients = self.__camera_model
+        normalized_points = cv2.convertPointsToHomogeneous(
+            cv2.perspectiveTransform(points.reshape(-1, 1, 2), np.linalg.inv(camera_matrix))
+        )
+        distorted_points, _ = cv2.projectPoints(
+            normalized_points, np.zeros(3), np.zeros(3), camera_matrix, distortion_coefficients
+        )
+        return distorted_points.reshape(-1, 2).astype(np.float64)
+
+    def get_undistortion_maps(
+        self, frame_size: tuple[int, int], output_size: tuple[int, int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the remap tables undistorting the camera frame, built once per size.
+
+        The undistorted frame is scaled to the output size in the same remap, so a scaled down view costs a single
+        cv2.remap of the full camera frame.
+
+        Args:
+            frame_size (tuple[int, int]): The size (width, height) of the camera frame the camera matrix belongs to.
+            output_size (tuple[int, int]): The size (width, height) of the undistorted frame.
+
+        Raises:
+            ValueError: If no camera model is set.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The fixed point maps for cv2.remap.
+        """
+        if self.__camera_model is None:
+            raise ValueError("The frame can not be undistorted without a camera model.")
+        with self.__lock:
+            maps = self.__undistortion_maps.get((*frame_size, *output_size))
+        if maps is not None:
+            return maps
+
+        camera_matrix, distortion_coefficients = self.__camera_model
+        scale = np.diag([output_size[0] / frame_size[0], output_size[1] / frame_size[1], 1.0])
+        maps = cv2.initUndistortRectifyMap(  # type: ignore[call-overload]
+            camera_matrix, distortion_coefficients, None, scale @ camera_matrix, output_size, cv2.CV_16SC2
+        )
+        with self.__lock:
+            if len(self.__undistortion_maps) >= MAX_CACHED_UNDISTORTION_MAPS:
+                del self.__undistortion_maps[next(iter(self.__undistortion_maps))]
+            self.__undistortion_maps[(*frame_size, *output_size)] = maps
+        return maps
+
+    def undistort_frame(self, frame: np.ndarray, output: np.ndarray) -> np.ndarray:
+        """Undistorts the camera frame and scales it to the size of the output.
+
+        Args:
+            frame (np.ndarray): The camera frame.
+            output (np.ndarray): The frame the undistorted frame is written to.
+
+        Raises:
+            ValueError: If no camera model is set.
+
+        Returns:
+            np.ndarray: The output.
+        """
+        map1, map2 = self.get_undistortion_maps((frame.shape[1], frame.shape[0]), (output.shape[1], output.shape[0]))
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=output)
+
+    def get_topview_size(self, pixels_per_meter: float) -> tuple[int, int] | None:
+        """Calculates the size of the top view of the area the world points span.
+
+        Args:
+            pixels_per_meter (float): The scale of the top view.
+
+        Returns:
+            tuple[int, int] | None: The size (width, height) of the top view, scaled down to at most MAX_TOPVIEW_SIZE
+                pixels, None if the points do not define a valid transformation.
+        """
+        points = self.__get_points()
+        if points.homography.error is not None:
+            return None
+        width, height = np.ptp(points.world_points, axis=0) * pixels_per_meter
+        scale = min(1.0, MAX_TOPVIEW_SIZE / max(width, height))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def get_topview_maps(
+        self, frame_size: tuple[int, int], output_size: tuple[int, int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the remap tables warping the camera frame to the top view, built once per set of points and size.
+
+        The top view shows the area the world points span, with the x axis to the right and the y axis downwards. The
+        lens distortion is removed in the same remap.
+
+        Args:
+            frame_size (tuple[int, int]): The size (width, height) of the camera frame.
+            output_size (tuple[int, int]): The size (width, height) of the top view.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The fixed point maps for cv2.remap.
+        """
+        with self.__lock:
+            maps = self.__topview_maps.get((*frame_size, *output_size))
+        if maps is not None:
+            return maps
+
+        points = self.__get_points()
+        world_points = points.world_points
+        world_min, world_max = world_points.min(axis=0), world_points.max(axis=0)
+        output_width, output_height = output_size
+        # The world coordinates of the pixel centers of the top view.
+        xs = world_min[0] + (np.arange(output_width) + 0.5) * (world_max[0] - world_min[0]) / output_width
+        ys = (
+            world_min[1]
+            + (np.arange(output_height)[:, np.newaxis] + 0.5) * (world_max[1] - world_min[1]) / output_height
+        )
+
+        matrix = points.homography.world_to_image
+        denominator = matrix[2, 0] * xs + matrix[2, 1] * ys + matrix[2, 2]
+        # Points on the other side of the horizon than the world points would be mirrored into the frame.
+        center = world_points.mean(axis=0)
+        horizon_side = np.sign(matrix[2, 0] * center[0] + matrix[2, 1] * center[1] + matrix[2, 2])
+        valid = denominator * horizon_side > np.finfo(float).eps
+        scale = np.divide(1.0, denominator, out=np.zeros_like(denominator), where=valid)
+        image_points = np.empty((output_height, output_width, 2), dtype=np.float64)
+        image_points[..., 0] = (matrix[0, 0] * xs + matrix[0, 1] * ys + matrix[0, 2]) * scale
+        image_points[..., 1] = (matrix[1, 0] * xs + matrix[1, 1] * ys + matrix[1, 2]) * scale
+        if self.__camera_model is not None:
+            image_points = self.distort_points(image_points.reshape(-1, 2)).reshape(output_height, output_width, 2)
+        image_points[~valid] = -1
+
+        map_xs = np.ascontiguousarray(image_points[..., 0], dtype=np.float32)
+        map_ys = np.ascontiguousarray(image_points[..., 1], dtype=np.float32)
+        maps = cv2.convertMaps(map_xs, map_ys, cv2.CV_16SC2)
+        with self.__lock:
+            # The maps are not cached if a point changed while they were built on a render thread.
+            if points.generation == self.__generation:
+                if len(self.__topview_maps) >= MAX_CACHED_TOPVIEW_MAPS:
+                    del self.__topview_maps[next(iter(self.__topview_maps))]
+                self.__topview_maps[(*frame_size, *output_size)] = maps
+        return maps
+
+    def warp_to_topview(self, frame: np.ndarray, output: np.ndarray) -> np.ndarray:
+        """Warps the camera frame to the top view at the size of the output.
+
+        Args:
+            frame (np.ndarray): The camera frame.
+            output (np.ndarray): The frame the top view is written to.
+
+        Returns:
+            np.ndarray: The output, black outside of the camera frame.
+        """
+        map1, map2 = self.get_topview_maps((frame.shape[1], frame.shape[0]), (output.shape[1], output.shape[0]))
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=output, borderMode=cv2.BORDER_CONSTANT)
+
+    @staticmethod
+    def __as_points(points: np.ndarray) -> np.ndarray:
+        """Converts points to a float64 array.
+
+        Args:
+            points (np.ndarray): The Nx2 points.
+
+        Raises:
+            ValueError: If the points are not an Nx2 array.
+
+        Returns:
+            np.ndarray: The Nx2 points as float64.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError(f"Expected an Nx2 array of points, got the shape {points.shape}.")
+        return points
+
+    @classmethod
+    def __transform_batch(cls, points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """Applies a perspective transformation to points.
+
+        Args:
+            points (np.ndarray): The Nx2 points to transform.
+            matrix (np.ndarray): The 3x3 transformation matrix.
+
+        Raises:
+            ValueError: If the points are not an Nx2 array.
+
+        Returns:
+            np.ndarray: The Nx2 transformed points as float64.
+        """
+        points = cls.__as_points(points)
+        if len(points) == 0:
+            return np.zeros((0, 2), dtype=np.float64)
+        return cv2.perspectiveTransform(points.reshape(-1, 1, 2), matrix).reshape(-1, 2)
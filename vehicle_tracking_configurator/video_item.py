@@ -0,0 +1,163 @@
+"""Provides the QML item showing the rendered frames of a view."""
+# Copyright (C) 2023, NG:ITL
+
+from threading import Lock
+from typing import Callable
+
+from PySide6.QtCore import Property, QRectF, Signal, Slot
+from PySide6.QtGui import QImage
+from PySide6.QtQuick import QQuickItem, QQuickWindow, QSGNode, QSGSimpleTextureNode, QSGTexture
+import numpy as np
+import cv2
+
+from vehicle_tracking_configurator.frame_pacing import FramePacer
+
+
+class VideoFrameItem(QQuickItem):
+    """Shows the frames of a view as a texture in the scene graph, fitted into the item keeping the aspect ratio.
+
+    The render worker hands the frames to the item directly, the texture is updated in the next synchronization of the
+    scene graph without a round trip through an image provider. The frame is copied into an RGBA image owned by the
+    item, which the scene graph uploads without converting it again, and is released right after the copy or once a
+    newer frame replaces it unread.
+
+    Args:
+        parent (QQuickItem | None): The parent item.
+    """
+
+    frame_received = Signal(int, int)
+    painted_size_changed = Signal(name="paintedSizeChanged")
+
+    def __init__(self, parent: QQuickItem | None = None) -> None:
+        super().__init__(parent)
+        self.setFlag(QQuickItem.ItemHasContents, True)  # type: ignore[attr-defined]
+        self.frame_pacer: FramePacer | None = None
+        self.__frame_size = (0, 0)
+        self.__pending_frame: tuple[np.ndarray, Callable[[np.ndarray], None] | None] | None = None
+        # Only written and read on the render thread, while no texture made from it is uploaded.
+        self.__texture_image: tuple[np.ndarray, QImage] | None = None
+        self.__texture: QSGTexture | None = None
+        self.__lock = Lock()
+        # Emitted by the render worker, so the item is updated on the GUI thread.
+        self.frame_received.connect(self.__update_frame)
+
+    def set_frame(self, frame: np.ndarray, release: Callable[[np.ndarray], None] | None = None) -> None:
+        """Shows a new frame, can be called from any thread.
+
+        The frame buffer must not be written to until the item released it.
+
+        Args:
+            frame (np.ndarray): The new BGR frame, a persistent buffer of a DoubleFrameBuffer.
+            release (Callable[[np.ndarray], None] | None): Called with the frame once the item no longer reads it.
+        """
+        with self.__lock:
+            replaced_frame, self.__pending_frame = self.__pending_frame, (frame, release)
+        if replaced_frame is not None and replaced_frame[1] is not None:
+            replaced_frame[1](replaced_frame[0])
+        self.frame_received.emit(frame.shape[1], frame.shape[0])
+
+    @Slot(int, int)  # type: ignore[arg-type]
+    def __update_frame(self, width: int, height: int) -> None:
+        """Schedules the update of the texture.
+
+        Args:
+            width (int): The width of the new frame.
+            height (int): The height of the new frame.
+        """
+        if (width, height) != self.__frame_size:
+            self.__frame_size = (width, height)
+            self.painted_size_changed.emit()
+        self.update()
+
+    def __get_painted_rect(self) -> QRectF:
+        """Calculates the rectangle the frame is painted in.
+
+        Returns:
+            QRectF: The frame fitted into the item keeping the aspect ratio, centered.
+        """
+        frame_width, frame_height = self.__frame_size
+        if frame_width == 0 or frame_height == 0:
+            return QRectF()
+        scale = min(self.width() / frame_width, self.height() / frame_height)
+        width, height = frame_width * scale, frame_height * scale
+        return QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height)
+
+    def get_painted_width(self) -> float:
+        """The width the frame is painted with."""
+        return self.__get_painted_rect().width()
+
+    def get_painted_height(self) -> float:
+        """The height the frame is painted with."""
+        return self.__get_painted_rect().height()
+
+    paintedWidth = Property(float, get_painted_width, notify=painted_size_changed)  # type: ignore[arg-type]
+    paintedHeight = Property(float, get_painted_height, notify=painted_size_changed)  # type: ignore[arg-type]
+
+    # Camel case is required by PySide6
+    def geometryChange(self, new_geometry: QRectF, old_geometry: QRectF) -> None:  # type: ignore[override]
+        """Updates the painted size when the item is resized.
+
+        Args:
+            new_geometry (QRectF): The new geometry of the item.
+            old_geometry (QRectF): The previous geometry of the item.
+        """
+        super().geometryChange(new_geometry, old_geometry)
+        if new_geometry.size() != old_geometry.size():
+            self.painted_size_changed.emit()
+            self.update()
+
+    def __get_texture_image(self, width: int, height: int) -> tuple[np.ndarray, QImage]:
+        """Returns the image the frames are copied into, it is only allocated again when the frame size changes.
+
+        The previous texture was uploaded when it was rendered before this synchronization, or is replaced unrendered,
+        so the image can be overwritten.
+
+        Args:
+            width (int): The width of the frame.
+            height (int): The height of the frame.
+
+        Returns:
+            tuple[np.ndarray, QImage]: The RGBA pixels and the image wrapping them without a copy.
+        """
+        if self.__texture_image is None or self.__texture_image[0].shape[:2] != (height, width):
+            pixels = np.zeros((height, width, 4), dtype=np.uint8)
+            # The alpha channel is always opaque, so the premultiplied format is uploaded as is.
+            image = QImage(pixels.data, width, height, pixels.strides[0], QImage.Format.Format_RGBA8888_Premultiplied)
+            self.__texture_image = (pixels, image)
+        return self.__texture_image
+
+    # Camel case is required by PySide6
+    def updatePaintNode(  # type: ignore[override]
+        self, node: QSGNode | None, _data: QQuickItem.UpdatePaintNodeData
+    ) -> QSGNode | None:
+        """Copies a pending frame into a new texture, called on the render thread while the GUI thread is blocked.
+
+        Args:
+            node (QSGNode | None): The node of the previous update.
+            _data (QQuickItem.UpdatePaintNodeData): Unused.
+
+        Returns:
+            QSGNode | None: The node showing the frame, None before the first frame.
+        """
+        with self.__lock:
+            pending_frame, self.__pending_frame = self.__pending_frame, None
+
+        if pending_frame is not None:
+            frame, release = pending_frame
+            pixels, image = self.__get_texture_image(frame.shape[1], frame.shape[0])
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=pixels)
+            if release is not None:
+                release(frame)
+            if node is None:
+                node = QSGSimpleTextureNode()
+                node.setFiltering(QSGTexture.Linear)  # type: ignore[attr-defined]
+            texture = self.window().createTextureFromImage(image, QQuickWindow.CreateTextureOption.TextureIsOpaque)
+            node.setTexture(texture)  # type: ignore[attr-defined]
+            # The node does not own the texture, the previous texture is released once it is replaced.
+            self.__texture = texture
+            if self.frame_pacer is not None:
+                self.frame_pacer.frame_consumed()
+
+        if node is not None:
+            node.setRect(self.__get_painted_rect())  # type: ignore[attr-defined]
+        return node